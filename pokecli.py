@@ -53,6 +53,7 @@ from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.health_record import BotEvent
 from pokemongo_bot.plugin_loader import PluginLoader
 from pokemongo_bot.api_wrapper import PermaBannedException
+from pokemongo_bot.event_manager import AsyncHandler
 
 try:
     from demjson import jsonlint
@@ -143,6 +144,16 @@ def main():
             for handler in logging.root.handlers[:]:
                 handler.setFormatter(formatter)
 
+    def teardown_bot(bot):
+        # before the bot is dropped (reconnection, config reload, exit)
+        bot.action_log.flush()
+        bot.router.save()
+        bot.event_manager.shutdown()
+        bot.web_state.stop()
+        if getattr(bot, 'sniper_fetcher', None):
+            bot.sniper_fetcher.stop()
+            bot.sniper_fetcher = None
+
     def start_bot(bot, config):
         bot.start()
         initialize_task(bot, config)
@@ -211,6 +222,7 @@ def main():
                         if config.live_config_update_tasks_only:
                             initialize_task(bot, config)
                         else:
+                            teardown_bot(bot)
                             bot = initialize(config)
                             bot = start_bot(bot, config)
 
@@ -231,6 +243,7 @@ def main():
                     level='info',
                     formatted='Not logged in, reconnecting in {:d} seconds'.format(wait_time)
                 )
+                teardown_bot(bot)
                 time.sleep(wait_time)
             except ServerBusyOrOfflineException:
                 bot.event_manager.emit(
@@ -239,6 +252,7 @@ def main():
                     level='info',
                     formatted='Server busy or offline, reconnecting in {:d} seconds'.format(wait_time)
                 )
+                teardown_bot(bot)
                 time.sleep(wait_time)
             except ServerSideRequestThrottlingException:
                 bot.event_manager.emit(
@@ -247,6 +261,7 @@ def main():
                     level='info',
                     formatted='Server is throttling, reconnecting in {:d} seconds'.format(wait_time)
                 )
+                teardown_bot(bot)
                 time.sleep(wait_time)
             except PermaBannedException:
                 bot.event_manager.emit(
@@ -255,6 +270,7 @@ def main():
                     level='info',
                     formatted='Probably permabanned, Game Over ! Play again at https://club.pokemon.com/us/pokemon-trainer-club/sign-up/'
                 )
+                teardown_bot(bot)
                 time.sleep(36000)
             except NoPlayerPositionSetException:
                 bot.event_manager.emit(
@@ -263,6 +279,7 @@ def main():
                     level='info',
                     formatted='No player position set, reconnecting in {:d} seconds'.format(wait_time)
                 )
+                teardown_bot(bot)
                 time.sleep(wait_time)
 
     except GeocoderQuotaExceeded:
@@ -286,6 +303,7 @@ def main():
     finally:
         # Cache here on SIGTERM, or Exception.  Check data is available and worth caching.
         if bot:
+            teardown_bot(bot)
             if len(bot.recent_forts) > 0 and bot.recent_forts[-1] is not None and bot.config.forts_cache_recent_forts:
                 cached_forts_path = os.path.join(
                     _base_dir, 'data', 'recent-forts-%s.json' % bot.config.username
@@ -340,6 +358,11 @@ def report_summary(bot):
     logger.info('Threw {} pokeball{}'.format(metrics.num_throws(), '' if metrics.num_throws() == 1 else 's'))
     logger.info('Earned {} Stardust'.format(metrics.earned_dust()))
     logger.info('Hatched eggs {}'.format(metrics.hatched_eggs(0)))
+    logger.info('API request rate {:.2f}/s, throttled {} times'.format(metrics.api_request_rate(), metrics.api_throttled()))
+    logger.info('Walking routes: {} reused, {} built'.format(metrics.route_cache_hits(), metrics.route_cache_misses()))
+    logger.info('Pokemon stats: {} shared, {} computed'.format(metrics.pokemon_stats_hits(), metrics.pokemon_stats_misses()))
+    for stats in bot.event_manager.handler_stats():
+        logger.info('Events to {handler}: {handled} handled, {dropped} dropped, max lag {max_lag:.2f}s'.format(**stats))
     if (metrics.next_hatching_km(0)):
         logger.info('Next egg hatches in {:.2f} km'.format(metrics.next_hatching_km(0)))
     logger.info('')
@@ -727,6 +750,102 @@ def init_config():
          type=bool,
          default=False
     )
+    add_config(
+         parser,
+         load,
+         long_flag="--api.requests_per_second",
+         help="Maximum rate of API requests, lowered automatically while the server throttles us",
+         type=float,
+         default=2.0
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--api.burst_size",
+         help="Number of API requests allowed back to back after an idle period",
+         type=int,
+         default=2
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--profiler.enabled",
+         help="Profile every tick phase and task, reporting latency percentiles",
+         type=bool,
+         default=False
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--profiler.window_size",
+         help="Number of samples kept per profiled section",
+         type=int,
+         default=500
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--profiler.report_interval",
+         help="Seconds between two tick profile reports",
+         type=float,
+         default=60
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--events.async_dispatch",
+         help="Send events to the handlers (except logging) from their own thread",
+         type=bool,
+         default=False
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--events.queue_size",
+         help="Number of events queued per handler in async dispatch",
+         type=int,
+         default=100
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--events.overflow",
+         help="What to do when a handler queue is full: drop_oldest, drop_debug or block",
+         type=str,
+         default='drop_oldest'
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--database.log_flush_interval",
+         help="Seconds between two writes of the buffered catch/spin/transfer logs to the database",
+         type=float,
+         default=10
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--routing.osm_file",
+         help="OpenStreetMap extract (.osm) used to route the polyline walker offline",
+         type=str,
+         default=None
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--routing.google",
+         help="Ask the Google Directions API for the routes not found offline",
+         type=bool,
+         default=True
+    )
+    add_config(
+         parser,
+         load,
+         long_flag="--routing.cache",
+         help="Keep the walking routes in data/routes-<username>.json",
+         type=bool,
+         default=True
+    )
 
     # Start to parse other attrs
     config = parser.parse_args()
@@ -797,6 +916,10 @@ def init_config():
     if "logging_color" in load:
         logger.warning('The logging_color argument has been moved into the logging config section')
 
+    if config.events_overflow not in AsyncHandler.OVERFLOW_POLICIES:
+        parser.error("--events.overflow should be one of: {}".format(', '.join(AsyncHandler.OVERFLOW_POLICIES)))
+        return None
+
     if config.walk_min < 1:
         parser.error("--walk_min is out of range! (should be >= 1.0)")
         return None
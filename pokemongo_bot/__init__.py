@@ -18,18 +18,25 @@ import uuid
 from geopy.geocoders import GoogleV3
 from pgoapi import PGoApi
 from pgoapi.utilities import f2i, get_cell_ids
-from s2sphere import Cell, CellId, LatLng
 
 from . import cell_workers
 from .base_task import BaseTask
 from .plugin_loader import PluginLoader
 from .api_wrapper import ApiWrapper
 from .cell_workers.utils import distance
+from .datastore import ActionLog
 from .event_manager import EventManager
+from .fort_index import FortIndex
+from .seen_targets import SeenTargets
 from .human_behaviour import sleep
 from .item_list import Item
+from .map_cells import MapCellStore
 from .metrics import Metrics
+from .profiler import init_profiler
 from .sleep_schedule import SleepSchedule
+from .walkers.polyline_generator import PolylineObjectHandler
+from .walkers.routing import Router
+from .web_state import WebStateWriter
 from pokemongo_bot.event_handlers import SocketIoHandler, LoggingHandler, SocialHandler
 from pokemongo_bot.socketio_server.runner import SocketIoRunner
 from pokemongo_bot.websocket_remote_control import WebsocketRemoteControl
@@ -87,19 +94,42 @@ class PokemonGoBot(object):
     def __init__(self, db, config):
 
         self.database = db
+        # @var ActionLog
+        self.action_log = ActionLog(db, flush_interval=config.database_log_flush_interval)
 
         self.config = config
         super(PokemonGoBot, self).__init__()
 
         self.fort_timeouts = dict()
-        self.pokemon_list = json.load(
-            open(os.path.join(_base_dir, 'data', 'pokemon.json'))
-        )
-        self.item_list = json.load(open(os.path.join(_base_dir, 'data', 'items.json')))
+        # data/pokemon.json and data/items.json, as loaded by the inventory
+        self.pokemon_list = [pokemon._data for pokemon in inventory.Pokemons.STATIC_DATA]
+        inventory.Items.init_static_data()
+        self.item_list = inventory.Items.STATIC_DATA
         # @var Metrics
         self.metrics = Metrics(self)
+        # @var TickProfiler
+        self.profiler = init_profiler(
+            self,
+            enabled=self.config.profiler_enabled,
+            window_size=self.config.profiler_window_size,
+            report_interval=self.config.profiler_report_interval
+        )
         self.latest_inventory = None
         self.cell = None
+        self.map_cells = MapCellStore()
+        # @var FortIndex
+        self.fort_index = FortIndex()
+        # @var SeenTargets
+        self.seen_targets = SeenTargets(
+            os.path.join(_base_dir, 'data', 'map-caught-%s.json' % self.config.username)
+        )
+        self.seen_targets.load()
+        # @var Router
+        self.router = Router.from_config(
+            self.config,
+            os.path.join(_base_dir, 'data', 'routes-%s.json' % self.config.username)
+        )
+        PolylineObjectHandler.set_router(self.router)
         self.recent_forts = [None] * config.forts_max_circle_size
         self.tick_count = 0
         self.softban = False
@@ -114,6 +144,8 @@ class PokemonGoBot(object):
         self.workers = []
 
         # Theading setup for file writing
+        # @var WebStateWriter
+        self.web_state = WebStateWriter()
         self.web_update_queue = Queue.Queue(maxsize=1)
         self.web_update_thread = threading.Thread(target=self.update_web_location_worker)
         self.web_update_thread.start()
@@ -123,6 +155,9 @@ class PokemonGoBot(object):
         self.heartbeat_counter = 0
         self.last_heartbeat = time.time()
         self.hb_locked = False # lock hb on snip
+        self._awarded_badges = {}
+        # badges announced by a map call, acknowledged on the next heartbeat
+        self._badges_to_acknowledge = 0
 
         # Inventory refresh limiting
         self.inventory_refresh_threshold = 10
@@ -185,6 +220,8 @@ class PokemonGoBot(object):
 
         # @var EventManager
         self.event_manager = EventManager(self.config.walker_limit_output, *handlers)
+        if self.config.events_async_dispatch is True:
+            self.event_manager.set_async_dispatch(self.config.events_queue_size, self.config.events_overflow)
         self._register_events()
         if self.config.show_events:
             self.event_manager.event_report()
@@ -751,32 +788,50 @@ class PokemonGoBot(object):
         self.event_manager.register_event('catch_limit_on')
         self.event_manager.register_event('catch_limit_off')
 
+        # Profiler
+        self.event_manager.register_event('tick_profile', parameters=('report',))
 
     def tick(self):
-        self.health_record.heartbeat()
-        self.cell = self.get_meta_cell()
+        profiler = self.profiler
 
-        if self.sleep_schedule:
-            self.sleep_schedule.work()
+        with profiler.tick():
+            with profiler.measure('health_record'):
+                self.health_record.heartbeat()
+            with profiler.measure('get_meta_cell'):
+                # queued inventory refresh is sent along with the map request
+                self._queue_inventory_refresh()
+                self.cell = self.get_meta_cell()
+
+            if self.sleep_schedule:
+                with profiler.measure('sleep_schedule'):
+                    self.sleep_schedule.work()
+
+            now = time.time() * 1000
 
-        now = time.time() * 1000
+            for fort in self.cell["forts"]:
+                timeout = fort.get("cooldown_complete_timestamp_ms", 0)
 
-        for fort in self.cell["forts"]:
-            timeout = fort.get("cooldown_complete_timestamp_ms", 0)
+                if timeout >= now:
+                    self.fort_timeouts[fort["id"]] = timeout
 
-            if timeout >= now:
-                self.fort_timeouts[fort["id"]] = timeout
+            with profiler.measure('refresh_inventory'):
+                self._refresh_inventory()
 
-        self._refresh_inventory()
+            self.tick_count += 1
 
-        self.tick_count += 1
+            # Check if session token has expired
+            with profiler.measure('check_session'):
+                self.check_session(self.position)
 
-        # Check if session token has expired
-        self.check_session(self.position)
+            with profiler.measure('action_log'):
+                self.action_log.flush_if_due()
+            self.router.save_if_due()
 
-        for worker in self.workers:
-            if worker.work() == WorkerResult.RUNNING:
-                return
+            for worker in self.workers:
+                with profiler.measure(type(worker).__name__):
+                    result = worker.work()
+                if result == WorkerResult.RUNNING:
+                    return
 
     def get_meta_cell(self):
         location = self.position[0:2]
@@ -795,13 +850,7 @@ class PokemonGoBot(object):
             if "catchable_pokemons" in cell and len(cell["catchable_pokemons"]):
                 catchable_pokemons += cell["catchable_pokemons"]
             if "nearby_pokemons" in cell and len(cell["nearby_pokemons"]):
-                latlng = LatLng.from_point(Cell(CellId(cell["s2_cell_id"])).get_center())
-
-                for p in cell["nearby_pokemons"]:
-                    p["latitude"] = latlng.lat().degrees
-                    p["longitude"] = latlng.lng().degrees
-                    p["s2_cell_id"] = cell["s2_cell_id"]
-
+                # already located at the cell center by the map cell store
                 nearby_pokemons += cell["nearby_pokemons"]
 
         # If there are forts present in the cells sent from the server or we don't yet have any cell data, return all data retrieved
@@ -837,38 +886,31 @@ class PokemonGoBot(object):
 
         if cells == []:
             location = self.position[0:2]
-            cells = self.find_close_cells(*location)
+            # from the web update thread, the queued callbacks are left to the tick
+            cells = self.find_close_cells(*location, flush=False)
 
         user_data_cells = os.path.join(_base_dir, 'data', 'cells-%s.json' % self.config.username)
-        try:
-            with open(user_data_cells, 'w') as outfile:
-                json.dump(cells, outfile)
-        except IOError as e:
-            self.logger.info('[x] Error while opening location file: %s' % e)
+        self.web_state.write(user_data_cells, cells)
 
         user_web_location = os.path.join(
             _base_dir, 'web', 'location-%s.json' % self.config.username
         )
         # alt is unused atm but makes using *location easier
-        try:
-            with open(user_web_location, 'w') as outfile:
-                json.dump({
-                    'lat': lat,
-                    'lng': lng,
-                    'alt': alt,
-                    'cells': cells
-                }, outfile)
-        except IOError as e:
-            self.logger.info('[x] Error while opening location file: %s' % e)
+        self.web_state.write(user_web_location, {
+            'lat': lat,
+            'lng': lng,
+            'alt': alt,
+            'cells': cells
+        })
 
         user_data_lastlocation = os.path.join(
             _base_dir, 'data', 'last-location-%s.json' % self.config.username
         )
-        try:
-            with open(user_data_lastlocation, 'w') as outfile:
-                json.dump({'lat': lat, 'lng': lng, 'alt': alt, 'start_position': self.start_position}, outfile)
-        except IOError as e:
-            self.logger.info('[x] Error while opening location file: %s' % e)
+        self.web_state.write(
+            user_data_lastlocation,
+            {'lat': lat, 'lng': lng, 'alt': alt, 'start_position': self.start_position}
+        )
+
     def emit_forts_event(self,response_dict):
         map_objects = response_dict.get(
             'responses', {}
@@ -887,13 +929,14 @@ class PokemonGoBot(object):
                             sender=self,
                             level='debug',
                             formatted='Found forts {json}',
-                            data={'json': json.dumps(cell["forts"])}
+                            data=lambda: {'json': json.dumps(cell["forts"])}
                         )
 
-    def find_close_cells(self, lat, lng):
+    def find_close_cells(self, lat, lng, flush=True):
         cellid = get_cell_ids(lat, lng)
-        timestamp = [0, ] * len(cellid)
-        response_dict = self.get_map_objects(lat, lng, timestamp, cellid)
+        # only ask for what changed since the cells were last received
+        timestamp = self.map_cells.timestamps(cellid)
+        response_dict = self.get_map_objects(lat, lng, timestamp, cellid, flush)
         map_objects = response_dict.get(
             'responses', {}
         ).get('GET_MAP_OBJECTS', {})
@@ -901,7 +944,9 @@ class PokemonGoBot(object):
 
         map_cells = []
         if status and status == 1:
-            map_cells = map_objects['map_cells']
+            self.map_cells.update(map_objects['map_cells'])
+            self.map_cells.expire()
+            map_cells = self.map_cells.cells(cellid)
             position = (lat, lng, 0)
             map_cells.sort(
                 key=lambda x: distance(
@@ -1422,42 +1467,21 @@ class PokemonGoBot(object):
                               in self.fort_timeouts.iteritems()
                               if timeout >= now * 1000}
 
+        # like a player closing the badge popups, out of the response callbacks
+        while self._badges_to_acknowledge > 0:
+            self._badges_to_acknowledge -= 1
+            human_behaviour.action_delay(3, 10)
+
         if now - self.last_heartbeat >= self.heartbeat_threshold and not self.hb_locked:
             self.last_heartbeat = now
-            request = self.api.create_request()
-            request.get_player()
-            request.check_awarded_badges()
-            responses = request.call()
-
-            if responses['responses']['GET_PLAYER']['success'] == True:
-                # we get the player_data anyway, might as well store it
-                self._player = responses['responses']['GET_PLAYER']['player_data']
-                self.event_manager.emit(
-                    'player_data',
-                    sender=self,
-                    level='debug',
-                    formatted='player_data: {player_data}',
-                    data={'player_data': self._player}
-                )
-            if responses['responses']['CHECK_AWARDED_BADGES']['success'] == True:
-                # store awarded_badges reponse to be used in a task or part of heartbeat
-                self._awarded_badges = responses['responses']['CHECK_AWARDED_BADGES']
-
-            if 'awarded_badges' in self._awarded_badges:
-                i = 0
-                for badge in self._awarded_badges['awarded_badges']:
-                    badgelevel = self._awarded_badges['awarded_badge_levels'][i]
-                    badgename = badge_type_pb2._BADGETYPE.values_by_number[badge].name
-                    i += 1
-                    self.event_manager.emit(
-                        'badges',
-                        sender=self,
-                        level='info',
-                        formatted='awarded badge: {badge}, lvl {level}',
-                        data={'badge': badgename,
-                              'level': badgelevel}
-                    )
-                    human_behaviour.action_delay(3, 10)
+            heartbeat_requests = ['get_player', 'check_awarded_badges']
+
+            # no map request was made since the last heartbeat, send it alone
+            if any(self.api.is_request_queued(r) for r in heartbeat_requests):
+                self.api.flush_requests(methods=heartbeat_requests)
+
+            self.api.queue_request('get_player', self._on_player_response)
+            self.api.queue_request('check_awarded_badges', self._on_awarded_badges_response)
 
         try:
             self.web_update_queue.put_nowait(True)  # do this outside of thread every tick
@@ -1466,6 +1490,39 @@ class PokemonGoBot(object):
 
         threading.Timer(self.heartbeat_threshold, self.heartbeat).start()
 
+    def _on_player_response(self, responses):
+        if responses['responses']['GET_PLAYER']['success'] == True:
+            # we get the player_data anyway, might as well store it
+            self._player = responses['responses']['GET_PLAYER']['player_data']
+            self.event_manager.emit(
+                'player_data',
+                sender=self,
+                level='debug',
+                formatted='player_data: {player_data}',
+                data={'player_data': self._player}
+            )
+
+    def _on_awarded_badges_response(self, responses):
+        if responses['responses']['CHECK_AWARDED_BADGES']['success'] == True:
+            # store awarded_badges reponse to be used in a task or part of heartbeat
+            self._awarded_badges = responses['responses']['CHECK_AWARDED_BADGES']
+
+        if 'awarded_badges' in self._awarded_badges:
+            i = 0
+            for badge in self._awarded_badges['awarded_badges']:
+                badgelevel = self._awarded_badges['awarded_badge_levels'][i]
+                badgename = badge_type_pb2._BADGETYPE.values_by_number[badge].name
+                i += 1
+                self.event_manager.emit(
+                    'badges',
+                    sender=self,
+                    level='info',
+                    formatted='awarded badge: {badge}, lvl {level}',
+                    data={'badge': badgename,
+                          'level': badgelevel}
+                )
+                self._badges_to_acknowledge += 1
+
     def update_web_location_worker(self):
         while True:
             self.web_update_queue.get()
@@ -1488,31 +1545,43 @@ class PokemonGoBot(object):
                     ' | Pokestops Visited: '
                     '{}'.format(player_stats.poke_stop_visits))
 
-    def get_forts(self, order_by_distance=False):
-        forts = [fort
-                 for fort in self.cell['forts']
-                 if 'latitude' in fort and 'type' in fort]
+    def get_fort_index(self):
+        """
+        Spatial index of the forts of the current meta cell, to be used for
+        every fort distance query instead of sorting get_forts().
+        :rtype: FortIndex
+        """
+        self.fort_index.update(self.cell['forts'])
+        return self.fort_index
 
+    def get_forts(self, order_by_distance=False):
         if order_by_distance:
-            forts.sort(key=lambda x: distance(
-                self.position[0],
-                self.position[1],
-                x['latitude'],
-                x['longitude']
-            ))
+            return self.get_fort_index().nearest(self.position[0], self.position[1])
 
-        return forts
+        return [fort
+                for fort in self.cell['forts']
+                if 'latitude' in fort and 'type' in fort]
 
-    def get_map_objects(self, lat, lng, timestamp, cellid):
+    def get_map_objects(self, lat, lng, timestamp, cellid, flush=True):
+        """
+        :param flush: Send the queued sub-requests (inventory, heartbeat) along,
+                      their callbacks are then run by the calling thread.
+        """
         if time.time() - self.last_time_map_object < self.config.map_object_cache_time:
             return self.last_map_object
 
-        self.last_map_object = self.api.get_map_objects(
+        request = self.api.create_request()
+        request.get_map_objects(
             latitude=f2i(lat),
             longitude=f2i(lng),
             since_timestamp_ms=timestamp,
             cell_id=cellid
         )
+        if flush:
+            # queued sub-requests (inventory, heartbeat) share this round-trip
+            self.last_map_object = self.api.flush_requests(request)
+        else:
+            self.last_map_object = request.call()
         self.emit_forts_event(self.last_map_object)
         #if self.last_map_object:
         #    print self.last_map_object
@@ -1564,10 +1633,25 @@ class PokemonGoBot(object):
                 data={'path': cached_forts_path}
             )
 
+    def _queue_inventory_refresh(self):
+        now = time.time()
+        if now - self.last_inventory_refresh >= self.inventory_refresh_threshold:
+            self.api.queue_request('get_inventory', self._on_inventory_response,
+                                   **inventory.refresh_request_args())
+
+    def _on_inventory_response(self, response):
+        inventory.refresh_inventory(response)
+        self.last_inventory_refresh = time.time()
+        self.inventory_refresh_counter += 1
+
     def _refresh_inventory(self):
         # Perform inventory update every n seconds
         now = time.time()
         if now - self.last_inventory_refresh >= self.inventory_refresh_threshold:
-            inventory.refresh_inventory()
-            self.last_inventory_refresh = now
-            self.inventory_refresh_counter += 1
+            # map objects came from cache, the queued refresh is still waiting
+            if self.api.is_request_queued('get_inventory'):
+                self.api.flush_requests(methods=['get_inventory'])
+            else:
+                inventory.refresh_inventory()
+                self.last_inventory_refresh = now
+                self.inventory_refresh_counter += 1
@@ -6,6 +6,8 @@ import hashlib
 import os
 import urllib
 import sys
+import threading
+from collections import OrderedDict
 from pgoapi.exceptions import (ServerSideRequestThrottlingException,
                                NotLoggedInException, ServerBusyOrOfflineException,
                                NoPlayerPositionSetException, 
@@ -16,6 +18,7 @@ from pgoapi.pgoapi import RpcApi
 from pgoapi.protos.pogoprotos.networking.requests.request_type_pb2 import RequestType
 from pgoapi.utilities import get_time
 from .human_behaviour import sleep, gps_noise_rng
+from .profiler import record_api_call
 from pokemongo_bot.base_dir import _base_dir
 
 
@@ -23,6 +26,77 @@ class PermaBannedException(Exception):
     pass
 
 
+class RateLimiter(object):
+    """
+    Adaptive token bucket pacing every request made through one ApiWrapper.
+
+    Tokens are refilled at `rate` per second up to `burst`, so requests made
+    after a quiet period go out immediately. When the server throttles us the
+    rate is divided by BACKOFF_FACTOR, and it ramps back up by RECOVERY_FACTOR
+    after RECOVERY_SUCCESSES successful requests, never above `max_rate`.
+    """
+
+    BACKOFF_FACTOR = 2.0
+    RECOVERY_FACTOR = 1.25
+    RECOVERY_SUCCESSES = 10
+    MIN_RATE = 0.2
+
+    def __init__(self, rate=2, burst=2):
+        self.logger = logging.getLogger(type(self).__name__)
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.last_refill = time.time()
+        self.successes = 0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(.0, now - self.last_refill)
+        self.tokens = min(float(self.burst), self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until it is available.
+        :return: The time spent waiting, in seconds.
+        :rtype: float
+        """
+        with self._lock:
+            self._refill(time.time())
+            # a negative balance reserves the token for this caller
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else .0
+
+        if wait > 0:
+            sleep(wait, delta=0)
+        return wait
+
+    def on_success(self):
+        with self._lock:
+            self.successes += 1
+            if self.successes < self.RECOVERY_SUCCESSES or self.rate >= self.max_rate:
+                return
+            self.successes = 0
+            self.rate = min(self.max_rate, self.rate * self.RECOVERY_FACTOR)
+        self.logger.debug('API request rate raised to %.2f/s', self.rate)
+
+    def on_throttled(self):
+        with self._lock:
+            self.successes = 0
+            self.throttled_count += 1
+            self.rate = max(self.MIN_RATE, self.rate / self.BACKOFF_FACTOR)
+            # drop any saved burst, next request waits a full interval
+            self.tokens = min(self.tokens, .0)
+        self.logger.debug('API request rate lowered to %.2f/s', self.rate)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.max_rate = rate
+            self.rate = rate
+
+
 class ApiWrapper(PGoApi, object):
     DEVICE_ID = None
 
@@ -64,6 +138,16 @@ class ApiWrapper(PGoApi, object):
 
         self.useVanillaRequest = False
 
+        # shared by every request created by this wrapper
+        self.rate_limiter = RateLimiter(
+            rate=getattr(self.config, 'api_requests_per_second', 2),
+            burst=getattr(self.config, 'api_burst_size', 2)
+        )
+
+        # sub-requests waiting to be sent along with the next request
+        self._queued_requests = OrderedDict()
+        self._queue_lock = threading.Lock()
+
     def gen_device_id(self):
         if self.config is None or self.config.username is None:
             ApiWrapper.DEVICE_ID = "3d65919ca1c2fc3a8e2bd7cc3f974c34"
@@ -104,6 +188,70 @@ class ApiWrapper(PGoApi, object):
             self._position_alt
         )
 
+    def queue_request(self, method, callback=None, **kwargs):
+        """
+        Registers a sub-request to be sent with the next flush_requests() call.
+        Queueing the same method twice replaces the previous entry.
+        :param method: Request method name, like 'get_inventory'.
+        :type method: str
+        :param callback: Called with the whole response once it is received.
+        :type callback: callable
+        :return: Nothing.
+        :rtype: None
+        """
+        with self._queue_lock:
+            self._queued_requests.pop(method, None)
+            self._queued_requests[method] = (kwargs, callback)
+
+    def is_request_queued(self, method):
+        with self._queue_lock:
+            return method in self._queued_requests
+
+    def flush_requests(self, request=None, methods=None):
+        """
+        Sends the queued sub-requests in one call, along with the ones already
+        chained on `request` if given, then hands the response to every
+        queued callback.
+        :param request: Request to piggyback the queued sub-requests on.
+        :type request: ApiRequest
+        :param methods: Only flush these methods, default is all of them.
+        :type methods: list of str
+        :return: The response, or None if there was nothing to send.
+        :rtype: dict
+        """
+        with self._queue_lock:
+            if methods is None:
+                queued = self._queued_requests
+                self._queued_requests = OrderedDict()
+            else:
+                queued = OrderedDict(
+                    (method, self._queued_requests.pop(method))
+                    for method in methods if method in self._queued_requests
+                )
+
+        if request is None:
+            if not queued:
+                return None
+            request = self.create_request()
+
+        for method, (kwargs, _) in queued.items():
+            getattr(request, method)(**kwargs)
+
+        try:
+            response = request.call()
+        except Exception:
+            # keep them for the next flush
+            with self._queue_lock:
+                for method, entry in queued.items():
+                    self._queued_requests.setdefault(method, entry)
+            raise
+
+        for _, (_, callback) in queued.items():
+            if callback is not None:
+                callback(response)
+
+        return response
+
     def login(self, provider, username, password):
         # login needs base class "create_request"
         officalAPI = float(0.0)
@@ -165,8 +313,16 @@ class ApiRequest(PGoApiRequest):
         PGoApiRequest.__init__(self, *args)
         self.logger = logging.getLogger(__name__)
         self.request_callers = []
-        self.last_api_request_time = None
-        self.requests_per_seconds = 2
+        # the first argument is the ApiWrapper creating this request
+        self.rate_limiter = getattr(args[0], 'rate_limiter', None) or RateLimiter()
+
+    @property
+    def requests_per_seconds(self):
+        return self.rate_limiter.max_rate
+
+    @requests_per_seconds.setter
+    def requests_per_seconds(self, value):
+        self.rate_limiter.set_rate(value)
 
     def can_call(self):
         if not self._req_method_list:
@@ -221,19 +377,19 @@ class ApiRequest(PGoApiRequest):
         if not self.can_call():
             return False  # currently this is never ran, exceptions are raised before
 
-        request_timestamp = None
         api_req_method_list = self._req_method_list
         result = None
         try_cnt = 0
         throttling_retry = 0
         unexpected_response_retry = 0
         while True:
-            request_timestamp = self.throttle_sleep()
+            self.throttle_sleep()
             # self._call internally clear this field, so save it
             self._req_method_list = [req_method for req_method in api_req_method_list]
             should_throttle_retry = False
             should_unexpected_response_retry = False
             try:
+                record_api_call()
                 result = self._call()
             except ServerSideRequestThrottlingException:
                 should_throttle_retry = True
@@ -244,7 +400,8 @@ class ApiRequest(PGoApiRequest):
                 throttling_retry += 1
                 if throttling_retry >= max_retry:
                     raise ServerSideRequestThrottlingException('Server throttled too many times')
-                sleep(1)  # huge sleep ?
+                # slowing the shared rate down paces the retry as well
+                self.rate_limiter.on_throttled()
                 continue  # skip response checking
 
             if should_unexpected_response_retry:
@@ -268,7 +425,7 @@ class ApiRequest(PGoApiRequest):
             else:
                 break
 
-        self.last_api_request_time = request_timestamp
+        self.rate_limiter.on_success()
         return result
 
     def __getattr__(self, func):
@@ -277,13 +434,4 @@ class ApiRequest(PGoApiRequest):
         return PGoApiRequest.__getattr__(self, func)
 
     def throttle_sleep(self):
-        now_milliseconds = time.time() * 1000
-        required_delay_between_requests = 1000 / self.requests_per_seconds
-
-        difference = now_milliseconds - (self.last_api_request_time if self.last_api_request_time else 0)
-
-        if self.last_api_request_time != None and difference < required_delay_between_requests:
-            sleep_time = required_delay_between_requests - difference
-            time.sleep(sleep_time / 1000)
-
-        return now_milliseconds
+        return self.rate_limiter.acquire()
@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-import math
 import time
 from geopy.distance import great_circle
 
+from pokemongo_bot import geo
 from pokemongo_bot.base_task import BaseTask
-from pokemongo_bot.cell_workers.utils import coord2merc, merc2coord
+from pokemongo_bot.clustering import FortClusters
 from pokemongo_bot.constants import Constants
 from pokemongo_bot.walkers.polyline_walker import PolylineWalker
 from pokemongo_bot.worker_result import WorkerResult
@@ -25,7 +25,7 @@ class CampFort(BaseTask):
         super(CampFort, self).__init__(bot, config)
 
     def initialize(self):
-        self.clusters = None
+        self.clusters = FortClusters(Constants.MAX_DISTANCE_FORT_IS_REACHABLE)
         self.cluster = None
         self.walker = None
         self.stay_until = 0
@@ -81,13 +81,10 @@ class CampFort(BaseTask):
         forts = self.get_forts()
 
         if self.cluster is None:
-            if self.clusters is None:
-                self.clusters = self.get_clusters(forts.values())
+            cluster = self.get_best_cluster(forts)
 
-            available_clusters = self.get_available_clusters(forts)
-
-            if len(available_clusters) > 0:
-                self.cluster = available_clusters[0]
+            if cluster is not None:
+                self.cluster = cluster
                 self.walker = PolylineWalker(self.bot, self.cluster["center"][0], self.cluster["center"][1])
 
                 self.no_log_until = now + LOG_TIME_INTERVAL
@@ -132,124 +129,17 @@ class CampFort(BaseTask):
         radius = self.config_max_distance + Constants.MAX_DISTANCE_FORT_IS_REACHABLE
 
         forts = [f for f in self.bot.cell["forts"] if ("latitude" in f) and ("type" in f)]
-        forts = [f for f in forts if self.get_distance(self.bot.start_position, f) <= radius]
+        in_range = geo.distances(self.bot.start_position, forts) <= radius
+        forts = [f for f, near in zip(forts, in_range) if near]
 
         return {f["id"]: f for f in forts}
 
-    def get_available_clusters(self, forts):
-        for cluster in self.clusters:
-            self.update_cluster_distance(cluster)
-            self.update_cluster_lured(cluster, forts)
-
-        available_clusters = [c for c in self.clusters if c["lured"] >= self.config_min_lured_forts_count]
-        available_clusters = [c for c in available_clusters if c["size"] >= self.config_min_forts_count]
-        available_clusters.sort(key=lambda c: self.get_cluster_key(c), reverse=True)
-
-        return available_clusters
-
-    def get_clusters(self, forts):
-        clusters = []
-        points = self.get_all_snap_points(forts)
-
-        for c1, c2, fort1, fort2 in points:
-            cluster_1 = self.get_cluster(forts, c1)
-            cluster_2 = self.get_cluster(forts, c2)
-
-            self.update_cluster_distance(cluster_1)
-            self.update_cluster_distance(cluster_2)
-
-            key_1 = self.get_cluster_key(cluster_1)
-            key_2 = self.get_cluster_key(cluster_2)
-
-            radius = Constants.MAX_DISTANCE_FORT_IS_REACHABLE
-
-            if key_1 >= key_2:
-                cluster = cluster_1
-
-                while True:
-                    new_circle, _ = self.get_enclosing_circles(fort1, fort2, radius - 1)
-
-                    if not new_circle:
-                        break
-
-                    new_cluster = self.get_cluster(cluster["forts"], new_circle)
-
-                    if len(new_cluster["forts"]) < len(cluster["forts"]):
-                        break
-
-                    cluster = new_cluster
-                    radius -= 1
-            else:
-                cluster = cluster_2
-
-                while True:
-                    _, new_circle = self.get_enclosing_circles(fort1, fort2, radius - 1)
-
-                    if not new_circle:
-                        break
-
-                    new_cluster = self.get_cluster(cluster["forts"], new_circle)
-
-                    if len(new_cluster["forts"]) < len(cluster["forts"]):
-                        break
-
-                    cluster = new_cluster
-                    radius -= 1
-
-            clusters.append(cluster)
-
-        return clusters
-
-    def get_all_snap_points(self, forts):
-        points = []
-        radius = Constants.MAX_DISTANCE_FORT_IS_REACHABLE
-
-        for i in range(0, len(forts)):
-            for j in range(i + 1, len(forts)):
-                c1, c2 = self.get_enclosing_circles(forts[i], forts[j], radius)
-
-                if c1 and c2:
-                    points.append((c1, c2, forts[i], forts[j]))
-
-        return points
-
-    def get_enclosing_circles(self, fort1, fort2, radius):
-        x1, y1 = coord2merc(fort1["latitude"], fort1["longitude"])
-        x2, y2 = coord2merc(fort2["latitude"], fort2["longitude"])
-        dx = x2 - x1
-        dy = y2 - y1
-        d = math.sqrt(dx ** 2 + dy ** 2)
-
-        if (d == 0) or (d > 2 * radius):
-            return None, None
-
-        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-        cd = math.sqrt(radius ** 2 - (d / 2) ** 2)
-
-        c1 = merc2coord((cx - cd * dy / d, cy + cd * dx / d)) + (radius,)
-        c2 = merc2coord((cx + cd * dy / d, cy - cd * dx / d)) + (radius,)
-
-        return c1, c2
-
-    def get_cluster(self, forts, circle):
-        forts_in_circle = [f for f in forts if self.get_distance(circle, f) <= circle[2]]
-
-        cluster = {"center": (circle[0], circle[1]),
-                   "distance": 0,
-                   "forts": forts_in_circle,
-                   "size": len(forts_in_circle),
-                   "lured": sum(1 for f in forts_in_circle if f.get("active_fort_modifier", None) is not None)}
-
-        return cluster
-
-    def get_cluster_key(self, cluster):
-        return (cluster["lured"], cluster["size"], -cluster["distance"])
+    def get_best_cluster(self, forts):
+        self.clusters.update(forts, self.bot.position)
+        return self.clusters.best(self.bot.position, self.config_min_lured_forts_count, self.config_min_forts_count)
 
     def update_cluster_distance(self, cluster):
         cluster["distance"] = great_circle(self.bot.position, cluster["center"]).meters
 
     def update_cluster_lured(self, cluster, forts):
         cluster["lured"] = sum(1 for f in cluster["forts"] if forts.get(f["id"], {}).get("active_fort_modifier", None) is not None)
-
-    def get_distance(self, location, fort):
-        return great_circle(location, (fort["latitude"], fort["longitude"])).meters
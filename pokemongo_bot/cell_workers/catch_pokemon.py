@@ -2,7 +2,6 @@
 from __future__ import unicode_literals
 from __future__ import absolute_import
 
-import json
 import os
 import random
 
@@ -11,7 +10,7 @@ from pokemongo_bot.cell_workers.pokemon_catch_worker import PokemonCatchWorker
 from pokemongo_bot.worker_result import WorkerResult
 from pokemongo_bot.item_list import Item
 from pokemongo_bot import inventory
-from .utils import fort_details, distance,  format_time
+from .utils import fort_details, format_time
 from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.constants import Constants
 from pokemongo_bot.inventory import Pokemons
@@ -101,8 +100,7 @@ class CatchPokemon(BaseTask):
                 user_web_catchable = os.path.join(_base_dir, 'web', 'catchable-{}.json'.format(self.bot.config.username))
             for pokemon in pokemon_to_catch:
                 # Update web UI
-                with open(user_web_catchable, 'w') as outfile:
-                    json.dump(pokemon, outfile)
+                self.bot.web_state.write(user_web_catchable, pokemon)
 
                 self.emit_event(
                     'catchable_pokemon',
@@ -125,25 +123,13 @@ class CatchPokemon(BaseTask):
                 self.add_pokemon(pokemon)
 
     def get_lured_pokemon(self):
-        forts_in_range = []
-        forts = self.bot.get_forts(order_by_distance=False)
-
-        if len(forts) == 0:
-            return []
-
-        for fort in forts:
-            distance_to_fort = distance(
-                self.bot.position[0],
-                self.bot.position[1],
-                fort['latitude'],
-                fort['longitude']
-            )
-
-            # See if we have an encounter at this fort
-            encounter_id = fort.get('lure_info', {}).get('encounter_id', None)
-            if distance_to_fort < Constants.MAX_DISTANCE_FORT_IS_REACHABLE and encounter_id:
-                forts_in_range.append(fort)
-
+        # See if we have an encounter at a fort in range
+        forts_in_range = self.bot.get_fort_index().within(
+            self.bot.position[0],
+            self.bot.position[1],
+            Constants.MAX_DISTANCE_FORT_IS_REACHABLE,
+            predicate=lambda fort: fort.get('lure_info', {}).get('encounter_id', None)
+        )
 
         for fort in forts_in_range:
             details = fort_details(self.bot, fort_id=fort['id'],
@@ -200,23 +200,12 @@ class EvolvePokemon(BaseTask):
             sleep(0.7)
             evolve_result = False
 
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='evolve_log'")
-
-        result = c.fetchone()
-
-        while True:
-            if result[0] == 1:
-                conn.execute('''INSERT INTO evolve_log (pokemon, iv, cp) VALUES (?, ?, ?)''', (pokemon.name, pokemon.iv, pokemon.cp))
-                break
-            else:
-                self.emit_event(
-                    'evolve_log',
-                    sender=self,
-                    level='info',
-                    formatted="evolve_log table not found, skipping log"
-                )
-                break
+        if not self.bot.action_log.log_evolve(pokemon.name, pokemon.iv, pokemon.cp):
+            self.emit_event(
+                'evolve_log',
+                sender=self,
+                level='info',
+                formatted="evolve_log table not found, skipping log"
+            )
 
         return evolve_result
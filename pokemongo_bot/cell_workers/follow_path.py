@@ -10,6 +10,7 @@ from pokemongo_bot.cell_workers.utils import distance
 from pokemongo_bot.cell_workers.utils import format_dist
 from pokemongo_bot.cell_workers.utils import i2f
 from pokemongo_bot.human_behaviour import sleep
+from pokemongo_bot.walkers.route_plan import PlanWalker, RoutePlan
 from pokemongo_bot.walkers.walker_factory import walker_factory
 from pokemongo_bot.worker_result import WorkerResult
 from pgoapi.utilities import f2i
@@ -27,18 +28,22 @@ class FollowPath(BaseTask):
 
     def initialize(self):
         self._process_config()
-        self.points = self.load_path()
+        # @var RoutePlan
+        self.plan = self.load_path()
         self.status = STATUS_MOVING
         self.waiting_end_time = 0
         self.distance_unit = self.bot.config.distance_unit
         self.append_unit = False
 
         if self.path_start_mode == 'closest':
-            self.ptr = self.find_closest_point_idx(self.points)
+            self.ptr = self.find_closest_point_idx(self.plan)
 
         else:
             self.ptr = 0
 
+        # the StepWalker is kept along the path, the other walkers only go from a point to the next
+        self.plan_walker = PlanWalker(self.bot, self.plan, self.ptr, self._get_alt(self.ptr))
+
     def _process_config(self):
         self.path_file = self.config.get("path_file", None)
         self.path_mode = self.config.get("path_mode", "linear")
@@ -82,7 +87,7 @@ class FollowPath(BaseTask):
             point["lat"] = float(point_tuple[0])
             point["lng"] = float(point_tuple[1])
             point["alt"] = float(point_tuple[2])
-        return points
+        return RoutePlan.from_points(points)
 
     def load_gpx(self):
         gpx_file = open(self.path_file, 'r')
@@ -91,36 +96,23 @@ class FollowPath(BaseTask):
         if len(gpx.tracks) == 0:
             raise RuntimeError('GPX file does not contain a track')
 
-        points = []
         track = gpx.tracks[0]
-        for segment in track.segments:
-            for point in segment.points:
-                points.append({"lat": point.latitude, "lng": point.longitude,
-                    "alt": point.elevation, "location": point.name})
-
-        return points
+        points = [point for segment in track.segments for point in segment.points]
 
-    def find_closest_point_idx(self, points):
-        return_idx = 0
-        min_distance = float("inf");
-        
-        for index in range(len(points)):
-            point = points[index]
-            lat = point['lat']
-            lng = point['lng']
-
-            dist = distance(
-                self.bot.position[0],
-                self.bot.position[1],
-                lat,
-                lng
-            )
+        return RoutePlan([point.latitude for point in points],
+                         [point.longitude for point in points],
+                         [point.elevation for point in points],
+                         [point.name for point in points])
 
-            if dist < min_distance:
-                min_distance = dist
-                return_idx = index
+    def find_closest_point_idx(self, plan):
+        return plan.closest(self.bot.position[0], self.bot.position[1])
 
-        return return_idx
+    def _get_alt(self, index):
+        alt = self.plan.alts[index]
+        if alt != alt:
+            # NaN, the point has no altitude
+            return uniform(self.bot.config.alt_min, self.bot.config.alt_max)
+        return float(alt)
 
     def endLaps(self):
         duration = int(uniform(self.timer_restart_min, self.timer_restart_max))
@@ -152,29 +144,29 @@ class FollowPath(BaseTask):
 
         last_lat, last_lng, last_alt = self.bot.position
 
-        point = self.points[self.ptr]
+        point = self.plan.point(self.ptr)
         lat = point['lat']
         lng = point['lng']
 
-        if 'alt' in point:
-            alt = float(point['alt'])
-        else:
-            alt = uniform(self.bot.config.alt_min, self.bot.config.alt_max)
-
         if self.bot.config.walk_max > 0:
-            step_walker = walker_factory(self.walker,
-                self.bot,
-                lat,
-                lng,
-                alt
-            )
+            if self.walker == 'StepWalker':
+                step_walker = self.plan_walker
+                if step_walker.target != self.ptr:
+                    step_walker.walk_to(self.ptr, self._get_alt(self.ptr))
+            else:
+                step_walker = walker_factory(self.walker,
+                    self.bot,
+                    lat,
+                    lng,
+                    self._get_alt(self.ptr)
+                )
 
             is_at_destination = False
             if step_walker.step():
                 is_at_destination = True
 
         else:
-            self.bot.api.set_position(lat, lng, alt)
+            self.bot.api.set_position(lat, lng, self._get_alt(self.ptr))
 
         dist = distance(
             last_lat,
@@ -205,13 +197,14 @@ class FollowPath(BaseTask):
                 self.status = STATUS_WANDERING
                 self.waiting_end_time = time.time() + point["wander"]
                 return WorkerResult.SUCCESS
-            if (self.ptr + 1) == len(self.points):
+            if (self.ptr + 1) == len(self.plan):
                 if self.path_mode == 'single':
                     self.status = STATUS_FINISHED
                     return WorkerResult.SUCCESS
                 self.ptr = 0
                 if self.path_mode == 'linear':
-                    self.points = list(reversed(self.points))
+                    self.plan = self.plan.reversed()
+                    self.plan_walker.set_plan(self.plan, self.ptr, self._get_alt(self.ptr))
                 if self.number_lap_max >= 0:
                     self.number_lap+=1
                     self.emit_event(
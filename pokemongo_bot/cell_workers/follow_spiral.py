@@ -1,10 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
-from itertools import cycle
 import math
 
-from pokemongo_bot.walkers.step_walker import StepWalker
+from pokemongo_bot.walkers.route_plan import PlanWalker, RoutePlan
 from pokemongo_bot.base_task import BaseTask
 
 class FollowSpiral(BaseTask):
@@ -20,8 +19,9 @@ class FollowSpiral(BaseTask):
         self.spiral = self._generate_spiral(
             self.origin_lat, self.origin_lon, self.step_size, self.diameter_to_steps
         )
-        self.points = cycle(self.spiral+list(reversed(self.spiral))[1:-1])
-        self.next_point = None
+        # @var RoutePlan
+        self.plan = RoutePlan.from_points(self.spiral+list(reversed(self.spiral))[1:-1])
+        self.walker = PlanWalker(self.bot, self.plan)
 
     @staticmethod
     def _generate_spiral(starting_lat, starting_lng, step_size, step_limit):
@@ -63,10 +63,8 @@ class FollowSpiral(BaseTask):
         return coords
 
     def work(self):
-        if not self.next_point:
-            self.next_point = next(self.points)
-        point = self.next_point
-        step_walker = StepWalker(self.bot, point['lat'], point['lng'])
-        if step_walker.step():
-            self.next_point = None
+        point = self.plan.point(self.walker.target)
+        if self.walker.step():
+            # the last point is next to the first one, start over from there
+            self.walker.walk_to((self.walker.target + 1) % len(self.plan))
         return [point['lat'], point['lng']]
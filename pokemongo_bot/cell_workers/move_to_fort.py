@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 from pokemongo_bot import inventory
 from pokemongo_bot.constants import Constants
+from pokemongo_bot.walkers.polyline_generator import PolylineObjectHandler
 from pokemongo_bot.walkers.walker_factory import walker_factory
 from pokemongo_bot.worker_result import WorkerResult
 from pokemongo_bot.base_task import BaseTask
@@ -22,6 +23,8 @@ class MoveToFort(BaseTask):
         self.walker = self.config.get('walker', 'StepWalker')
         self.wait_at_fort = self.config.get('wait_on_lure', False)
         self.wait_log_sent = None
+        self.prefetch_routes = self.config.get('prefetch_routes', 2)
+        self.prefetched_fort_id = None
 
     def should_run(self):
         has_space_for_loot = inventory.Items.has_space_for_loot()
@@ -88,6 +91,8 @@ class MoveToFort(BaseTask):
                     data=fort_event_data
                 )
 
+            self.prefetch_next_routes(nearest_fort)
+
             step_walker = walker_factory(self.walker,
                 self.bot,
                 lat,
@@ -112,17 +117,38 @@ class MoveToFort(BaseTask):
 
         return WorkerResult.RUNNING
 
-    def _get_nearest_fort_on_lure_way(self, forts):
+    def prefetch_next_routes(self, fort):
+        """
+        Gets the routes from the fort to the ones nearest to it in the background,
+        they are likely to be the next ones once it is spun.
+        """
+        if self.walker != 'PolylineWalker' or not self.prefetch_routes or fort['id'] == self.prefetched_fort_id:
+            return
+        self.prefetched_fort_id = fort['id']
+
+        origin = (fort['latitude'], fort['longitude'])
+        next_forts = self.bot.get_fort_index().nearest(
+            origin[0], origin[1], k=self.prefetch_routes,
+            predicate=lambda x: x['id'] != fort['id'] and x['id'] not in self.bot.fort_timeouts
+        )
+        PolylineObjectHandler.prefetch([(origin, (x['latitude'], x['longitude'])) for x in next_forts],
+                                       google_map_api_key=self.bot.config.gmapkey)
+
+    def _get_nearest_fort_on_lure_way(self, available):
         if not self.lure_attraction:
             return None, 0
 
-        lures = filter(lambda x: True if x.get('lure_info', None) != None else False, forts)
         if not self.bot.catch_disabled and self.wait_at_fort:
-            lures = filter(lambda x: x.get('active_fort_modifier', False), forts)
+            is_lure = lambda x: x.get('active_fort_modifier', False)
+        else:
+            is_lure = lambda x: True if x.get('lure_info', None) != None else False
+
+        fort_index = self.bot.get_fort_index()
+        lat, lng = self.bot.position[0:2]
+        lures = fort_index.nearest(lat, lng, k=1, predicate=lambda x: available(x) and is_lure(x))
 
         if len(lures):
-            dist_lure_me = distance(self.bot.position[0], self.bot.position[1],
-                                    lures[0]['latitude'],lures[0]['longitude'])
+            dist_lure_me = distance(lat, lng, lures[0]['latitude'], lures[0]['longitude'])
         else:
             dist_lure_me = 0
 
@@ -130,7 +156,7 @@ class MoveToFort(BaseTask):
 
             self.lure_distance = dist_lure_me
 
-            for fort in forts:
+            for fort in fort_index.within(lat, lng, dist_lure_me, predicate=available):
                 dist_lure_fort = distance(
                     fort['latitude'],
                     fort['longitude'],
@@ -139,15 +165,12 @@ class MoveToFort(BaseTask):
                 dist_fort_me = distance(
                     fort['latitude'],
                     fort['longitude'],
-                    self.bot.position[0],
-                    self.bot.position[1])
+                    lat,
+                    lng)
 
                 if dist_lure_fort < dist_lure_me and dist_lure_me > dist_fort_me:
                     return fort, dist_lure_me
 
-                if dist_fort_me > dist_lure_me:
-                    break
-
             return lures[0], dist_lure_me
 
         else:
@@ -155,26 +178,28 @@ class MoveToFort(BaseTask):
 
     def get_nearest_fort(self):
         nearest_fort = []
-        forts = self.bot.get_forts(order_by_distance=True)
         # Remove stops that are still on timeout
-        forts = filter(
-            lambda x: x["id"] not in self.bot.fort_timeouts or (
-                x.get('active_fort_modifier', False) and self.wait_at_fort and not self.bot.catch_disabled
-            ),
-            forts
+        available = lambda x: x["id"] not in self.bot.fort_timeouts or (
+            x.get('active_fort_modifier', False) and self.wait_at_fort and not self.bot.catch_disabled
         )
 
-        next_attracted_pts, lure_distance = self._get_nearest_fort_on_lure_way(forts)
+        next_attracted_pts, lure_distance = self._get_nearest_fort_on_lure_way(available)
 
         # Remove all forts which were spun in the last ticks to avoid circles if set
+        predicate = available
         if self.bot.config.forts_avoid_circles or not self.wait_at_fort or self.bot.catch_disabled:
-            forts = filter(lambda x: x["id"] not in self.bot.recent_forts, forts)
+            predicate = lambda x: available(x) and x["id"] not in self.bot.recent_forts
 
         self.lure_distance = lure_distance
 
         if (lure_distance > 0):
             return next_attracted_pts
 
+        # only the 3 nearest are needed to detect bouncing between forts
+        forts = self.bot.get_fort_index().nearest(
+            self.bot.position[0], self.bot.position[1], k=3, predicate=predicate
+        )
+
         if len(forts) >= 3:
             # Get ID of fort, store it. Check index 0 & index 2. Both must not be same
             nearest_fort = forts[0]
@@ -56,17 +56,16 @@ Events:
 
 from __future__ import unicode_literals
 
-import os
 import time
-import json
+from math import sqrt
 import requests
 
 from pokemongo_bot import inventory
-from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.cell_workers.utils import distance, format_dist, format_time, fort_details
 from pokemongo_bot.walkers.walker_factory import walker_factory
 from pokemongo_bot.worker_result import WorkerResult
 from pokemongo_bot.base_task import BaseTask
+from pokemongo_bot.json_stream import iter_response_items
 from pokemongo_bot.cell_workers.pokemon_catch_worker import PokemonCatchWorker
 from random import uniform
 from pokemongo_bot.constants import Constants
@@ -85,7 +84,6 @@ class MoveToMapPokemon(BaseTask):
         self.last_map_update = 0
         self.pokemon_data = self.bot.pokemon_list
         self.unit = self.bot.config.distance_unit
-        self.cache = []
         self.min_ball = self.config.get('min_ball', 1)
         self.map_path = self.config.get('map_path', 'raw_data')
         self.walker = self.config.get('walker', 'StepWalker')
@@ -94,11 +92,6 @@ class MoveToMapPokemon(BaseTask):
         self.snipe_high_prio_threshold = self.config.get('snipe_high_prio_threshold', 400)
         self.by_pass_times = 0
 
-        data_file = os.path.join(_base_dir, 'map-caught-{}.json'.format(self.bot.config.username))
-        if os.path.isfile(data_file):
-            self.cache = json.load(
-                open(data_file)
-            )
         self.alt = uniform(self.bot.config.alt_min, self.bot.config.alt_max)
         self.debug = self.config.get('debug', False)
 
@@ -168,9 +161,10 @@ class MoveToMapPokemon(BaseTask):
         return self.pokemons_parser(tmp_pokemon_list)
 
     def get_pokemon_from_url(self):
+        # Map feeds can be several MB, parse and filter the pokemons one at a time as they arrive
         try:
-            request = requests.get(self.config['address'])
-            response = request.json()
+            request = requests.get(self.config['address'], stream=True)
+            return self.pokemons_parser(iter_response_items(request, 'pokemons'))
         except requests.exceptions.ConnectionError:
             self._emit_failure('Could not get data from {}'.format(self.config['address']))
             return []
@@ -178,34 +172,12 @@ class MoveToMapPokemon(BaseTask):
             self._emit_failure('JSON format is not valid')
             return []
 
-        return self.pokemons_parser(response.get('pokemons', []))
-
-    # TODO: refactor
     def is_inspected(self, pokemon):
-        for caught_pokemon in self.cache:
-            # Since IDs might be invalid (null/blank) by this time, compare by approximate location
-            # TODO: make a better comparision
-            same_latitude = "{0:.4f}".format(pokemon['latitude']) == "{0:.4f}".format(caught_pokemon['latitude'])
-            same_longitude = "{0:.4f}".format(pokemon['longitude']) == "{0:.4f}".format(caught_pokemon['longitude'])
-            if same_latitude and same_longitude:
-                return True
-
-        return False
-
-    # Stores a target so that
-    # TODO: refactor
-    def inspect(self, pokemon):
-        # Make sure it was not caught!
-        for caught_pokemon in self.cache:
-            same_latitude = "{0:.4f}".format(pokemon['latitude']) == "{0:.4f}".format(caught_pokemon['latitude'])
-            same_longitude = "{0:.4f}".format(pokemon['longitude']) == "{0:.4f}".format(caught_pokemon['longitude'])
-            if same_latitude and same_longitude:
-                return
-
-        if len(self.cache) >= 200:
-            self.cache.pop(0)
+        return self.bot.seen_targets.contains(pokemon)
 
-        self.cache.append(pokemon)
+    # Stores a target so that it is not moved to / sniped again
+    def inspect(self, pokemon):
+        self.bot.seen_targets.add(pokemon)
 
     def snipe(self, pokemon):
         # Backup position before anything
@@ -274,9 +246,7 @@ class MoveToMapPokemon(BaseTask):
         return WorkerResult.SUCCESS
 
     def dump_caught_pokemon(self):
-        user_data_map_caught = os.path.join(_base_dir, 'data', 'map-caught-{}.json'.format(self.bot.config.username))
-        with open(user_data_map_caught, 'w') as outfile:
-            json.dump(self.cache, outfile)
+        self.bot.seen_targets.save()
 
     def work(self):
         # check for pokeballs (excluding masterball)
@@ -497,25 +467,32 @@ class MoveToMapPokemon(BaseTask):
         return walker_factory(self.walker, self.bot, lat, lng)
 
     def get_nearest_fort_on_the_way(self, pokemon):
-        forts = self.bot.get_forts(order_by_distance=True)
-
-        # Remove stops that are still on timeout
-        forts = filter(lambda x: x["id"] not in self.bot.fort_timeouts, forts)
-        i = 0
-        while i < len(forts):
-            ratio = float(self.config.get('max_extra_dist_fort', 20))
-            dist_self_to_fort = distance(self.bot.position[0], self.bot.position[1], forts[i]['latitude'],
-                                         forts[i]['longitude'])
-            dist_fort_to_pokemon = distance(pokemon['latitude'], pokemon['longitude'], forts[i]['latitude'],
-                                            forts[i]['longitude'])
-            total_dist = dist_self_to_fort + dist_fort_to_pokemon
-            dist_self_to_pokemon = distance(self.bot.position[0], self.bot.position[1], pokemon['latitude'],
-                                            pokemon['longitude'])
-            if total_dist < (1 + (ratio / 100)) * dist_self_to_pokemon:
-                i += 1
-            else:
-                del forts[i]
-            # Return nearest fort if there are remaining
+        ratio = float(self.config.get('max_extra_dist_fort', 20))
+        dist_self_to_pokemon = distance(self.bot.position[0], self.bot.position[1], pokemon['latitude'],
+                                        pokemon['longitude'])
+        max_total_dist = (1 + (ratio / 100)) * dist_self_to_pokemon
+
+        def on_the_way(fort):
+            # Remove stops that are still on timeout
+            if fort["id"] in self.bot.fort_timeouts:
+                return False
+            dist_self_to_fort = distance(self.bot.position[0], self.bot.position[1], fort['latitude'],
+                                         fort['longitude'])
+            dist_fort_to_pokemon = distance(pokemon['latitude'], pokemon['longitude'], fort['latitude'],
+                                            fort['longitude'])
+            return dist_self_to_fort + dist_fort_to_pokemon < max_total_dist
+
+        # The allowed detour is an ellipse around the way to the pokemon,
+        # it fits in the band of its semi-minor axis along the way.
+        width = sqrt(max(max_total_dist ** 2 - dist_self_to_pokemon ** 2, 0)) / 2
+        forts = self.bot.get_fort_index().along_segment(
+            self.bot.position[0:2],
+            (pokemon['latitude'], pokemon['longitude']),
+            width,
+            predicate=on_the_way
+        )
+
+        # Return nearest fort if there are remaining
         if len(forts):
             return forts[0]
         else:
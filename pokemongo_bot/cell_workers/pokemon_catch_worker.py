@@ -197,15 +197,10 @@ class PokemonCatchWorker(BaseTask):
             self.emit_event('vip_pokemon', formatted='This is a VIP pokemon. Catch!!!')
 
         # check catch limits before catch
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT DISTINCT COUNT(encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")
-
-        result = c.fetchone()
-
+        caught_last_24_hour = self.bot.action_log.count_last_day('catch_log')
 
         while True:
-            if result[0] < self.daily_catch_limit:
+            if caught_last_24_hour < self.daily_catch_limit:
             # catch that pokemon!
                 encounter_id = self.pokemon['encounter_id']
                 catch_rate_by_ball = [0] + response['capture_probability']['capture_probability']  # offset so item ids match indces
@@ -419,18 +414,9 @@ class PokemonCatchWorker(BaseTask):
                     level='warning',
                     formatted='Failed to use berry. You may be softbanned.'
                 )
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='softban_log'")
-                result = c.fetchone()
-
-                while True:
-                    if result[0] == 1:
-                        source = str("PokemonCatchWorker")
-                        status = str("Possible Softban")
-                        conn.execute('''INSERT INTO softban_log (status, source) VALUES (?, ?)''', (status, source))
-                    break
-                else:
+                source = str("PokemonCatchWorker")
+                status = str("Possible Softban")
+                if not self.bot.action_log.log_softban(status, source):
                     self.emit_event(
                         'softban_log',
                         sender=self,
@@ -591,23 +577,13 @@ class PokemonCatchWorker(BaseTask):
             # abandon if pokemon vanished
             elif catch_pokemon_status == CATCH_STATUS_VANISHED:
                 #insert into DB
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='vanish_log'")
-                result = c.fetchone()
-
-                while True:
-                    if result[0] == 1:
-                        conn.execute('''INSERT INTO vanish_log (pokemon, cp, iv, encounter_id, pokemon_id) VALUES (?, ?, ?, ?, ?)''', (pokemon.name, pokemon.cp, pokemon.iv, str(encounter_id), pokemon.pokemon_id))
-                    break
-                else:
+                if not self.bot.action_log.log_vanish(pokemon.name, pokemon.cp, pokemon.iv, encounter_id, pokemon.pokemon_id):
                     self.emit_event(
                         'vanish_log',
                         sender=self,
                         level='info',
                         formatted="vanish_log table not found, skipping log"
                     )
-                    break
 
                 self.emit_event(
                     'pokemon_vanished',
@@ -621,6 +597,7 @@ class PokemonCatchWorker(BaseTask):
                     }
                 )
 
+                self.bot.action_log.flush()
                 with self.bot.database as conn:
                     c = conn.cursor()
                     c.execute("SELECT DISTINCT COUNT(encounter_id) FROM vanish_log WHERE dated > (SELECT dated FROM catch_log WHERE dated IN (SELECT MAX(dated) FROM catch_log))")
@@ -643,12 +620,7 @@ class PokemonCatchWorker(BaseTask):
 
                 awards = response_dict['responses']['CATCH_POKEMON']['capture_award']
                 exp_gain, candy_gain, stardust_gain = self.extract_award(awards)
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute(
-                        "SELECT DISTINCT COUNT(encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")
-
-                result = c.fetchone()
+                caught_last_24_hour = self.bot.action_log.count_last_day('catch_log')
 
                 if is_vip:
                     self.emit_event(
@@ -666,7 +638,7 @@ class PokemonCatchWorker(BaseTask):
                             'latitude': str(self.pokemon['latitude']),
                             'longitude': str(self.pokemon['longitude']),
                             'pokemon_id': str(pokemon.pokemon_id),
-                            'caught_last_24_hour': str(result[0]),
+                            'caught_last_24_hour': str(caught_last_24_hour),
                             'daily_catch_limit': str(self.daily_catch_limit)
                         }
                     )
@@ -687,7 +659,7 @@ class PokemonCatchWorker(BaseTask):
                             'latitude': str(self.pokemon['latitude']),
                             'longitude': str(self.pokemon['longitude']),
                             'pokemon_id': str(pokemon.pokemon_id),
-                            'caught_last_24_hour': str(result[0]),
+                            'caught_last_24_hour': str(caught_last_24_hour),
                             'daily_catch_limit': str(self.daily_catch_limit)
                         }
                     )
@@ -712,23 +684,13 @@ class PokemonCatchWorker(BaseTask):
 
 
                 try:
-                    with self.bot.database as conn:
-                        c = conn.cursor()
-                        c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='catch_log'")
-                    result = c.fetchone()
-
-                    while True:
-                        if result[0] == 1:
-                            conn.execute('''INSERT INTO catch_log (pokemon, cp, iv, encounter_id, pokemon_id) VALUES (?, ?, ?, ?, ?)''', (pokemon.name, pokemon.cp, pokemon.iv, str(encounter_id), pokemon.pokemon_id))
-                        break
-                    else:
+                    if not self.bot.action_log.log_catch(pokemon.name, pokemon.cp, pokemon.iv, encounter_id, pokemon.pokemon_id):
                         self.emit_event(
                             'catch_log',
                             sender=self,
                             level='info',
                             formatted="catch_log table not found, skipping log"
                         )
-                        break
                     user_data_caught = os.path.join(_base_dir, 'data', 'caught-%s.json' % self.bot.config.username)
                     with open(user_data_caught, 'ab') as outfile:
                         json.dump(OrderedDict({
@@ -6,7 +6,7 @@ import time
 from geopy.distance import great_circle
 from s2sphere import Cell, CellId, LatLng
 
-from pokemongo_bot import inventory
+from pokemongo_bot import geo, inventory
 from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.item_list import Item
 from pokemongo_bot.walkers.polyline_walker import PolylineWalker
@@ -115,10 +115,12 @@ class PokemonHunter(BaseTask):
     def get_nearby_pokemons(self):
         radius = self.config_max_distance
 
-        pokemons = [p for p in self.bot.cell["nearby_pokemons"] if self.get_distance(self.bot.start_position, p) <= radius]
+        pokemons = self.bot.cell["nearby_pokemons"]
+        in_range = geo.distances(self.bot.start_position, pokemons) <= radius
+        pokemons = [p for p, near in zip(pokemons, in_range) if near]
 
-        for pokemon in pokemons:
-            pokemon["distance"] = self.get_distance(self.bot.position, p)
+        for pokemon, distance in zip(pokemons, geo.distances(self.bot.position, pokemons)):
+            pokemon["distance"] = float(distance)
             pokemon["name"] = inventory.pokemons().name_for(pokemon["pokemon_id"])
 
         pokemons.sort(key=lambda p: p["distance"])
@@ -168,7 +170,6 @@ class PokemonHunter(BaseTask):
         point = points.pop(13)
         points.insert(8, point)
 
-        closest = min(points, key=lambda p: great_circle(self.bot.position, p).meters)
-        index = points.index(closest)
+        index = int(geo.argsort_by_distance(self.bot.position, points)[0])
 
         return points[index:] + points[:index]
@@ -1,7 +1,6 @@
 from __future__ import unicode_literals
 
 # import datetime
-import difflib
 import itertools
 import json
 import math
@@ -9,11 +8,15 @@ import os
 import time
 import datetime
 
+import numpy as np
+
 from pokemongo_bot import inventory
 from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.human_behaviour import sleep, action_delay
 from pokemongo_bot.item_list import Item
+from pokemongo_bot.name_lookup import pokemon_names
+from pokemongo_bot.pokemon_table import PokemonTable, best_first
 from pokemongo_bot.tree_config_builder import ConfigException
 from pokemongo_bot.worker_result import WorkerResult
 
@@ -31,7 +34,6 @@ class PokemonOptimizer(BaseTask):
     def initialize(self):
         self.max_pokemon_storage = inventory.get_pokemon_inventory_size()
         self.last_pokemon_count = 0
-        self.pokemon_names = [p.name for p in inventory.pokemons().STATIC_DATA]
         self.evolution_map = {}
         self.debug = self.config.get('debug', False)
         self.ongoing_stardust_count = 0
@@ -39,6 +41,7 @@ class PokemonOptimizer(BaseTask):
         self.buddyid = 0
         self.lock_buddy = True
         self.no_log_until = 0
+        self.table = None
 
         pokemon_upgrade_cost_file = os.path.join(_base_dir, "data", "pokemon_upgrade_cost.json")
 
@@ -281,22 +284,10 @@ class PokemonOptimizer(BaseTask):
                                       "distance_needed": distance_needed})
 
     def open_inventory(self):
-        for pokemon in inventory.pokemons().all():
-            setattr(pokemon, "ncp", pokemon.cp_percent)
-            setattr(pokemon, "max_cp", pokemon.static.max_cp)
-            setattr(pokemon, "dps", pokemon.moveset.dps)
-            setattr(pokemon, "dps1", pokemon.fast_attack.dps)
-            setattr(pokemon, "dps2", pokemon.charged_attack.dps)
-            setattr(pokemon, "dps_attack", pokemon.moveset.dps_attack)
-            setattr(pokemon, "dps_defense", pokemon.moveset.dps_defense)
-            setattr(pokemon, "attack_perfection", pokemon.moveset.attack_perfection)
-            setattr(pokemon, "defense_perfection", pokemon.moveset.defense_perfection)
-            setattr(pokemon, "candy", pokemon.candy_quantity)
-
-            candy_to_evolution = max(pokemon.evolution_cost - pokemon.candy_quantity, 0)
-
-            setattr(pokemon, "candy_to_evolution", candy_to_evolution)
-
+        # the values the rules sort on ("ncp", "dps", "candy"...) are Pokemon properties,
+        # the table reads them once for this run
+        # @var PokemonTable
+        self.table = PokemonTable(inventory.pokemons().all())
         self.ongoing_stardust_count = self.bot.stardust
 
     def get_colorlist(self, names):
@@ -339,13 +330,9 @@ class PokemonOptimizer(BaseTask):
         return [inventory.pokemons().name_for(x) for x in ids]
 
     def get_closest_name(self, name):
-        mapping = {ord(x): ord(y) for x, y in zip("\u2641\u2642.-", "fm  ")}
-        clean_names = {n.lower().translate(mapping): n for n in self.pokemon_names}
-        closest_names = difflib.get_close_matches(name.lower().translate(mapping), clean_names.keys(), 1)
-
-        if closest_names:
-            closest_name = clean_names[closest_names[0]]
+        closest_name = pokemon_names().closest(name)
 
+        if closest_name:
             if name != closest_name:
                 self.logger.warning("Unknown Pokemon name [%s]. Assuming it is [%s]", name, closest_name)
 
@@ -374,13 +361,29 @@ class PokemonOptimizer(BaseTask):
             self.log("Pokemon %s" % pokemon_list)
             self.log("Rule %s" % rule)
 
-        for pokemon in pokemon_list:
-            setattr(pokemon, "__score__", self.get_score(pokemon, rule))
+        if self.table is None:
+            self.table = PokemonTable(pokemon_list)
+
+        rows = self.table.rows(pokemon_list)
+        keys, keep, may_try_evolve, may_try_upgrade, may_buddy = self.table.score(rows, rule)
+        values = [key.tolist() for key in keys]
+        flags = [mask.tolist() for mask in (keep, may_try_evolve, may_try_upgrade, may_buddy)]
+
+        if self.debug:
+            for i, pokemon in enumerate(pokemon_list):
+                score = tuple(value[i] for value in values)
+                self.log("%s %s %s %s %s %s" % ((pokemon, score) + tuple(flag[i] for flag in flags)))
 
-        keep = [p for p in pokemon_list if p.__score__[1] is True]
-        keep.sort(key=lambda p: p.__score__[0], reverse=True)
+        kept = np.flatnonzero(keep)
+        sorted_list = []
 
-        return keep
+        for i in kept[best_first([key[kept] for key in keys], len(kept))].tolist():
+            pokemon = pokemon_list[i]
+            score = tuple(value[i] for value in values)
+            setattr(pokemon, "__score__", (score, True, flags[1][i], flags[2][i], flags[3][i]))
+            sorted_list.append(pokemon)
+
+        return sorted_list
 
     def get_score(self, pokemon, rule):
         score = []
@@ -705,14 +708,7 @@ class PokemonOptimizer(BaseTask):
         if self.config_transfer and (not self.bot.config.test):
             inventory.pokemons().remove(pokemon.unique_id)
 
-            with self.bot.database as db:
-                cursor = db.cursor()
-                cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-                db_result = cursor.fetchone()
-
-                if db_result[0] == 1:
-                    db.execute("INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+            self.bot.action_log.log_transfer(pokemon.name, pokemon.iv, pokemon.cp)
 
             action_delay(self.config_action_wait_min, self.config_action_wait_max)
 
@@ -794,14 +790,7 @@ class PokemonOptimizer(BaseTask):
             inventory.pokemons().remove(pokemon.unique_id)
             inventory.pokemons().add(new_pokemon)
 
-            with self.bot.database as db:
-                cursor = db.cursor()
-                cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='evolve_log'")
-
-                db_result = cursor.fetchone()
-
-                if db_result[0] == 1:
-                    db.execute("INSERT INTO evolve_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+            self.bot.action_log.log_evolve(pokemon.name, pokemon.iv, pokemon.cp)
 
             sleep(self.config_evolve_time, 0.1)
 
@@ -1,10 +1,7 @@
-import json
-import os
-
 from pokemongo_bot import inventory
-from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.human_behaviour import action_delay
+from pokemongo_bot.name_lookup import item_names
 from pokemongo_bot.services.item_recycle_worker import ItemRecycler
 from pokemongo_bot.tree_config_builder import ConfigException
 from pokemongo_bot.worker_result import WorkerResult
@@ -119,18 +116,32 @@ class RecycleItems(BaseTask):
 
     def _validate_item_filter(self):
         """
-        Validate user's item filter config
+        Validate user's item filter config, item names are case insensitive
+        and get spelled as in ../../data/items.json.
         :return: Nothing.
         :rtype: None
         :raise: ConfigException: When an item doesn't exist in ../../data/items.json
         """
-        item_list = json.load(open(os.path.join(_base_dir, 'data', 'items.json')))
+        names = item_names()
+        items_filter = {}
         for config_item_name, bag_count in self.items_filter.iteritems():
-            if config_item_name not in item_list.viewvalues():
-                if config_item_name not in item_list:
+            if config_item_name in inventory.Items.STATIC_DATA:
+                # an item id
+                items_filter[config_item_name] = bag_count
+                continue
+
+            item_name = names.get(config_item_name)
+            if item_name is None:
+                closest_name = names.closest(config_item_name)
+                if closest_name:
                     raise ConfigException(
-                        "item {} does not exist, spelling mistake? (check for valid item names in data/items.json)".format(
-                            config_item_name))
+                        "item {} does not exist, did you mean {}? (check for valid item names in data/items.json)".format(
+                            config_item_name, closest_name))
+                raise ConfigException(
+                    "item {} does not exist, spelling mistake? (check for valid item names in data/items.json)".format(
+                        config_item_name))
+            items_filter[item_name] = bag_count
+        self.items_filter = items_filter
 
     def should_run(self):
         """
@@ -4,8 +4,7 @@ import time
 import json
 import requests
 import calendar
-import difflib
-import hashlib
+import threading
 
 from random import uniform
 from operator import itemgetter, methodcaller
@@ -13,6 +12,8 @@ from datetime import datetime
 from itertools import izip
 from pokemongo_bot import inventory
 from pokemongo_bot.item_list import Item
+from pokemongo_bot.json_stream import iter_response_items
+from pokemongo_bot.name_lookup import pokemon_names
 from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.inventory import Pokemons
 from pokemongo_bot.worker_result import WorkerResult
@@ -29,49 +30,47 @@ class SniperSource(object):
         self.mappings = SniperSourceMapping(data.get('mappings', {}))
         self.timeout = data.get('timeout', 5)
 
+        # Keep-alive connections and conditional requests (ETag / Last-Modified)
+        self.session = requests.Session()
+        self.etag = None
+        self.last_modified = None
+        self.last_results = None
+
     def __str__(self):
         return self.url
 
-    def fetch_raw(self):
+    def _request(self, conditional=False):
         some_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/52.0.2743.116 Safari/537.36'
-        response = requests.get(self.url, headers={'User-Agent': some_agent}, timeout=self.timeout)
-        results = response.json()
+        headers = {'User-Agent': some_agent}
+        if conditional and self.last_results is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
 
-        # If the results is a dict, retrieve the list from it by the given key. This will return a list afterall.
-        if isinstance(results, dict): 
-            results = results.get(self.key, []) 
-            
-        # If results is STILL a dict (eg. each pokemon is its own dict), need to build data from nested json (example whereispokemon.net)
-        while isinstance(results,dict):
-            tmpResults = []
-            for key, value in results.iteritems(): 
-                tmpResults.append(value)
-                results = tmpResults
-                
-        return results
+        return self.session.get(self.url, headers=headers, timeout=self.timeout, stream=True)
+
+    def fetch_raw(self, response=None):
+        # Streams the results one at a time, instead of parsing the whole (possibly huge) reply at once.
+        # If the reply is a dict, the list is retrieved from it by the given key. If that is STILL a dict
+        # (eg. each pokemon is its own dict, example whereispokemon.net), its values are returned.
+        return iter_response_items(response or self._request(), self.key)
 
     def fetch(self):
         pokemons = []
 
         try:
-            results = self.fetch_raw()
+            response = self._request(conditional=True)
+            now_ms = time.time() * 1000
 
-            # Parse results
-            for result in results:
-                iv = result.get(self.mappings.iv.param)
-                id = result.get(self.mappings.id.param)
-                name = self._get_closest_name(self._fixname(result.get(self.mappings.name.param)))
-                latitude = result.get(self.mappings.latitude.param)
-                longitude = result.get(self.mappings.longitude.param)
-                expiration = result.get(self.mappings.expiration.param)
-                encounter = result.get(self.mappings.encounter.param)
-                spawnpoint = result.get(self.mappings.spawnpoint.param)
+            # Not modified since the last fetch, reuse its results
+            if response.status_code == 304 and self.last_results is not None:
+                response.close()
+                return [pokemon for pokemon in self.last_results if pokemon['expiration_timestamp_ms'] >= now_ms]
 
-                # If this is a composite param, split it ("coords": "-31.415553, -64.190480")
-                if self.mappings.latitude.param == self.mappings.longitude.param:
-                    position = result.get(self.mappings.latitude.param).replace(" ", "").split(",")
-                    latitude = position[0]
-                    longitude = position[1]
+            # Parse results as they arrive
+            for result in self.fetch_raw(response):
+                expiration = result.get(self.mappings.expiration.param)
 
                 # Format the time accordingly. Pokemon times are in milliseconds!
                 if self.mappings.expiration.exists and expiration:
@@ -88,6 +87,24 @@ class SniperSource(object):
                     seconds_per_minute = 60
                     expiration = (time.time() + minutes_to_expire * seconds_per_minute) * 1000
 
+                # Skip expired targets before doing any costly name lookup
+                if long(expiration or 0) < now_ms:
+                    continue
+
+                iv = result.get(self.mappings.iv.param)
+                id = result.get(self.mappings.id.param)
+                name = self._get_closest_name(self._fixname(result.get(self.mappings.name.param)))
+                latitude = result.get(self.mappings.latitude.param)
+                longitude = result.get(self.mappings.longitude.param)
+                encounter = result.get(self.mappings.encounter.param)
+                spawnpoint = result.get(self.mappings.spawnpoint.param)
+
+                # If this is a composite param, split it ("coords": "-31.415553, -64.190480")
+                if self.mappings.latitude.param == self.mappings.longitude.param:
+                    position = result.get(self.mappings.latitude.param).replace(" ", "").split(",")
+                    latitude = position[0]
+                    longitude = position[1]
+
                 # If either name or ID are invalid, fix it using each other
                 if not name or not id:
                     if not name and id:
@@ -107,6 +124,10 @@ class SniperSource(object):
                     'encounter_id': long(encounter or 0),
                     'spawn_point_id': str(spawnpoint or '')
                 })
+
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+            self.last_results = pokemons
         except requests.exceptions.Timeout:
             raise Exception("Fetching has timed out")
         except requests.exceptions.ConnectionError:
@@ -120,10 +141,14 @@ class SniperSource(object):
         try:
             if self.enabled:
                 errors = []
-                data = self.fetch_raw()
+                # Only the first result is needed, stop reading the reply there
+                results = self.fetch_raw()
+                first = next(results, None)
+                results.close()
                 
                 # Check whether the params really exist if they have been specified like so
-                if data:
+                if first is not None:
+                    data = [first]
                     if self.mappings.iv.exists and self.mappings.iv.param not in data[0]:
                        errors.append(self.mappings.iv.param)
                     if self.mappings.id.exists and self.mappings.id.param not in data[0]:
@@ -166,15 +191,102 @@ class SniperSource(object):
     def _get_closest_name(self, name):
         if not name:
             return
-            
-        pokemon_names = [p.name for p in inventory.pokemons().STATIC_DATA]
-        closest_names = difflib.get_close_matches(name, pokemon_names, 1)
 
-        if closest_names:
-            closest_name = closest_names[0]
-            return closest_name
-        
-        return name
+        return pokemon_names().closest(name) or name
+
+# Fetches all the enabled sources in parallel, in the background, and keeps the merged targets
+class SniperFetcher(object):
+    def __init__(self, sources, key, interval=10, trace=None, error=None, paused=None):
+        self.sources = sources
+        self.key = key
+        self.interval = interval
+        self.trace = trace or (lambda message: None)
+        self.error = error or (lambda message: None)
+        # nothing is fetched while it returns True (bot asleep)
+        self.paused = paused or (lambda: False)
+        self.last_fetch_time = None
+
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sniper-fetcher')
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def targets(self):
+        """
+        The known targets that have not expired yet, without waiting for any source.
+        :rtype: list of dict
+        """
+        now_ms = time.time() * 1000
+        with self._lock:
+            return [dict(target) for target in self._targets.itervalues()
+                    if not self._expired(target, now_ms)]
+
+    def fetch(self):
+        enabled = []
+        for source in self.sources:
+            if source.enabled:
+                enabled.append(source)
+            else:
+                self.trace("Source '{}' is disabled".format(source.url))
+
+        self.trace("Fetching pokemons from the sources...")
+        # one thread per source, the messages are sent from this thread
+        results = [None] * len(enabled)
+        threads = [threading.Thread(target=self._fetch_source, args=(source, results, index))
+                   for index, source in enumerate(enabled)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.last_fetch_time = time.time()
+
+        all_pokemons = []
+        for source, (source_pokemons, exception) in izip(enabled, results):
+            if exception is not None:
+                self.error("Could not fetch data from '{}'. Details: {}. Skipping...".format(source.url, exception))
+            else:
+                self.trace("Source '{}' returned {} results".format(source.url, len(source_pokemons)))
+                all_pokemons.extend(source_pokemons)
+
+        now_ms = time.time() * 1000
+        with self._lock:
+            # Merge lists, the fresh data replaces what was known of a target
+            targets = dict((k, t) for k, t in self._targets.iteritems() if not self._expired(t, now_ms))
+            for source_pokemon in all_pokemons:
+                if not self._expired(source_pokemon, now_ms):
+                    targets[self.key(source_pokemon)] = source_pokemon
+            self._targets = targets
+
+        self.trace("After merging, we've got {} results".format(len(targets)))
+
+    def _fetch_source(self, source, results, index):
+        try:
+            results[index] = (source.fetch(), None)
+        except Exception as exception:
+            results[index] = ([], exception)
+
+    def _expired(self, pokemon, now_ms):
+        return (pokemon.get('expiration_timestamp_ms', 0) or pokemon.get('last_modified_timestamp_ms', 0)) < now_ms
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if not self.paused():
+                    self.fetch()
+            except Exception as exception:
+                if self._stopped.is_set():
+                    return
+                self.error("Could not fetch data. Details: {}".format(exception))
+            self._stopped.wait(self.interval)
 
 # Represents the JSON params mappings
 class SniperSourceMapping(object):
@@ -230,7 +342,6 @@ class Sniper(BaseTask):
     MIN_SECONDS_ALLOWED_FOR_CELL_CHECK = 60
     MIN_SECONDS_ALLOWED_FOR_REQUESTING_DATA = 10
     MIN_BALLS_FOR_CATCHING = 10
-    MAX_CACHE_LIST_SIZE = 300
 
     def __init__(self, bot, config):
         super(Sniper, self).__init__(bot, config)
@@ -238,7 +349,7 @@ class Sniper(BaseTask):
     def initialize(self):
         self.disabled = False
         self.last_cell_check_time = time.time()
-        self.last_data_request_time = time.time()
+        self.last_data_request_time = None
         self.inventory = inventory.items()
         self.pokedex = inventory.pokedex()
         self.debug = self.config.get('debug', False)
@@ -251,8 +362,10 @@ class Sniper(BaseTask):
         self.altitude = uniform(self.bot.config.alt_min, self.bot.config.alt_max)
         self.sources = [SniperSource(data) for data in self.config.get('sources', [])]
 
-        if not hasattr(self.bot,"sniper_cache"):
-            self.bot.sniper_cache = []
+        # A reloaded task replaces the fetcher of the previous one
+        if getattr(self.bot, "sniper_fetcher", None):
+            self.bot.sniper_fetcher.stop()
+            self.bot.sniper_fetcher = None
             
         # Dont bother validating config if task is not even enabled
         if self.enabled:
@@ -283,6 +396,15 @@ class Sniper(BaseTask):
                     if not self.sources :
                         self._error("There is no source available. Disabling Sniper...")
                         self.disabled = True
+                    else:
+                        self.bot.sniper_fetcher = SniperFetcher(
+                            self.sources,
+                            self._hash,
+                            interval=self.MIN_SECONDS_ALLOWED_FOR_REQUESTING_DATA,
+                            trace=self._trace,
+                            error=self._error,
+                            paused=self._is_bot_sleeping
+                        ).start()
                         
                     # Re-enable snipping if source is from telegram
                     if self.mode == SniperMode.TELEGRAM:
@@ -338,8 +460,7 @@ class Sniper(BaseTask):
                 self.bot.sniper_unique_pokemon = []
             
             # Check if already in list of pokemon we've tried
-            uniqueid = self._build_unique_id(pokemon)
-            if self._is_cached(uniqueid):
+            if self._is_cached(pokemon):
                 # Do nothing. Either we already got this, or it doesn't really exist
                 self._trace('{} was already handled! Skipping...'.format(pokemon['pokemon_name']))
             else:
@@ -428,7 +549,7 @@ class Sniper(BaseTask):
                 TelegramSnipe.ENABLED = False
                     
                 # Save target and unlock heartbeat calls
-                self._cache(uniqueid)
+                self._cache(pokemon)
                 self.bot.hb_locked = False
 
         return success
@@ -531,36 +652,14 @@ class Sniper(BaseTask):
         return self._parse_pokemons(self.bot.mqtt_pokemon_list)
 
     def _get_pokemons_from_url(self):
-        results_hash_map = {}
-        seconds_since_last_valid_request = time.time() - self.last_data_request_time
-
-        # If something is requesting this info too fast, skip it (we might crash their servers)
-        if (seconds_since_last_valid_request > self.MIN_SECONDS_ALLOWED_FOR_REQUESTING_DATA):
-            self.last_data_request_time = time.time()
-
-            self._trace("Fetching pokemons from the sources...")
-            for source in self.sources:
-                try:
-                    if source.enabled:
-                        source_pokemons = source.fetch()
-                        self._trace("Source '{}' returned {} results".format(source.url, len(source_pokemons)))
-
-                        # Merge lists, making sure to exclude repeated data. Use location as the hash key
-                        for source_pokemon in source_pokemons:
-                            hash_key = self._hash(source_pokemon)
-
-                            # Add if new
-                            if not results_hash_map.has_key(hash_key):
-                                results_hash_map[hash_key] = source_pokemon
-                    else:
-                        self._trace("Source '{}' is disabled".format(source.url))
-                except Exception as exception:
-                    self._error("Could not fetch data from '{}'. Details: {}. Skipping...".format(source.url, exception))
-            self._trace("After merging, we've got {} results".format(len(results_hash_map.values())))
-        else:
+        # Sources are fetched in the background, never wait for them here. Only handle each fetch once
+        fetcher = getattr(self.bot, 'sniper_fetcher', None)
+        if fetcher is None or fetcher.last_fetch_time in (None, self.last_data_request_time):
             self._trace("Not ready yet to retrieve data...")
+            return []
 
-        return self._parse_pokemons(results_hash_map.values())
+        self.last_data_request_time = fetcher.last_fetch_time
+        return self._parse_pokemons(fetcher.targets())
 
     def _hash(self, pokemon):
         # Use approximate location instead, because some IDs might be wrong. The first 4 decimal places is enough for this
@@ -569,25 +668,12 @@ class Sniper(BaseTask):
     def _equals(self, pokemon_1, pokemon_2):
         return self._hash(pokemon_1) == self._hash(pokemon_2)
 
-    def _is_cached(self, uniqueid):
-        if uniqueid in self.bot.sniper_cache:
-            return True
-        return False
-
-    def _cache(self, uniqueid):
-        if not self._is_cached(uniqueid):
-            # Free space if full and store it
-            if len(self.bot.sniper_cache) >= self.MAX_CACHE_LIST_SIZE:
-                self.bot.sniper_cache.pop(0)
-            self.bot.sniper_cache.append(uniqueid)
-
-    def _build_unique_id(self, pokemon):
-        # Build unique id for this pokemon from id, latitude, longitude and expiration
-        uniqueid = str(pokemon.get('pokemon_id','')) + str(pokemon.get('latitude','')) + str(pokemon.get('longitude','')) + str(pokemon.get('expiration',''))
-        md5str = hashlib.md5()
-        md5str.update(uniqueid)
-        uniqueid = str(md5str.hexdigest())
-        return uniqueid
+    def _is_cached(self, pokemon):
+        return self.bot.seen_targets.contains(pokemon)
+
+    def _cache(self, pokemon):
+        self.bot.seen_targets.add(pokemon)
+        self.bot.seen_targets.save()
 
     def _log(self, message):
         self.emit_event('sniper_log', formatted='{message}', data={'message': message})
@@ -599,6 +685,10 @@ class Sniper(BaseTask):
         if self.debug:
             self._log(message)
 
+    def _is_bot_sleeping(self):
+        sleep_schedule = getattr(self.bot, 'sleep_schedule', None)
+        return sleep_schedule is not None and sleep_schedule.sleeping
+
     def _teleport(self, latitude, longitude, altitude):
         self.bot.api.set_position(latitude, longitude, altitude, True)
         time.sleep(3)
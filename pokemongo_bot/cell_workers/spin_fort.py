@@ -13,7 +13,7 @@ from pokemongo_bot.constants import Constants
 from pokemongo_bot.human_behaviour import action_delay
 from pokemongo_bot.worker_result import WorkerResult
 from pokemongo_bot.base_task import BaseTask
-from .utils import distance, format_time, fort_details
+from .utils import format_time, fort_details
 
 SPIN_REQUEST_RESULT_SUCCESS = 1
 SPIN_REQUEST_RESULT_OUT_OF_RANGE = 2
@@ -50,10 +50,7 @@ class SpinFort(BaseTask):
     def work(self):
         forts = self.get_forts_in_range()
 
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT DISTINCT COUNT(pokestop) FROM pokestop_log WHERE dated >= datetime('now','-1 day')")
-        if c.fetchone()[0] >= self.config.get('daily_spin_limit', 2000):
+        if self.bot.action_log.count_last_day('pokestop_log') >= self.config.get('daily_spin_limit', 2000):
            if self.exit_on_limit_reached:
                self.emit_event('spin_limit', formatted='WARNING! You have reached your daily spin limit')
                sys.exit(2)
@@ -114,20 +111,11 @@ class SpinFort(BaseTask):
                         formatted='Found nothing in pokestop {pokestop}.',
                         data={'pokestop': fort_name}
                     )
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='pokestop_log'")
-                result = c.fetchone()
-                while True:
-                    if result[0] == 1:
-                        conn.execute('''INSERT INTO pokestop_log (pokestop, exp, items) VALUES (?, ?, ?)''', (fort_name, str(experience_awarded), str(items_awarded)))
-                        break
-                    else:
-                        self.emit_event('pokestop_log',
-                                        sender=self,
-                                        level='info',
-                                        formatted="pokestop_log table not found, skipping log")
-                        break
+                if not self.bot.action_log.log_spin(fort_name, experience_awarded, items_awarded):
+                    self.emit_event('pokestop_log',
+                                    sender=self,
+                                    level='info',
+                                    formatted="pokestop_log table not found, skipping log")
                 pokestop_cooldown = spin_details.get(
                     'cooldown_complete_timestamp_ms')
                 self.bot.fort_timeouts.update({fort["id"]: pokestop_cooldown})
@@ -174,16 +162,9 @@ class SpinFort(BaseTask):
                         'softban',
                         formatted='Probably got softban.'
                     )
-                    with self.bot.database as conn:
-                        c = conn.cursor()
-                        c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='softban_log'")
-                    result = c.fetchone()
-
-                    if result[0] == 1:
-                        source = str("PokemonCatchWorker")
-                        status = str("Possible Softban")
-                        conn.execute('''INSERT INTO softban_log (status, source) VALUES (?, ?)''', (status, source))
-                    else:
+                    source = str("PokemonCatchWorker")
+                    status = str("Possible Softban")
+                    if not self.bot.action_log.log_softban(status, source):
                         self.emit_event('softban_log',
                                         sender=self,
                                         level='info',
@@ -200,25 +181,17 @@ class SpinFort(BaseTask):
         return WorkerResult.SUCCESS
 
     def get_forts_in_range(self):
-        forts = self.bot.get_forts(order_by_distance=True)
-        forts = filter(lambda fort: fort["id"] not in self.bot.fort_timeouts, forts)
-
         if self.bot.config.replicate_gps_xy_noise:
-            forts = filter(lambda fort: distance(
-                self.bot.noised_position[0],
-                self.bot.noised_position[1],
-                fort['latitude'],
-                fort['longitude']
-            ) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE, forts)
+            position = self.bot.noised_position
         else:
-            forts = filter(lambda fort: distance(
-                self.bot.position[0],
-                self.bot.position[1],
-                fort['latitude'],
-                fort['longitude']
-            ) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE, forts)
-
-        return forts
+            position = self.bot.position
+
+        return self.bot.get_fort_index().within(
+            position[0],
+            position[1],
+            Constants.MAX_DISTANCE_FORT_IS_REACHABLE,
+            predicate=lambda fort: fort["id"] not in self.bot.fort_timeouts
+        )
 
     def get_items_awarded_from_fort_spinned(self, response_dict):
         experience_awarded = response_dict['responses']['FORT_SEARCH'].get('experience_awarded', 0)
@@ -252,26 +252,13 @@ class TransferPokemon(BaseTask):
                                               pokemon.iv, pokemon.ivcp,
                                               candy.quantity, candy.type)
         )
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute(
-                "SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-        result = c.fetchone()
-
-        while True:
-            if result[0] == 1:
-                conn.execute('''INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)''',
-                             (pokemon.name, pokemon.iv, pokemon.cp))
-                break
-            else:
-                self.emit_event(
-                    'transfer_log',
-                    sender=self,
-                    level='info',
-                    formatted="transfer_log table not found, skipping log"
-                )
-                break
+        if not self.bot.action_log.log_transfer(pokemon.name, pokemon.iv, pokemon.cp):
+            self.emit_event(
+                'transfer_log',
+                sender=self,
+                level='info',
+                formatted="transfer_log table not found, skipping log"
+            )
         action_delay(self.transfer_wait_min, self.transfer_wait_max)
 
     def _get_release_config_for(self, pokemon):
@@ -2,14 +2,15 @@
 
 from __future__ import print_function
 import struct
+import time
 from math import asin, atan, cos, exp, log, pi, sin, sqrt, tan
 
 from colorama import init
-from networkx.algorithms.clique import find_cliques
 
-import networkx as nx
 import numpy as np
 
+from pokemongo_bot.clustering import biggest_cluster
+
 from datetime import datetime as dt, timedelta
 
 init()
@@ -236,26 +237,26 @@ def rad2deg(rad):
 
 
 def find_biggest_cluster(radius, points, order=None):
-    graph = nx.Graph()
-    for point in points:
-            if order is '9QM=':
-                #is a lure module - 9QM=
-                now = int(time.time())
-                remaining = now - point['last_modified_timestamp_ms']
-                f = point['latitude'], point['longitude'], remaining
-            else:
-                f = point['latitude'], point['longitude'], 0
-            graph.add_node(f)
-            for node in graph.nodes():
-                if node != f and distance(f[0], f[1], node[0], node[1]) <= radius*2:
-                    graph.add_edge(f, node)
-    cliques = list(find_cliques(graph))
-    if len(cliques) > 0:
-        max_clique = max(list(find_cliques(graph)), key=lambda l: (len(l), sum(x[2] for x in l)))
-        merc_clique = [coord2merc(x[0], x[1]) for x in max_clique]
-        clique_x, clique_y = zip(*merc_clique)
-        best_point = np.mean(clique_x), np.mean(clique_y)
-        best_coord = merc2coord(best_point)
-        return {'latitude': best_coord[0], 'longitude': best_coord[1], 'num_points': len(max_clique)}
+    if order == '9QM=':
+        #is a lure module - 9QM=, prefer the clusters of older lures
+        now = int(time.time() * 1000)
+        weights = [now - point['last_modified_timestamp_ms'] for point in points]
     else:
+        weights = None
+
+    cluster = biggest_cluster(radius, [(point['latitude'], point['longitude']) for point in points], weights)
+    if cluster is None:
         return None
+
+    merc_cluster = [coord2merc(points[i]['latitude'], points[i]['longitude']) for i in cluster.members]
+    cluster_x, cluster_y = zip(*merc_cluster)
+    best_point = np.mean(cluster_x), np.mean(cluster_y)
+    best_coord = merc2coord(best_point)
+
+    # Rather walk to the middle of the forts, unless some of them would be out of range from there
+    for i in cluster.members:
+        if distance(best_coord[0], best_coord[1], points[i]['latitude'], points[i]['longitude']) > radius:
+            best_coord = cluster.latitude, cluster.longitude
+            break
+
+    return {'latitude': best_coord[0], 'longitude': best_coord[1], 'num_points': len(cluster)}
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+from collections import defaultdict
+from math import floor
+
+import numpy as np
+
+from pokemongo_bot import geo
+
+# Tolerance on the squared radius, points lying on the boundary of a disk are inside it
+EPSILON = 1e-9
+
+
+class Cluster(object):
+    """
+    A disk of the given radius and the points it covers.
+    """
+
+    def __init__(self, latitude, longitude, members, weight=0):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.members = members
+        self.weight = weight
+
+    def __len__(self):
+        return len(self.members)
+
+
+def _grid(points, size):
+    cells = defaultdict(list)
+    for index, (x, y) in enumerate(points):
+        cells[(int(floor(x / size)), int(floor(y / size)))].append(index)
+    return dict((cell, np.array(indexes)) for cell, indexes in cells.iteritems())
+
+
+def _neighbors(grid, cell):
+    found = [grid[(cell[0] + dx, cell[1] + dy)]
+             for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+             if (cell[0] + dx, cell[1] + dy) in grid]
+    return np.concatenate(found)
+
+
+def candidate_centers(point, others, radius):
+    """
+    The centers of the disks of the given radius having `point` and one of
+    `others` on their boundary, plus `point` itself. A disk covering the
+    most points can always be moved to one of those centers.
+    """
+    delta = others - point
+    length = np.hypot(delta[:, 0], delta[:, 1])
+    usable = (length > 0) & (length <= 2 * radius)
+    delta, length = delta[usable], length[usable]
+
+    middle = point + delta / 2
+    height = np.sqrt(np.maximum(radius ** 2 - (length / 2) ** 2, 0))
+    normal = np.column_stack((-delta[:, 1], delta[:, 0])) / length[:, None]
+    offset = normal * height[:, None]
+    return np.vstack((point[None, :], middle + offset, middle - offset))
+
+
+def biggest_cluster(radius, coordinates, weights=None):
+    """
+    Finds the disk of the given radius covering the most points.
+
+    Points are bucketed in a grid of 2 * radius cells, so only the points of
+    the neighbor cells are compared. Ties are broken by the sum of the
+    weights of the covered points.
+    :param radius: Radius of the disk, in meters.
+    :param coordinates: List of (latitude, longitude).
+    :param weights: Optional weight of each point.
+    :return: The cluster, or None if there is no point.
+    :rtype: Cluster
+    """
+    if not len(coordinates):
+        return None
+
+    origin = coordinates[0]
+    points = np.column_stack(geo.project(*geo.coordinates(coordinates), origin=origin))
+    weights = np.zeros(len(points)) if weights is None else np.asarray(weights, dtype=float)
+    limit = radius ** 2 * (1 + EPSILON) + EPSILON
+    grid = _grid(points, 2 * radius)
+
+    best = None
+    for cell, indexes in grid.iteritems():
+        neighbors = _neighbors(grid, cell)
+        neighbor_points = points[neighbors]
+        neighbor_weights = weights[neighbors]
+
+        for index in indexes:
+            # a disk through this point only covers points at most 2 * radius away
+            close = ((neighbor_points - points[index]) ** 2).sum(axis=1) <= 4 * limit
+            close_indexes = neighbors[close]
+            close_points = neighbor_points[close]
+
+            # pairs are only looked at once, from their lowest index
+            centers = candidate_centers(points[index], close_points[close_indexes > index], radius)
+
+            delta = centers[:, None, :] - close_points[None, :, :]
+            inside = (delta ** 2).sum(axis=2) <= limit
+            counts = inside.sum(axis=1)
+            totals = inside.dot(neighbor_weights[close])
+
+            candidate = np.lexsort((totals, counts))[-1]
+            key = (counts[candidate], totals[candidate])
+            if best is None or key > best[0]:
+                best = (key, centers[candidate], close_indexes[inside[candidate]])
+
+    (count, total), center, members = best
+    latitude, longitude = geo.unproject(center[0], center[1], origin)
+    return Cluster(latitude, longitude, np.sort(members).tolist(), total)
+
+
+class FortClusters(object):
+    """
+    The camping spots of CampFort, kept up to date as forts come and go.
+
+    Each pair of forts close enough to be in range of a single spot gives a
+    cluster: the circle of the given radius through both forts covering the
+    most (lured) forts, shrunk towards them as long as it keeps them all.
+    Clusters are dicts with the "center", "distance", "forts", "size" and
+    "lured" keys.
+
+    Only the clusters of the pairs near a fort that was added, removed or
+    whose lure changed are computed again. Clusters are bucketed by
+    (lured, size), so the best one is found without sorting them all.
+    """
+
+    def __init__(self, radius, is_lured=None):
+        self.radius = radius
+        self.is_lured = is_lured or (lambda fort: fort.get("active_fort_modifier", None) is not None)
+
+        self._forts = {}
+        self._lured = {}
+        # forts less than 2 * radius away from each fort
+        self._neighbors = {}
+        # pair of fort ids -> cluster
+        self._clusters = {}
+        # fort id -> pairs of the clusters containing it
+        self._containing = defaultdict(set)
+        # (lured, size) -> pairs
+        self._buckets = defaultdict(set)
+        self._bucket_of = {}
+
+    def __len__(self):
+        return len(self._clusters)
+
+    def clusters(self):
+        return self._clusters.values()
+
+    def update(self, forts, position):
+        """
+        :param forts: The known forts, by id.
+        :type forts: dict
+        :param position: Position of the player, clusters are oriented toward it on ties.
+        """
+        stale = set()
+
+        for fort_id in [fort_id for fort_id in self._forts if fort_id not in forts]:
+            stale |= self._pairs_around(fort_id)
+            self._remove(fort_id)
+
+        added = [fort_id for fort_id in forts if fort_id not in self._forts]
+        relured = []
+        for fort_id, fort in forts.iteritems():
+            self._forts[fort_id] = fort
+            lured = self.is_lured(fort)
+            if fort_id in self._lured and self._lured[fort_id] != lured:
+                relured.append(fort_id)
+            self._lured[fort_id] = lured
+
+        if added:
+            self._link(added)
+            for fort_id in added:
+                stale |= self._pairs_around(fort_id)
+
+        # a lure can also change which side of a pair is the best
+        for fort_id in relured:
+            stale |= self._pairs_around(fort_id)
+
+        for pair in stale:
+            self._build(pair, position)
+
+    def best(self, position, min_lured=0, min_size=0):
+        """
+        The cluster with the most lured forts, then the most forts, then the nearest.
+        :return: The cluster, with its distance updated, or None.
+        :rtype: dict
+        """
+        for lured, size in sorted(self._buckets, reverse=True):
+            if lured < min_lured:
+                break
+            if size < min_size or not self._buckets[(lured, size)]:
+                continue
+
+            clusters = [self._clusters[pair] for pair in self._buckets[(lured, size)]]
+            distances = geo.distances(position, [cluster["center"] for cluster in clusters])
+            nearest = int(np.argmin(distances))
+            clusters[nearest]["distance"] = float(distances[nearest])
+            return clusters[nearest]
+
+        return None
+
+    def _link(self, added):
+        ids = list(self._forts)
+        lats, lngs = geo.coordinates([self._forts[fort_id] for fort_id in ids])
+        for fort_id in added:
+            self._neighbors.setdefault(fort_id, set())
+            fort = self._forts[fort_id]
+            near = geo.haversine(fort["latitude"], fort["longitude"], lats, lngs) <= 2 * self.radius
+            for index in np.flatnonzero(near):
+                other_id = ids[index]
+                if other_id != fort_id:
+                    self._neighbors[fort_id].add(other_id)
+                    self._neighbors.setdefault(other_id, set()).add(fort_id)
+
+    def _pairs_around(self, fort_id):
+        # a circle through a fort only covers forts of its neighborhood
+        pairs = set()
+        for first in self._neighbors.get(fort_id, set()) | set([fort_id]):
+            for second in self._neighbors.get(first, ()):
+                pairs.add((first, second) if first < second else (second, first))
+        return pairs
+
+    def _remove(self, fort_id):
+        for other_id in self._neighbors.pop(fort_id, ()):
+            self._neighbors[other_id].discard(fort_id)
+        for pair in list(self._containing.pop(fort_id, ())):
+            self._drop(pair)
+        del self._forts[fort_id]
+        del self._lured[fort_id]
+
+    def _drop(self, pair):
+        cluster = self._clusters.pop(pair, None)
+        if cluster is None:
+            return
+        for fort in cluster["forts"]:
+            self._containing[fort["id"]].discard(pair)
+        self._buckets[self._bucket_of.pop(pair)].discard(pair)
+
+    def _build(self, pair, position):
+        self._drop(pair)
+        if pair[0] not in self._forts or pair[1] not in self._forts:
+            return
+
+        first, second = self._forts[pair[0]], self._forts[pair[1]]
+        x, y = geo.mercator(np.array([first["latitude"], second["latitude"]]),
+                            np.array([first["longitude"], second["longitude"]]))
+        dx, dy = x[1] - x[0], y[1] - y[0]
+        d = np.hypot(dx, dy)
+
+        if (d == 0) or (d > 2 * self.radius):
+            return
+
+        # Centers of the circles through both forts, on each side of them, for
+        # the full radius and each smaller one (in meters) the circle can shrink to
+        radii = np.arange(self.radius, d / 2 - EPSILON, -1)
+        cx, cy = (x[0] + x[1]) / 2, (y[0] + y[1]) / 2
+        cd = np.sqrt(radii ** 2 - (d / 2) ** 2)
+        lats, lngs = geo.inverse_mercator(np.concatenate((cx - cd * dy / d, cx + cd * dy / d)),
+                                          np.concatenate((cy + cd * dx / d, cy - cd * dx / d)))
+        lats, lngs = lats.reshape(2, -1), lngs.reshape(2, -1)
+
+        candidates = [self._forts[fort_id] for fort_id in self._neighbors[pair[0]] | set([pair[0]])]
+        candidate_lats, candidate_lngs = geo.coordinates(candidates)
+        lured = np.array([self._lured[fort["id"]] for fort in candidates])
+        distances = geo.haversine_matrix(lats.ravel(), lngs.ravel(), candidate_lats, candidate_lngs)
+        inside = (distances <= np.tile(radii, 2)[:, None]).reshape(2, len(radii), -1)
+
+        # The side covering the most lured forts, then the most forts, then the nearest
+        to_player = geo.haversine(position[0], position[1], lats[:, 0], lngs[:, 0])
+        keys = [(int(lured[inside[side, 0]].sum()), int(inside[side, 0].sum()), -to_player[side]) for side in (0, 1)]
+        side = 0 if keys[0] >= keys[1] else 1
+
+        # Shrink the circle as long as it keeps all its forts
+        members = inside[side, 0]
+        kept = inside[side][:, members].all(axis=1)
+        steps = int(np.argmin(kept)) - 1 if not kept.all() else len(radii) - 1
+
+        forts = [fort for fort, covered in zip(candidates, members) if covered]
+        cluster = {"center": (float(lats[side, steps]), float(lngs[side, steps])),
+                   "distance": 0,
+                   "forts": forts,
+                   "size": len(forts),
+                   "lured": 0}
+        self._clusters[pair] = cluster
+        for fort in forts:
+            self._containing[fort["id"]].add(pair)
+        self._count(pair)
+
+    def _count(self, pair):
+        cluster = self._clusters[pair]
+        cluster["lured"] = sum(1 for fort in cluster["forts"] if self._lured[fort["id"]])
+
+        key = (cluster["lured"], cluster["size"])
+        previous = self._bucket_of.get(pair)
+        if previous != key:
+            if previous is not None:
+                self._buckets[previous].discard(pair)
+            self._buckets[key].add(pair)
+            self._bucket_of[pair] = key
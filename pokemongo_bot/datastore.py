@@ -7,9 +7,15 @@ https://pypi.python.org/pypi/yoyo-migrations
 """
 
 import inspect
+import logging
 import os
+import sqlite3
 import sys
+import threading
+import time
 import warnings
+from collections import OrderedDict, deque
+from datetime import datetime
 
 try:
     from yoyo import read_migrations, get_backend
@@ -49,3 +55,193 @@ class Datastore(object):
 
     def get_connection(self):
         return self.backend.connection
+
+
+class RollingCounter(object):
+    """
+    Number of events over the last `window` seconds, in buckets of `bucket`
+    seconds. Adding and counting are O(1) amortized. The oldest bucket is
+    kept until it is entirely out of the window, so the count may include
+    up to `bucket` seconds of older events.
+    """
+
+    def __init__(self, window=86400, bucket=60):
+        self.window = window
+        self.bucket = bucket
+        self._buckets = deque()
+        self._total = 0
+
+    def add(self, timestamp=None, count=1):
+        if timestamp is None:
+            timestamp = time.time()
+
+        start = int(timestamp // self.bucket) * self.bucket
+        if self._buckets and self._buckets[-1][0] == start:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([start, count])
+        self._total += count
+
+    def count(self, now=None):
+        if now is None:
+            now = time.time()
+
+        while self._buckets and self._buckets[0][0] + self.bucket <= now - self.window:
+            self._total -= self._buckets.popleft()[1]
+        return self._total
+
+
+class ActionLog(object):
+    """
+    Buffers the rows of the *_log tables and inserts them in one transaction.
+
+    The tables are looked up once, a row for a missing table is refused.
+    Rows carry their own `dated`, so they keep the time of the action and
+    not the time of the flush. The sqlite connection belongs to the bot
+    thread: flush is called from the tick, before reading a log table and
+    on exit, never from a timer thread.
+
+    Rows of the last 24 hours of the COUNTED tables are counted in memory,
+    the daily limits don't query the database.
+    """
+
+    COUNTED = ('catch_log', 'pokestop_log')
+
+    TABLES = OrderedDict([
+        ('catch_log', ('pokemon', 'cp', 'iv', 'encounter_id', 'pokemon_id')),
+        ('vanish_log', ('pokemon', 'cp', 'iv', 'encounter_id', 'pokemon_id')),
+        ('pokestop_log', ('pokestop', 'exp', 'items')),
+        ('transfer_log', ('pokemon', 'iv', 'cp')),
+        ('evolve_log', ('pokemon', 'iv', 'cp')),
+        ('softban_log', ('status', 'source')),
+        ('eggs_hatched_log', ('pokemon', 'cp', 'iv', 'pokemon_id')),
+    ])
+
+    def __init__(self, connection, flush_interval=10, max_pending=100):
+        self.connection = connection
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self.tables = set()
+        self.last_flush = time.time()
+        self._pending = OrderedDict((table, []) for table in self.TABLES)
+        self._pending_count = 0
+        self._statements = dict(
+            (table, 'INSERT INTO {} ({}, dated) VALUES ({}?)'.format(table, ', '.join(columns), '?, ' * len(columns)))
+            for table, columns in self.TABLES.iteritems()
+        )
+        self._lock = threading.Lock()
+        self._counters = dict((table, RollingCounter()) for table in self.COUNTED)
+
+        self.verify_schema()
+        self._seed_counters()
+
+    def verify_schema(self):
+        """
+        Looks up which log tables exist and switches the database to WAL.
+        :return: The log tables found.
+        :rtype: set
+        """
+        with self.connection as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name IN ({})".format(', '.join('?' * len(self.TABLES))),
+                self.TABLES.keys()
+            )
+            self.tables = set(row[0] for row in cursor.fetchall())
+
+        try:
+            # readers don't block the writer, and commits don't fsync the whole database
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+        except sqlite3.Error as e:
+            self.logger.info('[x] Unable to enable WAL mode: %s' % e)
+
+        return self.tables
+
+    def _seed_counters(self):
+        with self.connection as conn:
+            for table in self.COUNTED:
+                if table not in self.tables:
+                    continue
+                rows = conn.execute(
+                    "SELECT CAST(strftime('%s', dated) AS INTEGER) / 60 AS minute, COUNT(*) FROM {} "
+                    "WHERE dated >= datetime('now','-1 day') GROUP BY minute ORDER BY minute".format(table)
+                ).fetchall()
+                for minute, count in rows:
+                    self._counters[table].add(minute * 60, count)
+
+    def count_last_day(self, table):
+        """
+        Rows logged in the last 24 hours, pending ones included.
+        :param table: One of COUNTED.
+        :rtype: int
+        """
+        return self._counters[table].count()
+
+    def pending(self):
+        return self._pending_count
+
+    def _log(self, table, *values):
+        if table not in self.tables:
+            return False
+
+        dated = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._pending[table].append(values + (dated,))
+            self._pending_count += 1
+            if table in self._counters:
+                self._counters[table].add()
+
+        if self._pending_count >= self.max_pending:
+            self.flush()
+        return True
+
+    def log_catch(self, pokemon, cp, iv, encounter_id, pokemon_id):
+        return self._log('catch_log', pokemon, cp, iv, str(encounter_id), pokemon_id)
+
+    def log_vanish(self, pokemon, cp, iv, encounter_id, pokemon_id):
+        return self._log('vanish_log', pokemon, cp, iv, str(encounter_id), pokemon_id)
+
+    def log_spin(self, pokestop, exp, items):
+        return self._log('pokestop_log', pokestop, str(exp), str(items))
+
+    def log_transfer(self, pokemon, iv, cp):
+        return self._log('transfer_log', pokemon, iv, cp)
+
+    def log_evolve(self, pokemon, iv, cp):
+        return self._log('evolve_log', pokemon, iv, cp)
+
+    def log_softban(self, status, source):
+        return self._log('softban_log', status, source)
+
+    def log_egg_hatched(self, pokemon, cp, iv, pokemon_id):
+        return self._log('eggs_hatched_log', pokemon, cp, iv, pokemon_id)
+
+    def flush_if_due(self):
+        if self._pending_count and time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Inserts the buffered rows, all tables in one transaction.
+        """
+        with self._lock:
+            self.last_flush = time.time()
+            if not self._pending_count:
+                return
+
+            pending = [(table, rows) for table, rows in self._pending.iteritems() if rows]
+            try:
+                with self.connection as conn:
+                    for table, rows in pending:
+                        conn.executemany(self._statements[table], rows)
+            except sqlite3.Error as e:
+                # keep the rows for the next flush
+                self.logger.info('[x] Error while writing logs: %s' % e)
+                return
+
+            for table, _ in pending:
+                self._pending[table] = []
+            self._pending_count = 0
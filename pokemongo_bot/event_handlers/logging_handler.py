@@ -8,6 +8,8 @@ from pokemongo_bot.event_manager import EventHandler
 
 
 class LoggingHandler(EventHandler):
+    synchronous = True
+
     EVENT_COLOR_MAP = {
         'api_error':                         'red',
         'badges':                            'blue',
@@ -140,10 +142,17 @@ class LoggingHandler(EventHandler):
         'none':    '\033[0m'
     }
 
+    # follows the level of the root logger
+    dynamic = True
+
     def __init__(self, color=True, debug=False):
         self.color = color
         self.debug = debug
 
+    def wants(self, event, level):
+        # debug events are only logged when the root logger lets them through
+        return level != 'debug' or logging.getLogger().isEnabledFor(logging.DEBUG)
+
     def handle_event(self, event, sender, level, formatted_msg, data):
         if not formatted_msg:
             formatted_msg = str(data)
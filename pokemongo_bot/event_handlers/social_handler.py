@@ -97,11 +97,19 @@ class MyMQTTClass:
 
 
 class SocialHandler(EventHandler):
+    # only published events, the client also receives bot.mqtt_pokemon_list
+    events = ('catchable_pokemon',)
+    # any event connects the client, then only published events are wanted
+    dynamic = True
+    uses_formatted = False
     def __init__(self, bot):
         super(SocialHandler, self).__init__()
         self.bot = bot
         self.mqttc = None
 
+    def wants(self, event, level):
+        return self.mqttc is None or super(SocialHandler, self).wants(event, level)
+
     def handle_event(self, event, sender, level, formatted_msg, data):
         if self.mqttc is None:
             try:
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 from __future__ import print_function
+import logging
+import threading
+import time
+from collections import deque
 from sys import stdout
 
 
+LEVELS = ['info', 'warning', 'error', 'critical', 'debug']
+
+
 class EventNotRegisteredException(Exception):
     pass
 
@@ -13,14 +20,141 @@ class EventMalformedException(Exception):
 
 
 class EventHandler(object):
+    # handlers doing no network I/O are always called from emit
+    synchronous = False
+    # levels and events the handler is subscribed to, None for all of them
+    levels = None
+    events = None
+    # handlers whose wants() changes over time, asked again on every emit
+    dynamic = False
+    # handlers only using data don't need emit to format the message
+    uses_formatted = True
 
     def __init__(self):
         pass
 
+    def wants(self, event, level):
+        return (self.levels is None or level in self.levels) and (self.events is None or event in self.events)
+
     def handle_event(self, event, kwargs):
         raise NotImplementedError("Please implement")
 
 
+class AsyncHandler(EventHandler):
+    """
+    Runs a handler in its own thread, fed through a bounded queue.
+
+    When the queue is full, the overflow policy decides what happens:
+    - drop_oldest: the oldest queued event is dropped
+    - drop_debug: a queued debug event is dropped, or the oldest one if none
+    - block: emit waits until the handler catches up
+    """
+
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_debug', 'block')
+
+    def __init__(self, handler, queue_size=100, overflow='drop_oldest'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError('Event overflow policy needs to be in: {}'.format(self.OVERFLOW_POLICIES))
+
+        self.handler = handler
+        self.uses_formatted = handler.uses_formatted
+        self.dynamic = handler.dynamic
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.logger = logging.getLogger(type(handler).__name__)
+
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_lag = .0
+        self.max_lag = .0
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='event-' + type(handler).__name__)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def wants(self, event, level):
+        return self.handler.wants(event, level)
+
+    def handle_event(self, event, sender, level, formatted_msg, data):
+        # handlers may add keys to data (socketio adds msg), each gets its own
+        item = (time.time(), event, sender, level, formatted_msg, dict(data))
+
+        if not self._running:
+            # stopped on exit, the last events are handled right away
+            self.handler.handle_event(*item[1:])
+            return
+
+        with self._condition:
+            while len(self._queue) >= self.queue_size and self._running:
+                if self.overflow == 'block':
+                    self._condition.wait()
+                    continue
+
+                self._drop()
+
+            self._queue.append(item)
+            self._condition.notify_all()
+
+    def _drop(self):
+        if self.overflow == 'drop_debug':
+            for queued in self._queue:
+                if queued[3] == 'debug':
+                    self._queue.remove(queued)
+                    self.dropped += 1
+                    return
+
+        self._queue.popleft()
+        self.dropped += 1
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and self._running:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                item = self._queue.popleft()
+                self._condition.notify_all()
+
+            queued_at, event, sender, level, formatted_msg, data = item
+            self.last_lag = time.time() - queued_at
+            self.max_lag = max(self.max_lag, self.last_lag)
+            try:
+                self.handler.handle_event(event, sender, level, formatted_msg, data)
+                self.handled += 1
+            except Exception:
+                self.errors += 1
+                self.logger.exception('Error while handling event %s', event)
+
+    def pending(self):
+        with self._condition:
+            return len(self._queue)
+
+    def stats(self):
+        return {
+            'handler': type(self.handler).__name__,
+            'pending': self.pending(),
+            'handled': self.handled,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag
+        }
+
+    def stop(self, timeout=5):
+        """
+        Stops the thread once the queued events are handled, or after timeout seconds.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+
 class EventManager(object):
 
     def __init__(self, limit_output=False, *handlers):
@@ -28,6 +162,10 @@ class EventManager(object):
         self._handlers = list(handlers) or []
         self._last_event = None
         self._limit_output = limit_output
+        self._subscribers = dict()
+        self._async_dispatch = False
+        self._queue_size = 100
+        self._overflow = 'drop_oldest'
 
     def event_report(self):
         for event, parameters in self._registered_events.iteritems():
@@ -39,18 +177,62 @@ class EventManager(object):
                     print('* {}'.format(parameter))
 
     def add_handler(self, event_handler):
-        self._handlers.append(event_handler)
+        self._handlers.append(self._wrap(event_handler))
+        self._subscribers.clear()
+
+    def set_async_dispatch(self, queue_size=100, overflow='drop_oldest'):
+        """
+        Dispatches the events to the non synchronous handlers from their own thread.
+        """
+        self._async_dispatch = True
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._handlers = [self._wrap(handler) for handler in self._handlers]
+        self._subscribers.clear()
+
+    def _wrap(self, handler):
+        if not self._async_dispatch or handler.synchronous or isinstance(handler, AsyncHandler):
+            return handler
+        return AsyncHandler(handler, self._queue_size, self._overflow)
+
+    def handler_stats(self):
+        return [handler.stats() for handler in self._handlers if isinstance(handler, AsyncHandler)]
+
+    def shutdown(self, timeout=5):
+        for handler in self._handlers:
+            if isinstance(handler, AsyncHandler):
+                handler.stop(timeout)
 
     def register_event(self, name, parameters=[]):
         self._registered_events[name] = parameters
 
+    def subscribers(self, event, level='info'):
+        """
+        Handlers that want the given event at the given level.
+        :rtype: list of EventHandler
+        """
+        key = (event, level)
+        handlers = self._subscribers.get(key)
+        if handlers is None:
+            handlers = self._subscribers[key] = [h for h in self._handlers if h.dynamic or h.wants(event, level)]
+        return [h for h in handlers if not h.dynamic or h.wants(event, level)]
+
+    def is_subscribed(self, event, level='info'):
+        return len(self.subscribers(event, level)) > 0
+
     def emit(self, event, sender=None, level='info', formatted='', data={}):
+        """
+        Sends an event to the handlers subscribed to it.
+
+        Nothing is validated nor formatted when no handler wants the event.
+        `data` may be a callable returning the dict, so costly payloads are
+        only built when needed.
+        """
         if not sender:
             raise ArgumentError('Event needs a sender!')
 
-        levels = ['info', 'warning', 'error', 'critical', 'debug']
-        if not level in levels:
-            raise ArgumentError('Event level needs to be in: {}'.format(levels))
+        if not level in LEVELS:
+            raise ArgumentError('Event level needs to be in: {}'.format(LEVELS))
 
         if event not in self._registered_events:
             raise EventNotRegisteredException("Event %s not registered..." % event)
@@ -63,6 +245,13 @@ class EventManager(object):
             if level == "info" and formatted:
                 self._last_event = event
 
+        handlers = self.subscribers(event, level)
+        if not handlers:
+            return
+
+        if callable(data):
+            data = data()
+
         # verify params match event
         parameters = self._registered_events[event]
         if parameters:
@@ -70,8 +259,14 @@ class EventManager(object):
                 if k not in parameters:
                     raise EventMalformedException("Event %s does not require parameter %s" % (event, k))
 
-        formatted_msg = formatted.format(**data)
+        formatted_msg = None
 
         # send off to the handlers
-        for handler in self._handlers:
+        for handler in handlers:
+            if not handler.uses_formatted:
+                handler.handle_event(event, sender, level, '', data)
+                continue
+
+            if formatted_msg is None:
+                formatted_msg = formatted.format(**data)
             handler.handle_event(event, sender, level, formatted_msg, data)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from math import cos, radians, sqrt
+
+import numpy as np
+
+from pokemongo_bot import geo
+from pokemongo_bot.cell_workers.utils import distance
+
+EARTH_RADIUS = 6371009.0  # meters
+
+
+class _Entry(object):
+    __slots__ = ('fort', 'latitude', 'longitude', 'x', 'y', 'cell')
+
+    def __init__(self, fort):
+        self.fort = fort
+        self.latitude = fort['latitude']
+        self.longitude = fort['longitude']
+        self.x = .0
+        self.y = .0
+        self.cell = None
+
+
+class FortIndex(object):
+    """
+    Uniform grid over the known forts, in meters of an equirectangular
+    projection centered on the first indexed fort.
+
+    The grid only prunes candidates, returned distances are computed with
+    `utils.distance` so results match a linear scan over `bot.cell['forts']`.
+    Forts without position or type are skipped, like `PokemonGoBot.get_forts`.
+    """
+
+    # a fort more than this far from the projection center triggers a rebuild
+    MAX_PROJECTION_SPAN = 1.0  # degrees
+    # projected distances are slightly off, keep a margin when pruning
+    PRUNING_MARGIN = 0.95
+
+    def __init__(self, cell_size=100.0):
+        self.cell_size = float(cell_size)
+        self._entries = {}
+        self._grid = {}
+        self._source = None
+        self._origin = None
+        self._cos_origin = 1.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, forts):
+        """
+        Synchronizes the index with the given forts, only the changed ones are (re)indexed.
+        :param forts: The forts of the meta cell.
+        :type forts: list of dict
+        :return: Nothing.
+        :rtype: None
+        """
+        # same list as last time, nothing changed
+        if forts is self._source:
+            return
+        self._source = forts
+
+        seen = set()
+        for fort in forts:
+            if 'latitude' not in fort or 'type' not in fort:
+                continue
+
+            fort_id = fort['id']
+            seen.add(fort_id)
+            entry = self._entries.get(fort_id)
+            if entry is not None and entry.latitude == fort['latitude'] and entry.longitude == fort['longitude']:
+                # lure or cooldown changes, position is the same
+                entry.fort = fort
+                continue
+
+            if entry is not None:
+                self._remove(fort_id)
+            self._add(_Entry(fort))
+
+        for fort_id in [i for i in self._entries if i not in seen]:
+            self._remove(fort_id)
+
+    def clear(self):
+        self._entries = {}
+        self._grid = {}
+        self._source = None
+        self._origin = None
+
+    def _project(self, latitude, longitude):
+        x = radians(longitude - self._origin[1]) * self._cos_origin * EARTH_RADIUS
+        y = radians(latitude - self._origin[0]) * EARTH_RADIUS
+        return x, y
+
+    def _cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def _add(self, entry):
+        if self._origin is None:
+            self._set_origin(entry.latitude, entry.longitude)
+        elif abs(entry.latitude - self._origin[0]) > self.MAX_PROJECTION_SPAN or \
+                abs(entry.longitude - self._origin[1]) > self.MAX_PROJECTION_SPAN:
+            # moved far away (teleport), reproject around the new place
+            entries = self._entries.values()
+            self._entries = {}
+            self._grid = {}
+            self._set_origin(entry.latitude, entry.longitude)
+            for other in entries:
+                self._add(other)
+
+        entry.x, entry.y = self._project(entry.latitude, entry.longitude)
+        entry.cell = self._cell_of(entry.x, entry.y)
+        self._entries[entry.fort['id']] = entry
+        self._grid.setdefault(entry.cell, []).append(entry)
+
+    def _remove(self, fort_id):
+        entry = self._entries.pop(fort_id)
+        bucket = self._grid[entry.cell]
+        bucket.remove(entry)
+        if not bucket:
+            del self._grid[entry.cell]
+
+    def _set_origin(self, latitude, longitude):
+        self._origin = (latitude, longitude)
+        self._cos_origin = cos(radians(latitude))
+
+    def _candidates(self, min_x, min_y, max_x, max_y):
+        min_cx, min_cy = self._cell_of(min_x, min_y)
+        max_cx, max_cy = self._cell_of(max_x, max_y)
+
+        # the box covers more cells than there are forts, scanning them is cheaper
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self._entries):
+            return self._entries.itervalues()
+
+        return (entry
+                for cx in xrange(min_cx, max_cx + 1)
+                for cy in xrange(min_cy, max_cy + 1)
+                for entry in self._grid.get((cx, cy), ()))
+
+    def _sorted(self, entries, latitude, longitude):
+        entries = list(entries)
+        distances = geo.haversine(
+            latitude, longitude,
+            np.fromiter((e.latitude for e in entries), float, len(entries)),
+            np.fromiter((e.longitude for e in entries), float, len(entries))
+        )
+        return [(float(distances[i]), entries[i].fort) for i in np.argsort(distances, kind='mergesort')]
+
+    def nearest(self, latitude, longitude, k=None, predicate=None):
+        """
+        Forts ordered by distance from a position.
+        :param k: Maximum number of forts to return, all forts if None.
+        :type k: int
+        :param predicate: Only forts for which it returns True are returned.
+        :type predicate: callable
+        :return: The forts, nearest first.
+        :rtype: list of dict
+        """
+        if not self._entries:
+            return []
+
+        x, y = self._project(latitude, longitude)
+        cx, cy = self._cell_of(x, y)
+        max_ring = max(max(abs(c[0] - cx), abs(c[1] - cy)) for c in self._grid)
+
+        # rings would visit more cells than there are occupied ones, sort everything
+        if k is None or (2 * max_ring + 1) ** 2 > 4 * len(self._grid):
+            entries = self._entries.itervalues()
+            if predicate is not None:
+                entries = (e for e in entries if predicate(e.fort))
+            return [fort for _, fort in self._sorted(entries, latitude, longitude)[:k]]
+
+        found = []
+        for ring in xrange(max_ring + 1):
+            for cell in self._ring(cx, cy, ring):
+                for entry in self._grid.get(cell, ()):
+                    if predicate is None or predicate(entry.fort):
+                        found.append((distance(latitude, longitude, entry.latitude, entry.longitude), entry.fort))
+
+            # every fort outside the visited rings is at least this far away
+            if len(found) >= k:
+                found.sort(key=lambda m: m[0])
+                del found[k:]
+                if found[-1][0] <= ring * self.cell_size * self.PRUNING_MARGIN:
+                    break
+
+        found.sort(key=lambda m: m[0])
+        return [fort for _, fort in found[:k]]
+
+    @staticmethod
+    def _ring(cx, cy, ring):
+        if ring == 0:
+            yield cx, cy
+            return
+        for dx in xrange(-ring, ring + 1):
+            yield cx + dx, cy - ring
+            yield cx + dx, cy + ring
+        for dy in xrange(-ring + 1, ring):
+            yield cx - ring, cy + dy
+            yield cx + ring, cy + dy
+
+    def within(self, latitude, longitude, radius, predicate=None):
+        """
+        Forts at most `radius` meters from a position.
+        :return: The forts, nearest first.
+        :rtype: list of dict
+        """
+        if not self._entries:
+            return []
+
+        x, y = self._project(latitude, longitude)
+        reach = radius / self.PRUNING_MARGIN
+        candidates = self._candidates(x - reach, y - reach, x + reach, y + reach)
+        if predicate is not None:
+            candidates = (e for e in candidates if predicate(e.fort))
+
+        return [fort for dist, fort in self._sorted(candidates, latitude, longitude) if dist <= radius]
+
+    def along_segment(self, a, b, width, predicate=None):
+        """
+        Forts at most `width` meters away from the segment going from `a` to `b`.
+        :param a: Start of the segment, (latitude, longitude).
+        :param b: End of the segment, (latitude, longitude).
+        :return: The forts, nearest from `a` first.
+        :rtype: list of dict
+        """
+        if not self._entries:
+            return []
+
+        ax, ay = self._project(a[0], a[1])
+        bx, by = self._project(b[0], b[1])
+        reach = width / self.PRUNING_MARGIN
+        candidates = self._candidates(
+            min(ax, bx) - reach, min(ay, by) - reach,
+            max(ax, bx) + reach, max(ay, by) + reach
+        )
+
+        dx, dy = bx - ax, by - ay
+        length = dx * dx + dy * dy
+        selected = []
+        for entry in candidates:
+            if predicate is not None and not predicate(entry.fort):
+                continue
+            t = .0
+            if length > 0:
+                t = max(.0, min(1.0, ((entry.x - ax) * dx + (entry.y - ay) * dy) / length))
+            px, py = ax + t * dx - entry.x, ay + t * dy - entry.y
+            if sqrt(px * px + py * py) * self.PRUNING_MARGIN <= width:
+                selected.append(entry)
+
+        return [fort for _, fort in self._sorted(selected, a[0], a[1])]
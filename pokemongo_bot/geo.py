@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized geodesy over numpy arrays.
+
+The functions broadcast like numpy operators: one position against arrays
+of positions gives one-to-many distances, column and row arrays give the
+many-to-many matrix. They are meant for the loops over forts, pokemons and
+clusters, `cell_workers.utils.distance` remains the scalar version.
+"""
+from __future__ import division
+
+import numpy as np
+
+EARTH_RADIUS = 6371000.0
+
+# WGS84 ellipsoid, as used by cell_workers.utils.coord2merc
+EARTH_RADIUS_MAJ = 6378137.0
+EARTH_RADIUS_MIN = 6356752.3142
+ECCENT = np.sqrt(1.0 - (EARTH_RADIUS_MIN / EARTH_RADIUS_MAJ) ** 2)
+COM = 0.5 * ECCENT
+
+
+def coordinates(items):
+    """
+    Latitudes and longitudes of a list of dicts having 'latitude' and
+    'longitude' keys (forts, pokemons...), or of (latitude, longitude) pairs.
+    :rtype: tuple of numpy.ndarray
+    """
+    if not len(items):
+        return np.empty(0), np.empty(0)
+    if isinstance(items[0], dict):
+        return (np.fromiter((item['latitude'] for item in items), float, len(items)),
+                np.fromiter((item['longitude'] for item in items), float, len(items)))
+    pairs = np.asarray([item[:2] for item in items], dtype=float)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great circle distance in meters, same formula as cell_workers.utils.distance.
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = 0.5 - np.cos(lat2 - lat1) / 2 + np.cos(lat1) * np.cos(lat2) * (1 - np.cos(lng2 - lng1)) / 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def equirectangular(lat1, lng1, lat2, lng2):
+    """
+    Distance in meters on the equirectangular projection. Faster, and less
+    than 0.1% off at the few kilometers the bot deals with.
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    x = (lng2 - lng1) * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS * np.hypot(x, y)
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2):
+    """
+    Distances between every position of the first arrays (rows) and every
+    position of the second ones (columns).
+    """
+    lats1, lngs1 = np.asarray(lats1, dtype=float), np.asarray(lngs1, dtype=float)
+    return haversine(lats1[:, None], lngs1[:, None], np.asarray(lats2)[None, :], np.asarray(lngs2)[None, :])
+
+
+def equirectangular_matrix(lats1, lngs1, lats2, lngs2):
+    lats1, lngs1 = np.asarray(lats1, dtype=float), np.asarray(lngs1, dtype=float)
+    return equirectangular(lats1[:, None], lngs1[:, None], np.asarray(lats2)[None, :], np.asarray(lngs2)[None, :])
+
+
+def distances(location, items):
+    """
+    Distances in meters from a (latitude, longitude) location to each of the items.
+    :param items: See coordinates.
+    :rtype: numpy.ndarray
+    """
+    lats, lngs = coordinates(items)
+    return haversine(location[0], location[1], lats, lngs)
+
+
+def argsort_by_distance(location, items):
+    """
+    Indexes of the items, nearest to the location first.
+    """
+    return np.argsort(distances(location, items), kind='mergesort')
+
+
+def mercator(lats, lngs):
+    """
+    Ellipsoidal mercator projection, the vectorized cell_workers.utils.coord2merc.
+    :return: x and y, in meters.
+    """
+    phi = np.radians(np.clip(lats, -89.5, 89.5))
+    con = ECCENT * np.sin(phi)
+    con = ((1.0 - con) / (1.0 + con)) ** COM
+    ts = np.tan(0.5 * (np.pi * 0.5 - phi)) / con
+    return EARTH_RADIUS_MAJ * np.radians(lngs), -EARTH_RADIUS_MAJ * np.log(ts)
+
+
+def inverse_mercator(x, y):
+    """
+    The vectorized cell_workers.utils.merc2coord.
+    :return: Latitudes and longitudes.
+    """
+    ts = np.exp(-np.asarray(y, dtype=float) / EARTH_RADIUS_MAJ)
+    phi = np.pi / 2.0 - 2 * np.arctan(ts)
+    for _ in range(15):
+        con = ECCENT * np.sin(phi)
+        dphi = np.pi / 2.0 - 2 * np.arctan(ts * ((1.0 - con) / (1.0 + con)) ** COM) - phi
+        phi = phi + dphi
+        if np.all(np.abs(dphi) < 0.000000001):
+            break
+    return np.degrees(phi), np.degrees(np.asarray(x, dtype=float) / EARTH_RADIUS_MAJ)
+
+
+def project(lats, lngs, origin):
+    """
+    Projects positions on a plane tangent at the origin, in meters.
+    :param origin: (latitude, longitude) of the origin.
+    :return: x (east) and y (north).
+    """
+    lat0, lng0 = np.radians(origin[0]), np.radians(origin[1])
+    x = (np.radians(lngs) - lng0) * np.cos(lat0) * EARTH_RADIUS
+    y = (np.radians(lats) - lat0) * EARTH_RADIUS
+    return x, y
+
+
+def unproject(x, y, origin):
+    lat0, lng0 = np.radians(origin[0]), np.radians(origin[1])
+    lats = lat0 + np.asarray(y) / EARTH_RADIUS
+    lngs = lng0 + np.asarray(x) / (np.cos(lat0) * EARTH_RADIUS)
+    return np.degrees(lats), np.degrees(lngs)
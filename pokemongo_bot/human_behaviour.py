@@ -3,9 +3,13 @@
 import time
 from random import random, uniform, gauss
 
+from pokemongo_bot.profiler import record_sleep
+
 
 def sleep(seconds, delta=0.3):
-    time.sleep(jitter(seconds,delta))
+    duration = jitter(seconds, delta)
+    record_sleep(duration)
+    time.sleep(duration)
 
 
 def jitter(value, delta=0.3):
@@ -17,6 +21,7 @@ def action_delay(low, high):
     # Waits for random number of seconds between low & high numbers
     longNum = uniform(low, high)
     shortNum = float("{0:.2f}".format(longNum))
+    record_sleep(shortNum)
     time.sleep(shortNum)
 
 
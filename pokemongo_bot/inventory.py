@@ -2,10 +2,13 @@ from __future__ import print_function
 import json
 import logging
 import os
+from bisect import bisect_left
 from collections import OrderedDict
 
 from pokemongo_bot.base_dir import _base_dir
+from pokemongo_bot.name_lookup import move_names, pokemon_names
 from pokemongo_bot.services.item_recycle_worker import ItemRecycler
+from pokemongo_bot.static_data import load_json
 
 '''
 Helper class for updating/retrieving Inventory data
@@ -37,7 +40,7 @@ class _StaticInventoryComponent(object):
     def init_static_data(cls):
         if not hasattr(cls, 'STATIC_DATA') or cls.STATIC_DATA is None:
             cls.STATIC_DATA = cls.process_static_data(
-                json.load(open(cls.STATIC_DATA_FILE)))
+                load_json(cls.STATIC_DATA_FILE))
 
     @classmethod
     def process_static_data(cls, data):
@@ -49,9 +52,13 @@ class _StaticInventoryComponent(object):
 class _BaseInventoryComponent(_StaticInventoryComponent):
     TYPE = None  # base key name for items of this type
     ID_FIELD = None  # identifier field for items of this type
+    DELETED_FIELD = None  # identifier field of the deleted items of this type, if they can be
 
     def __init__(self):
         self._data = {}
+        # payloads the items of _data were parsed from, to tell which ones a delta
+        # changes (parse must not modify them)
+        self._raw = {}
         super(_BaseInventoryComponent, self).__init__()
 
     def parse(self, item):
@@ -59,21 +66,51 @@ class _BaseInventoryComponent(_StaticInventoryComponent):
         # default is to use the dict directly
         return item
 
-    def retrieve_data(self, inventory):
+    def payloads(self, inventory):
         assert self.TYPE is not None
         assert self.ID_FIELD is not None
-        ret = {}
         for item in inventory:
-            data = item['inventory_item_data']
+            data = item.get('inventory_item_data', {})
             if self.TYPE in data:
                 item = data[self.TYPE]
-                key = item[self.ID_FIELD]
-                ret[key] = self.parse(item)
+                yield item[self.ID_FIELD], item
+
+    def retrieve_data(self, inventory):
+        ret = {}
+        for key, item in self.payloads(inventory):
+            ret[key] = self.parse(item)
         return ret
 
     def refresh(self, inventory):
+        self._raw = dict(self.payloads(inventory))
         self._data = self.retrieve_data(inventory)
 
+    def apply_delta(self, inventory):
+        """
+        Applies the items of a GET_INVENTORY delta to the cached ones: only
+        the items whose payload changed are parsed again, deleted ones are removed.
+        :param inventory: Inventory items changed since the last request.
+        :type inventory: list of dict
+        :return: Number of items added, updated or removed.
+        :rtype: int
+        """
+        changed = 0
+        for key, item in self.payloads(inventory):
+            if self._raw.get(key) != item:
+                self._raw[key] = item
+                self._data[key] = self.parse(item)
+                changed += 1
+
+        if self.DELETED_FIELD is not None:
+            for item in inventory:
+                key = item.get('deleted_item', {}).get(self.DELETED_FIELD)
+                if key is not None and key in self._data:
+                    self._data.pop(key)
+                    self._raw.pop(key, None)
+                    changed += 1
+
+        return changed
+
     def get(self, object_id):
         return self._data.get(object_id)
 
@@ -122,6 +159,13 @@ class Player(_BaseInventoryComponent):
     def refresh(self,inventory):
         self.player_stats = self.retrieve_data(inventory)
 
+    def apply_delta(self, inventory):
+        player_stats = self.retrieve_data(inventory)
+        if player_stats:
+            self.player_stats = player_stats
+            return 1
+        return 0
+
     def parse(self, item):
         if not item:
             item = {}
@@ -135,7 +179,7 @@ class Player(_BaseInventoryComponent):
     def retrieve_data(self, inventory):
         ret = {}
         for item in inventory:
-            data = item['inventory_item_data']
+            data = item.get('inventory_item_data', {})
             if self.TYPE in data:
                 item = data[self.TYPE]
                 ret = item
@@ -176,6 +220,8 @@ class Item(object):
     """
     Representation of an item.
     """
+    __slots__ = ('id', 'name', 'count')
+
     def __init__(self, item_id, item_count):
         """
         Representation of an item
@@ -399,6 +445,7 @@ class AppliedItems(_BaseInventoryComponent):
 class Pokemons(_BaseInventoryComponent):
     TYPE = 'pokemon_data'
     ID_FIELD = 'id'
+    DELETED_FIELD = 'pokemon_id'
     STATIC_DATA_FILE = os.path.join(_base_dir, 'data', 'pokemon.json')
 
     @classmethod
@@ -456,12 +503,11 @@ class Pokemons(_BaseInventoryComponent):
 
     @classmethod
     def id_for(cls, pokemon_name):
-        # TODO: Use a better searching algorithm. This one is O(n)
-        for data in cls.STATIC_DATA:
-            if data.name.lower() == pokemon_name.lower():
-                return data.id
-
-        raise Exception('Could not find pokemon named {}'.format(pokemon_name))
+        # case insensitive, names in data/locales work too
+        pokemon_id = pokemon_names().value(pokemon_name)
+        if pokemon_id is None:
+            raise Exception('Could not find pokemon named {}'.format(pokemon_name))
+        return pokemon_id
 
     @classmethod
     def first_evolution_id_for(cls, pokemon_id):
@@ -512,6 +558,7 @@ class Pokemons(_BaseInventoryComponent):
         if pokemon_unique_id not in self._data:
             raise ValueError("Pokemon not present in the inventory")
         self._data.pop(pokemon_unique_id)
+        self._raw.pop(pokemon_unique_id, None)
 
 
 #
@@ -605,7 +652,12 @@ class LevelToCPm(_StaticInventoryComponent):
 
     @classmethod
     def level_from_cpm(cls, cp_multiplier):
-        return min(range(len(cls.STATIC_DATA)), key=lambda i: abs(cls.STATIC_DATA[i] - cp_multiplier)) * 0.5 + 1
+        # closest multiplier, the lower level on a tie
+        data = cls.STATIC_DATA
+        i = bisect_left(data, cp_multiplier)
+        if i == len(data) or (i > 0 and cp_multiplier - data[i - 1] <= data[i] - cp_multiplier):
+            i -= 1
+        return i * 0.5 + 1
 
 
 class _Attacks(_StaticInventoryComponent):
@@ -655,7 +707,10 @@ class _Attacks(_StaticInventoryComponent):
     @classmethod
     def by_name(cls, name):
         # type: (string) -> Attack
-        return cls.BY_NAME[name]
+        attack = move_names().value(name)
+        if attack is None or cls.STATIC_DATA.get(attack.id) is not attack:
+            raise KeyError(name)
+        return attack
 
     @classmethod
     def list_for_type(cls, type_name):
@@ -739,6 +794,8 @@ class Type(object):
 
 
 class Candy(object):
+    __slots__ = ('type', 'quantity')
+
     def __init__(self, family_id, quantity):
         self.type = Pokemons.name_for(family_id)
         self.quantity = quantity
@@ -755,6 +812,8 @@ class Candy(object):
 
 
 class Egg(object):
+    __slots__ = ('_data',)
+
     def __init__(self, data):
         self._data = data
 
@@ -766,6 +825,13 @@ class PokemonInfo(object):
     """
     Static information about pokemon kind
     """
+    __slots__ = ('_data', 'id', 'name', 'classification', 'type1', 'type2', 'types',
+                 'capture_rate', 'flee_rate', 'buddy_distance_needed', 'fast_attacks',
+                 'charged_attack', 'movesets', 'movesets_by_attacks', 'base_attack',
+                 'base_defense', 'base_stamina', 'max_cp', 'first_evolution_id',
+                 'prev_evolution_id', 'prev_evolutions_all', 'evolution_cost',
+                 'has_next_evolution', 'last_evolution_ids', 'next_evolution_ids',
+                 'candyid', 'candyName', 'next_evolutions_all')
 
     def __init__(self, data):
         self._data = data
@@ -796,6 +862,11 @@ class PokemonInfo(object):
 
         # prepare movesets
         self.movesets = self._process_movesets()
+        # movesets by (fast attack id, charged attack id)
+        self.movesets_by_attacks = {}
+        for moveset in self.movesets:
+            key = (moveset.fast_attack.id, moveset.charged_attack.id)
+            self.movesets_by_attacks.setdefault(key, moveset)
 
         # Basic Values of the pokemon (identical for all pokemons of one kind)
         self.base_attack = data['BaseAttack']
@@ -929,7 +1000,16 @@ class PokemonInfo(object):
 
 
 class Pokemon(object):
+    # a bag can hold more than a thousand of them: no __dict__, the static
+    # data is shared and the rarely used values are computed when asked for
+    __slots__ = ('_data', 'unique_id', 'pokemon_id', 'static', 'cp', 'cp_m', 'level',
+                 'hp_max', 'hp', 'iv_attack', 'iv_defense', 'iv_stamina', 'name',
+                 'nickname_raw', 'nickname', 'in_fort', 'is_favorite', 'fast_attack',
+                 'charged_attack', 'iv', 'ivcp', 'cp_exact', 'moveset',
+                 '__score__')  # set by the PokemonOptimizer
+
     def __init__(self, data):
+        # payload of the server, as received
         self._data = data
         # Unique ID for this particular Pokemon
         self.unique_id = data.get('id', 0)
@@ -940,19 +1020,12 @@ class Pokemon(object):
 
         # Combat points value
         self.cp = data['cp']
-        # Base CP multiplier, fixed at the catch time
-        self.cp_bm = data['cp_multiplier']
-        # Changeable part of the CP multiplier, increasing at power up
-        self.cp_am = data.get('additional_cp_multiplier', .0)
         # Resulting CP multiplier
         self.cp_m = self.cp_bm + self.cp_am
 
         # Current pokemon level (half of level is a normal value)
         self.level = LevelToCPm.level_from_cpm(self.cp_m)
 
-        if 'level' not in self._data:
-            self._data['level'] = self.level
-
         # Maximum health points
         self.hp_max = data['stamina_max']
         # Current health points
@@ -975,8 +1048,6 @@ class Pokemon(object):
 
         self.in_fort = 'deployed_fort_id' in data
         self.is_favorite = data.get('favorite', 0) is 1
-        self.buddy_candy = data.get('buddy_candy_awarded', 0)
-        self.buddy_distance_needed = self.static.buddy_distance_needed
 
         self.fast_attack = FastAttacks.data_for(data['move_1'])
         self.charged_attack = ChargedAttacks.data_for(data['move_2'])  # type: ChargedAttack
@@ -984,23 +1055,27 @@ class Pokemon(object):
         # Individial values (IV) perfection percent
         self.iv = self._compute_iv_perfection()
 
-        # IV CP perfection - kind of IV perfection percent but calculated
-        #  using weight of each IV in its contribution to CP of the best
-        #  evolution of current pokemon
-        # So it tends to be more accurate than simple IV perfection
-        self.ivcp = self._compute_cp_perfection()
-
-        # Exact value of current CP (not rounded)
-        self.cp_exact = _calc_cp(
-            base_attack, base_defense, base_stamina,
-            self.iv_attack, self.iv_defense, self.iv_stamina, self.cp_m)
-        #assert max(int(self.cp_exact), 10) == self.cp
-
-        # Percent of maximum possible CP
-        self.cp_percent = self.cp_exact / self.static.max_cp
-
-        # Get moveset instance with calculated DPS and perfection percents
-        self.moveset = self._get_moveset()
+        # IV CP perfection, exact CP and moveset only depend on the species,
+        # IVs, CP multiplier and moves: computed once for all such pokemons
+        key = (self.pokemon_id, (self.iv_attack, self.iv_defense, self.iv_stamina),
+               self.cp_m, self.fast_attack.id, self.charged_attack.id)
+        stats = PokemonStats.get(key)
+        if stats is None:
+            # IV CP perfection - kind of IV perfection percent but calculated
+            #  using weight of each IV in its contribution to CP of the best
+            #  evolution of current pokemon
+            # So it tends to be more accurate than simple IV perfection
+            ivcp = self._compute_cp_perfection()
+
+            # Exact value of current CP (not rounded)
+            cp_exact = _calc_cp(
+                base_attack, base_defense, base_stamina,
+                self.iv_attack, self.iv_defense, self.iv_stamina, self.cp_m)
+            #assert max(int(cp_exact), 10) == self.cp
+
+            # Get moveset instance with calculated DPS and perfection percents
+            stats = PokemonStats.put(key, (ivcp, cp_exact, self._get_moveset()))
+        self.ivcp, self.cp_exact, self.moveset = stats
 
     def __str__(self):
         return self.name
@@ -1057,6 +1132,76 @@ class Pokemon(object):
     def iv_display(self):
         return '{}/{}/{}'.format(self.iv_attack, self.iv_defense, self.iv_stamina)
 
+    @property
+    def cp_bm(self):
+        # Base CP multiplier, fixed at the catch time
+        return self._data['cp_multiplier']
+
+    @property
+    def cp_am(self):
+        # Changeable part of the CP multiplier, increasing at power up
+        return self._data.get('additional_cp_multiplier', .0)
+
+    @property
+    def cp_percent(self):
+        # Percent of maximum possible CP
+        return self.cp_exact / self.static.max_cp
+
+    @property
+    def buddy_candy(self):
+        return self._data.get('buddy_candy_awarded', 0)
+
+    @property
+    def buddy_distance_needed(self):
+        return self.static.buddy_distance_needed
+
+    #
+    # Values the PokemonOptimizer rules can sort on
+
+    @property
+    def ncp(self):
+        return self.cp_percent
+
+    @property
+    def max_cp(self):
+        return self.static.max_cp
+
+    @property
+    def dps(self):
+        return self.moveset.dps
+
+    @property
+    def dps1(self):
+        return self.fast_attack.dps
+
+    @property
+    def dps2(self):
+        return self.charged_attack.dps
+
+    @property
+    def dps_attack(self):
+        return self.moveset.dps_attack
+
+    @property
+    def dps_defense(self):
+        return self.moveset.dps_defense
+
+    @property
+    def attack_perfection(self):
+        return self.moveset.attack_perfection
+
+    @property
+    def defense_perfection(self):
+        return self.moveset.defense_perfection
+
+    @property
+    def candy(self):
+        return self.candy_quantity
+
+    @property
+    def candy_to_evolution(self):
+        return max(self.evolution_cost - self.candy_quantity, 0)
+
     def _compute_iv_perfection(self):
         total_iv = self.iv_attack + self.iv_defense + self.iv_stamina
         iv_perfection = round((total_iv / 45.0), 2)
@@ -1105,12 +1250,7 @@ class Pokemon(object):
     def _get_moveset(self):
         move1 = self.fast_attack
         move2 = self.charged_attack
-        movesets = self.static.movesets
-        current_moveset = None
-        for moveset in movesets:  # type: Moveset
-            if moveset.fast_attack == move1 and moveset.charged_attack == move2:
-                current_moveset = moveset
-                break
+        current_moveset = self.static.movesets_by_attacks.get((move1.id, move2.id))
 
         if current_moveset is None:
             error = "Unexpected moveset [{}, {}] for #{} {}," \
@@ -1124,7 +1264,45 @@ class Pokemon(object):
         return current_moveset
 
 
+class PokemonStats(object):
+    """
+    Bounded cache of the values a Pokemon derives from its species, IVs, CP
+    multiplier and moves, so that the pokemons of a refreshed inventory do
+    not compute them again. Least recently used values are dropped first.
+    """
+    MAX_SIZE = 5000
+
+    _cache = OrderedDict()
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def get(cls, key):
+        stats = cls._cache.pop(key, None)
+        if stats is None:
+            cls.misses += 1
+            return None
+        cls.hits += 1
+        cls._cache[key] = stats
+        return stats
+
+    @classmethod
+    def put(cls, key, stats):
+        cls._cache[key] = stats
+        while len(cls._cache) > cls.MAX_SIZE:
+            cls._cache.popitem(last=False)
+        return stats
+
+    @classmethod
+    def clear(cls):
+        cls._cache.clear()
+        cls.hits = 0
+        cls.misses = 0
+
+
 class Attack(object):
+    __slots__ = ('id', 'name', 'type', 'damage', 'duration', 'energy', 'dps', 'rate_in_type')
+
     def __init__(self, data):
         # self._data = data  # Not needed - all saved in fields
         self.id = data['id']
@@ -1183,6 +1361,8 @@ class Attack(object):
 
 
 class ChargedAttack(Attack):
+    __slots__ = ()
+
     def __init__(self, data):
         super(ChargedAttack, self).__init__(data)
 
@@ -1192,6 +1372,9 @@ class ChargedAttack(Attack):
 
 
 class Moveset(object):
+    __slots__ = ('pokemon_id', 'fast_attack', 'charged_attack', 'dps', 'dps_defense', 'dps_attack',
+                 'attack_perfection', 'defense_perfection')
+
     def __init__(self, fm, chm, pokemon_types=(), pokemon_id=-1):
         # type: (Attack, ChargedAttack, List[Type], int) -> None
         if len(pokemon_types) <= 0 < pokemon_id:
@@ -1254,8 +1437,15 @@ class Moveset(object):
 
 
 class Inventory(object):
+    # Deltas applied in a row before asking for the whole inventory again,
+    # which also drops the changes only made to the cached inventory
+    FULL_REFRESH_EVERY = 30
+
     def __init__(self, bot):
         self.bot = bot
+        # new_timestamp_ms of the last GET_INVENTORY response, 0 before the first one
+        self.last_timestamp_ms = 0
+        self.deltas_applied = 0
         self.pokedex = Pokedex()
         self.candy = Candies()
         self.items = Items()
@@ -1267,17 +1457,52 @@ class Inventory(object):
         self.item_inventory_size = None
         self.pokemon_inventory_size = None
 
+    def request_args(self):
+        """
+        Arguments of the next GET_INVENTORY request: the changes since the last
+        response, or the whole inventory every FULL_REFRESH_EVERY requests.
+        :rtype: dict
+        """
+        if self.last_timestamp_ms > 0 and self.deltas_applied < self.FULL_REFRESH_EVERY:
+            return {'last_timestamp_ms': self.last_timestamp_ms}
+        return {}
+
     def refresh(self, inventory=None):
         if inventory is None:
-            inventory = self.bot.api.get_inventory()
-
-        inventory = inventory['responses']['GET_INVENTORY']['inventory_delta']['inventory_items']
-        for i in (self.pokedex, self.candy, self.items, self.pokemons, self.player):
-            i.refresh(inventory)
-
-        # self.applied_items = [x["inventory_item_data"] for x in inventory if "applied_items" in x["inventory_item_data"]]
-        self.egg_incubators = [x["inventory_item_data"] for x in inventory if "egg_incubators" in x["inventory_item_data"]]
-
+            inventory = self.bot.api.get_inventory(**self.request_args())
+
+        delta = inventory['responses']['GET_INVENTORY']['inventory_delta']
+        new_timestamp_ms = delta.get('new_timestamp_ms', 0)
+        inventory = delta.get('inventory_items', [])
+        components = (self.pokedex, self.candy, self.items, self.pokemons, self.player)
+
+        # a delta answers a request with last_timestamp_ms, given back as original_timestamp_ms
+        original_timestamp_ms = delta.get('original_timestamp_ms', 0)
+        if original_timestamp_ms > 0 and self.last_timestamp_ms > 0:
+            if new_timestamp_ms < self.last_timestamp_ms:
+                # answer to an older request, the cache is already more recent
+                return
+            if original_timestamp_ms > self.last_timestamp_ms:
+                # changes are missing in between, get everything next time
+                self.deltas_applied = self.FULL_REFRESH_EVERY
+            else:
+                self.deltas_applied += 1
+
+            for i in components:
+                i.apply_delta(inventory)
+
+            egg_incubators = [x["inventory_item_data"] for x in inventory if "egg_incubators" in x.get("inventory_item_data", {})]
+            if egg_incubators:
+                self.egg_incubators = egg_incubators
+        else:
+            for i in components:
+                i.refresh(inventory)
+
+            # self.applied_items = [x["inventory_item_data"] for x in inventory if "applied_items" in x["inventory_item_data"]]
+            self.egg_incubators = [x["inventory_item_data"] for x in inventory if "egg_incubators" in x["inventory_item_data"]]
+            self.deltas_applied = 0
+
+        self.last_timestamp_ms = max(self.last_timestamp_ms, new_timestamp_ms)
         self.update_web_inventory()
 
     def init_inventory_outfile(self):
@@ -1297,15 +1522,7 @@ class Inventory(object):
         if not os.path.exists(web_inventory):
             self.init_inventory_outfile()
 
-        json_inventory = self.jsonify_inventory()
-
-        try:
-            with open(web_inventory, "w") as outfile:
-                json.dump(json_inventory, outfile)
-        except (IOError, ValueError) as e:
-            self.bot.logger.info('[x] Error while opening inventory file for write: %s' % e, 'red')
-        except:
-            raise FileIOException("Unexpected error writing to {}".web_inventory)
+        self.bot.web_state.write(web_inventory, self.jsonify_inventory())
 
     def jsonify_inventory(self):
         json_inventory = []
@@ -1322,7 +1539,10 @@ class Inventory(object):
             json_inventory.append({"inventory_item_data": {"item": {"item_id": item_id, "count": item.count}}})
 
         for pokemon in self.pokemons.all_with_eggs():
-            json_inventory.append({"inventory_item_data": {"pokemon_data": pokemon._data}})
+            pokemon_data = pokemon._data
+            if isinstance(pokemon, Pokemon) and 'level' not in pokemon_data:
+                pokemon_data = dict(pokemon_data, level=pokemon.level)
+            json_inventory.append({"inventory_item_data": {"pokemon_data": pokemon_data}})
 
         for inc in self.egg_incubators:
             json_inventory.append({"inventory_item_data": inc})
@@ -1433,6 +1653,17 @@ def refresh_inventory(data=None):
     except AttributeError:
         print('_inventory was not initialized')
 
+def refresh_request_args():
+    """
+    Arguments of the GET_INVENTORY request to refresh the cached inventory.
+    :return: The last_timestamp_ms to only get the changes, if any.
+    :rtype: dict
+    """
+    try:
+        return _inventory.request_args()
+    except AttributeError:
+        return {}
+
 def jsonify_inventory():
     try:
         return _inventory.jsonify_inventory()
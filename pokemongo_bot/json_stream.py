@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 16 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+class _Stream(object):
+    """
+    Text buffer over an iterator of chunks, consumed one JSON token or value at a time.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._data = ''
+        self._pos = 0
+        self._eof = False
+
+    def _more(self, size=1):
+        """
+        Reads chunks until at least `size` more characters are buffered.
+        :return: False if the end of the stream was reached first.
+        """
+        if self._pos:
+            # drop what was already consumed
+            self._data = self._data[self._pos:]
+            self._pos = 0
+
+        target = len(self._data) + size
+        chunks = [self._data]
+        length = len(self._data)
+        while length < target:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                break
+            chunks.append(chunk)
+            length += len(chunk)
+        self._data = ''.join(chunks)
+        return length >= target
+
+    def peek(self):
+        """
+        The next non whitespace character, or '' at the end of the stream.
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._data, self._pos).end()
+            if self._pos < len(self._data):
+                return self._data[self._pos]
+            if self._eof or not self._more():
+                return ''
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expecting one of "{}" at "{}"'.format(characters, self._data[self._pos:self._pos + 20]))
+        self._pos += 1
+        return character
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._data, self._pos)
+            except ValueError:
+                if self._eof:
+                    raise
+                # most likely cut in the middle, double what is buffered and retry
+                self._more(max(len(self._data) - self._pos, CHUNK_SIZE))
+                continue
+
+            # a number at the end of the buffer might go on in the next chunk
+            if end == len(self._data) and not self._eof:
+                self._more()
+                continue
+
+            self._pos = end
+            return value
+
+
+def iter_items(chunks, key=None):
+    """
+    Yields the elements of a JSON list one at a time, as soon as they are
+    read, without building the whole document.
+
+    The list is either the document itself or the value of `key` in the
+    top level object. If that value is an object, its values are yielded.
+    :param chunks: Iterable of unicode chunks of the document.
+    :param key: Key of the list in the top level object.
+    :raises ValueError: If the document is not valid JSON.
+    """
+    stream = _Stream(chunks)
+
+    first = stream.peek()
+    if first == '{':
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            name = stream.value()
+            stream.expect(':')
+            if name == key:
+                if stream.peek() == '[':
+                    break
+                value = stream.value()
+                if isinstance(value, dict):
+                    for item in value.itervalues():
+                        yield item
+                return
+            stream.value()
+            if stream.expect(',}') == '}':
+                return
+    elif first != '[':
+        stream.value()
+        return
+
+    stream.expect('[')
+    if stream.peek() == ']':
+        return
+    while True:
+        yield stream.value()
+        if stream.expect(',]') == ']':
+            return
+
+
+def iter_response_items(response, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Same as iter_items, reading the body of a streamed requests response
+    (`requests.get(url, stream=True)`). The response is closed once done.
+    """
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+
+    def chunks():
+        for chunk in response.iter_content(chunk_size):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+    try:
+        for item in iter_items(chunks(), key):
+            yield item
+    finally:
+        response.close()
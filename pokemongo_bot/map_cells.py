@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+from collections import OrderedDict
+
+from s2sphere import Cell, CellId, LatLng
+
+
+class _StoredCell(object):
+    def __init__(self, cell_id):
+        center = LatLng.from_point(Cell(CellId(cell_id)).get_center())
+        self.latitude = center.lat().degrees
+        self.longitude = center.lng().degrees
+        self.forts = OrderedDict()
+        self.data = {
+            's2_cell_id': cell_id,
+            'current_timestamp_ms': 0,
+            'forts': [],
+            'spawn_points': [],
+            'wild_pokemons': [],
+            'catchable_pokemons': [],
+            'nearby_pokemons': []
+        }
+
+
+class MapCellStore(object):
+    """
+    Keeps the map cells received from GET_MAP_OBJECTS, keyed by S2 cell id.
+
+    Each cell remembers its current_timestamp_ms, which is sent back as
+    since_timestamp_ms so the server only returns the forts modified since
+    then. Those are merged into the stored cell, `deleted_objects` are
+    removed from it. Pokemons are live data: the lists of a returned cell
+    replace the stored ones, and pokemons of cells not returned again are
+    dropped once they despawn.
+    """
+
+    POKEMON_KEYS = ('wild_pokemons', 'catchable_pokemons', 'nearby_pokemons')
+
+    def __init__(self, max_cells=2000):
+        self.max_cells = max_cells
+        self._cells = OrderedDict()
+        self._last_update = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, cell_id):
+        return cell_id in self._cells
+
+    def timestamps(self, cell_ids):
+        """
+        :return: The since_timestamp_ms to send for each cell id, 0 when the cell is unknown.
+        :rtype: list of int
+        """
+        with self._lock:
+            return [
+                self._cells[cell_id].data['current_timestamp_ms'] if cell_id in self._cells else 0
+                for cell_id in cell_ids
+            ]
+
+    def update(self, map_cells):
+        """
+        Merges the map cells of a GET_MAP_OBJECTS response.
+        :param map_cells: `map_cells` of the response.
+        :type map_cells: list of dict
+        :return: Nothing.
+        :rtype: None
+        """
+        # same (cached) response, already merged
+        if map_cells is self._last_update:
+            return
+        self._last_update = map_cells
+
+        with self._lock:
+            for cell in map_cells:
+                self._merge(cell)
+
+            while len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+
+    def _merge(self, cell):
+        cell_id = cell['s2_cell_id']
+        stored = self._cells.pop(cell_id, None) or _StoredCell(cell_id)
+        # most recently updated cells are kept at the end
+        self._cells[cell_id] = stored
+        data = stored.data
+
+        forts_changed = False
+        for fort in cell.get('forts', []):
+            stored.forts[fort['id']] = fort
+            forts_changed = True
+        for object_id in cell.get('deleted_objects', []):
+            if stored.forts.pop(object_id, None) is not None:
+                forts_changed = True
+        if forts_changed:
+            data['forts'] = list(stored.forts.values())
+
+        if 'spawn_points' in cell:
+            data['spawn_points'] = cell['spawn_points']
+
+        for key in self.POKEMON_KEYS:
+            data[key] = cell.get(key, [])
+
+        for pokemon in data['nearby_pokemons']:
+            pokemon['latitude'] = stored.latitude
+            pokemon['longitude'] = stored.longitude
+            pokemon['s2_cell_id'] = cell_id
+
+        data['current_timestamp_ms'] = cell.get('current_timestamp_ms', data['current_timestamp_ms'])
+
+    def expire(self, now_ms=None):
+        """
+        Drops the pokemons that have despawned.
+        :param now_ms: Current time in milliseconds.
+        :type now_ms: int
+        :return: Nothing.
+        :rtype: None
+        """
+        if now_ms is None:
+            now_ms = time.time() * 1000
+
+        def alive(pokemon):
+            expiration = pokemon.get('expiration_timestamp_ms', 0)
+            if expiration <= 0 and 0 < pokemon.get('time_till_hidden_ms', 0):
+                expiration = pokemon.get('last_modified_timestamp_ms', 0) + pokemon['time_till_hidden_ms']
+            return expiration <= 0 or expiration > now_ms
+
+        with self._lock:
+            for stored in self._cells.itervalues():
+                for key in ('wild_pokemons', 'catchable_pokemons'):
+                    pokemons = stored.data[key]
+                    if pokemons:
+                        stored.data[key] = [p for p in pokemons if alive(p)]
+
+    def cells(self, cell_ids):
+        """
+        :return: The stored cells for the given cell ids, unknown ids are skipped.
+        :rtype: list of dict
+        """
+        with self._lock:
+            return [self._cells[cell_id].data for cell_id in cell_ids if cell_id in self._cells]
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._last_update = None
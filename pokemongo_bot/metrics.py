@@ -1,8 +1,9 @@
 import time
 from datetime import timedelta
-from pokemongo_bot.inventory import Pokemons
+from pokemongo_bot.inventory import Pokemons, PokemonStats
 from pokemongo_bot.inventory import refresh_inventory
 from pokemongo_bot import inventory
+from pokemongo_bot.walkers.polyline_generator import PolylineObjectHandler
 
 class Metrics(object):
 
@@ -80,6 +81,29 @@ class Metrics(object):
     def stardust_per_hour(self):
         return self.earned_dust()/(time.time() - self.start_time)*3600
 
+    def api_request_rate(self):
+        """
+        Returns the current rate allowed by the adaptive API rate limiter.
+        :return: Requests per second.
+        :rtype: float
+        """
+        return self.bot.api.rate_limiter.rate
+
+    def api_throttled(self):
+        return self.bot.api.rate_limiter.throttled_count
+
+    def route_cache_hits(self):
+        return PolylineObjectHandler.hits
+
+    def route_cache_misses(self):
+        return PolylineObjectHandler.misses
+
+    def pokemon_stats_hits(self):
+        return PokemonStats.hits
+
+    def pokemon_stats_misses(self):
+        return PokemonStats.misses
+
     def hatched_eggs(self, update):
         if (update):
             self.eggs['hatched'] += update
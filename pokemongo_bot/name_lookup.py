@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import glob
+import json
+import os
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+from pokemongo_bot.base_dir import _base_dir
+
+LOCALES_DIR = os.path.join(_base_dir, 'data', 'locales')
+
+_FOLDING = dict((ord(x), y) for x, y in zip('\u2640\u2641\u2642.-_', [' f', ' f', ' m', ' ', ' ', ' ']))
+
+
+def fold(name):
+    """
+    Name as compared by the lookups: lower case, gender signs as " f" and " m",
+    dots, dashes and repeated spaces as one space.
+    """
+    if not isinstance(name, unicode):
+        name = name.decode('utf-8', 'replace')
+    return ' '.join(name.lower().translate(_FOLDING).split())
+
+
+def _trigrams(folded):
+    padded = '  %s ' % folded
+    return set(padded[i:i + 3] for i in xrange(len(padded) - 2))
+
+
+class NameIndex(object):
+    """
+    Names of one kind of things (species, items, moves), looked up case
+    insensitively, by their aliases (other languages) or approximately.
+
+    Approximate lookups are the difflib.get_close_matches of the closest
+    names by trigram, and the last results are kept for repeated queries.
+    """
+    MAX_SIZE = 1024
+    # Names sharing the most trigrams with the query, compared with difflib
+    CANDIDATES = 10
+
+    def __init__(self, names, aliases=None):
+        """
+        :param names: Values by name.
+        :type names: dict
+        :param aliases: Names by alias, for the names known by other names.
+        :type aliases: dict
+        """
+        self._values = dict(names)
+        self._names = {}
+        for name in names:
+            self._names.setdefault(fold(name), name)
+        for alias, name in (aliases or {}).iteritems():
+            if name in self._values:
+                # the names themselves have precedence
+                self._names.setdefault(fold(alias), name)
+
+        self._by_trigram = {}
+        for folded in self._names:
+            for trigram in _trigrams(folded):
+                self._by_trigram.setdefault(trigram, []).append(folded)
+
+        self._closest = OrderedDict()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name):
+        """
+        :return: The name, as it is known, if the name or one of its aliases
+                 is the same regardless of case. None otherwise.
+        """
+        if not name:
+            return None
+        return self._names.get(fold(name))
+
+    def value(self, name):
+        """
+        :return: The value of the name, or of the name it is an alias of.
+        """
+        return self._values.get(self.get(name))
+
+    def closest(self, name, cutoff=0.6):
+        """
+        :return: The name, or the closest known one if it is not known. None
+                 if none is close enough (see difflib.get_close_matches).
+        """
+        if not name:
+            return None
+        folded = fold(name)
+        key = (folded, cutoff)
+
+        closest = self._closest.pop(key, None)
+        if closest is None:
+            closest = self._names.get(folded) or self._search(folded, cutoff) or ''
+        self._closest[key] = closest
+        while len(self._closest) > self.MAX_SIZE:
+            self._closest.popitem(last=False)
+        return closest or None
+
+    def _search(self, folded, cutoff):
+        shared = {}
+        for trigram in _trigrams(folded):
+            for candidate in self._by_trigram.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:self.CANDIDATES]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(folded)
+        best = None
+        for candidate in candidates:
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                score = matcher.ratio()
+                if score >= cutoff and (best is None or (score, candidate) > best):
+                    best = (score, candidate)
+        return self._names[best[1]] if best is not None else None
+
+
+def _locale_aliases():
+    # names in each language, by their english name
+    aliases = {}
+    for path in sorted(glob.glob(os.path.join(LOCALES_DIR, '*.json'))):
+        with open(path) as infile:
+            for name, translation in json.load(infile).iteritems():
+                aliases.setdefault(translation, name)
+    return aliases
+
+
+_pokemon_names = None
+_item_names = None
+_move_names = None
+
+
+def pokemon_names():
+    """
+    Species names, with their names in data/locales as aliases.
+    :return: Pokemon ids by name.
+    :rtype: NameIndex
+    """
+    global _pokemon_names
+    if _pokemon_names is None:
+        from pokemongo_bot.inventory import Pokemons
+        _pokemon_names = NameIndex(dict((p.name, p.id) for p in Pokemons.STATIC_DATA), _locale_aliases())
+    return _pokemon_names
+
+
+def item_names():
+    """
+    :return: Item ids by name.
+    :rtype: NameIndex
+    """
+    global _item_names
+    if _item_names is None:
+        from pokemongo_bot.inventory import Items
+        Items.init_static_data()
+        _item_names = NameIndex(dict((name, int(item_id)) for item_id, name in Items.STATIC_DATA.iteritems()))
+    return _item_names
+
+
+def move_names():
+    """
+    Fast and charged attack names.
+    :return: Attacks by name.
+    :rtype: NameIndex
+    """
+    global _move_names
+    if _move_names is None:
+        from pokemongo_bot.inventory import ChargedAttacks, FastAttacks
+        moves = dict(FastAttacks.BY_NAME)
+        moves.update(ChargedAttacks.BY_NAME)
+        _move_names = NameIndex(moves)
+    return _move_names
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import numpy as np
+
+
+class PokemonTable(object):
+    """
+    The pokemons of the bag in columns, for the PokemonOptimizer rules.
+
+    Each attribute a rule refers to ("iv", "ncp", "candy"...) is read once
+    from all the pokemons into a numpy array. A rule is then evaluated on a
+    group of pokemons, given as an array of their rows, with array
+    operations instead of attribute lookups on every pokemon. Each rule is
+    evaluated once on the whole bag, the groups only pick their rows.
+    """
+
+    def __init__(self, pokemons):
+        self.pokemons = []
+        self._rows = {}
+        self._columns = {}
+        self._rules = {}
+        self.add(pokemons)
+
+    def __len__(self):
+        return len(self.pokemons)
+
+    def add(self, pokemons):
+        added = False
+        for pokemon in pokemons:
+            if id(pokemon) not in self._rows:
+                self._rows[id(pokemon)] = len(self.pokemons)
+                self.pokemons.append(pokemon)
+                added = True
+        if added:
+            self._columns.clear()
+            self._rules.clear()
+
+    def rows(self, pokemons):
+        """
+        :return: The rows of the pokemons, added to the table if they were not in it.
+        :rtype: numpy.ndarray
+        """
+        pokemons = list(pokemons)
+        try:
+            rows = [self._rows[id(pokemon)] for pokemon in pokemons]
+        except KeyError:
+            self.add(pokemons)
+            rows = [self._rows[id(pokemon)] for pokemon in pokemons]
+        return np.array(rows, dtype=int)
+
+    def column(self, name):
+        """
+        The attribute of every pokemon, 0 for the ones not having it.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            if name == 'has_next_evolution':
+                values = [hasattr(p, 'has_next_evolution') and p.has_next_evolution() for p in self.pokemons]
+            else:
+                values = [getattr(p, name, 0) for p in self.pokemons]
+            try:
+                column = np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                column = np.array(values, dtype=object)
+            self._columns[name] = column
+        return column
+
+    def keys(self, rows, sort):
+        """
+        The values to sort the pokemons by, one array per attribute of `sort`.
+        Attributes starting with "-" are sorted in reverse.
+        """
+        keys = []
+        for name in sort:
+            if name[0] == '-':
+                keys.append(-self.column(name[1:])[rows])
+            else:
+                keys.append(self.column(name)[rows])
+        return keys
+
+    def satisfy(self, rows, req):
+        """
+        Which pokemons satisfy the requirements of a rule ("keep", "evolve"...),
+        like PokemonOptimizer.satisfy_requirements for a single pokemon.
+        :rtype: numpy.ndarray of bool
+        """
+        if type(req) is bool:
+            return np.full(len(rows), req, dtype=bool)
+
+        satisfy = np.ones(len(rows), dtype=bool)
+
+        for a, v in req.items():
+            value = self.column(a)[rows]
+
+            if (type(v) is str) or (type(v) is unicode):
+                v = float(v)
+
+            if type(v) is list:
+                if type(v[0]) is list:
+                    satisfy_range = np.zeros(len(rows), dtype=bool)
+
+                    for r in v:
+                        satisfy_range |= (value >= r[0]) & (value <= r[1])
+
+                    satisfy &= satisfy_range
+                else:
+                    satisfy &= (value >= v[0]) & (value <= v[1])
+            elif v < 0:
+                satisfy &= (value <= abs(v))
+            else:
+                satisfy &= (value >= v)
+
+        return satisfy
+
+    def score(self, rows, rule):
+        """
+        :return: The sort keys, then the masks of the pokemons to keep, that may
+                 be evolved, upgraded and set as buddy.
+        """
+        # rules are the dicts of the config, they do not change during a run
+        evaluated = self._rules.get(id(rule))
+        if evaluated is None or evaluated[0] is not rule:
+            evaluated = (rule, self._evaluate(np.arange(len(self.pokemons)), rule))
+            self._rules[id(rule)] = evaluated
+        keys, keep, may_try_evolve, may_try_upgrade, may_buddy = evaluated[1]
+        return [key[rows] for key in keys], keep[rows], may_try_evolve[rows], may_try_upgrade[rows], may_buddy[rows]
+
+    def _evaluate(self, rows, rule):
+        rule_keep = rule.get("keep", True)
+        rule_evolve = rule.get("evolve", True)
+        rule_upgrade = rule.get("upgrade", False)
+        rule_buddy = rule.get("buddy", False)
+
+        keep = self.satisfy(rows, rule_keep)
+        keep &= rule_keep not in [False, {}]
+
+        may_try_evolve = self.column('has_next_evolution')[rows].astype(bool)
+        may_try_evolve &= rule_evolve not in [False, {}]
+        may_try_evolve &= self.satisfy(rows, rule_evolve)
+
+        may_try_upgrade = self.satisfy(rows, rule_upgrade)
+        may_try_upgrade &= rule_upgrade not in [False, {}]
+
+        # the buddy requirements are the rule being enabled, on the pokemons not in a fort
+        may_buddy = self.column('in_fort')[rows] == 0
+        may_buddy &= rule_buddy not in [False, {}]
+
+        return self.keys(rows, rule.get("sort", [])), keep, may_try_evolve, may_try_upgrade, may_buddy
+
+
+def best_first(keys, count):
+    """
+    Order of the pokemons by decreasing keys, the first key first. Pokemons
+    with the same keys keep their order.
+    :param count: Number of pokemons, in case there is no key.
+    :rtype: numpy.ndarray
+    """
+    if not keys:
+        return np.arange(count)
+    if any(key.dtype == object for key in keys):
+        return np.array(sorted(range(count), key=lambda i: tuple(key[i] for key in keys), reverse=True), dtype=int)
+    # lexsort is stable and sorts by its last key first
+    return np.lexsort([-key for key in reversed(keys)])
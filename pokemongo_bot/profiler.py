@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+
+from pokemongo_bot.base_dir import _base_dir
+
+
+class RollingHistogram(object):
+    """
+    Keeps the last `size` samples of a value and computes percentiles on them.
+    """
+
+    def __init__(self, size=500):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+        self.total = .0
+
+    def add(self, value):
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct):
+        return _percentile(sorted(self._samples), pct)
+
+    def summary(self):
+        ordered = sorted(self._samples)
+        return OrderedDict([
+            ('samples', len(ordered)),
+            ('p50', _percentile(ordered, 50)),
+            ('p95', _percentile(ordered, 95)),
+            ('p99', _percentile(ordered, 99)),
+            ('max', ordered[-1] if ordered else .0),
+        ])
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return .0
+    return ordered[int(round((pct / 100.0) * (len(ordered) - 1)))]
+
+
+class _Section(object):
+    def __init__(self, window_size):
+        self.wall_time = RollingHistogram(window_size)
+        self.api_calls = RollingHistogram(window_size)
+        self.sleep_time = RollingHistogram(window_size)
+
+    def report(self):
+        return OrderedDict([
+            ('runs', self.wall_time.count),
+            ('wall_time', self.wall_time.summary()),
+            ('api_calls', self.api_calls.summary()),
+            ('api_calls_total', int(self.api_calls.total)),
+            ('sleep_time', self.sleep_time.summary()),
+            ('sleep_time_total', self.sleep_time.total),
+        ])
+
+
+class _Frame(object):
+    __slots__ = ('name', 'started', 'api_calls', 'sleep_time')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.api_calls = 0
+        self.sleep_time = .0
+
+
+class TickProfiler(object):
+    """
+    Records wall time, API call count and sleep time for every phase of
+    PokemonGoBot.tick and for every task run by it.
+
+    Measurements are inclusive: an API call made by a task is accounted to
+    the task and to the whole tick. Only the thread running the tick is
+    profiled, API calls made from the heartbeat timer are not accounted.
+
+    Example Config:
+    "profiler": {
+      "enabled": true,
+      "window_size": 500,
+      "report_interval": 60
+    }
+    """
+
+    TICK = 'tick'
+
+    def __init__(self, bot, enabled=False, window_size=500, report_interval=60):
+        self.bot = bot
+        self.enabled = enabled
+        self.window_size = window_size
+        self.report_interval = report_interval
+        self.last_report = time.time()
+
+        self._sections = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _section(self, name):
+        section = self._sections.get(name)
+        if section is None:
+            with self._lock:
+                section = self._sections.setdefault(name, _Section(self.window_size))
+        return section
+
+    @contextmanager
+    def measure(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        frame = _Frame(name)
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            section = self._section(name)
+            section.wall_time.add(time.time() - frame.started)
+            section.api_calls.add(frame.api_calls)
+            section.sleep_time.add(frame.sleep_time)
+
+    @contextmanager
+    def tick(self):
+        with self.measure(self.TICK):
+            yield
+
+        if self.enabled and time.time() - self.last_report >= self.report_interval:
+            self.last_report = time.time()
+            self.publish()
+
+    def add_api_call(self, count=1):
+        for frame in self._stack():
+            frame.api_calls += count
+
+    def add_sleep(self, seconds):
+        for frame in self._stack():
+            frame.sleep_time += seconds
+
+    def report(self):
+        with self._lock:
+            sections = list(self._sections.items())
+        return OrderedDict((name, section.report()) for name, section in sections)
+
+    def publish(self):
+        report = self.report()
+        self.bot.event_manager.emit(
+            'tick_profile',
+            sender=self,
+            level='debug',
+            formatted='Tick profile updated.',
+            data={'report': report}
+        )
+        self.dump(report)
+
+    def dump(self, report=None):
+        if report is None:
+            report = self.report()
+
+        path = os.path.join(_base_dir, 'data', 'tick-profile-%s.json' % self.bot.config.username)
+        try:
+            with open(path, 'w') as outfile:
+                json.dump(report, outfile, indent=2)
+        except IOError as e:
+            self.bot.logger.info('[x] Error while writing tick profile: %s' % e)
+
+
+_profiler = None  # type: TickProfiler
+
+
+def init_profiler(bot, enabled=False, window_size=500, report_interval=60):
+    global _profiler
+    _profiler = TickProfiler(bot, enabled, window_size, report_interval)
+    return _profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+def record_api_call(count=1):
+    if _profiler is not None and _profiler.enabled:
+        _profiler.add_api_call(count)
+
+
+def record_sleep(seconds):
+    if _profiler is not None and _profiler.enabled:
+        _profiler.add_sleep(seconds)
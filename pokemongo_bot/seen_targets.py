@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+
+class SeenTargets(object):
+    """
+    Remembers the map / sniper targets that were already handled, so feeds
+    listing them again are skipped.
+
+    Targets are keyed by their quantized location and pokemon id, the IDs
+    given by feeds might be blank or wrong by the time they are read. Keys
+    are kept in insertion order together with their expiration time: expired
+    entries are dropped when looked up, and the least recently seen ones are
+    evicted once `max_size` is reached.
+    """
+
+    def __init__(self, path=None, max_size=500, precision=4, ttl=3600):
+        self.path = path
+        self.max_size = max_size
+        self.scale = 10 ** precision
+        self.ttl = ttl
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self._entries = OrderedDict()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, pokemon):
+        return (
+            int(round(float(pokemon['latitude']) * self.scale)),
+            int(round(float(pokemon['longitude']) * self.scale)),
+            int(pokemon.get('pokemon_id') or 0)
+        )
+
+    def expiration(self, pokemon, now=None):
+        """
+        Time (in seconds) until which a target is remembered: its own
+        expiration, but never less than `ttl` seconds from now.
+        """
+        now = now or time.time()
+        expires = (
+            pokemon.get('expiration') or
+            pokemon.get('disappear_time') or
+            pokemon.get('expiration_timestamp_ms') or
+            pokemon.get('last_modified_timestamp_ms') or
+            0
+        )
+        try:
+            expires = float(expires)
+        except (TypeError, ValueError):
+            expires = 0
+        if expires > 10000000000:
+            expires /= 1000.0
+        return max(expires, now + self.ttl)
+
+    def contains(self, pokemon, now=None):
+        try:
+            key = self.key(pokemon)
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        expires = self._entries.get(key)
+        if expires is None:
+            return False
+        if expires < (now or time.time()):
+            del self._entries[key]
+            self._dirty = True
+            return False
+        return True
+
+    def add(self, pokemon, now=None):
+        try:
+            key = self.key(pokemon)
+        except (KeyError, TypeError, ValueError):
+            return
+
+        now = now or time.time()
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_size:
+            self.prune(now)
+        while len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+
+        self._entries[key] = self.expiration(pokemon, now)
+        self._dirty = True
+
+    def prune(self, now=None):
+        now = now or time.time()
+        expired = [key for key, expires in self._entries.iteritems() if expires < now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._dirty = True
+
+    def load(self):
+        """
+        Loads the targets saved by a previous run. Also reads the files of
+        older versions, which stored the whole pokemon dictionaries.
+        """
+        if not self.path or not os.path.isfile(self.path):
+            return
+
+        try:
+            with open(self.path) as infile:
+                targets = json.load(infile)
+        except (IOError, ValueError) as e:
+            self.logger.info('[x] Error while reading %s: %s' % (self.path, e))
+            return
+
+        now = time.time()
+        for target in targets:
+            if isinstance(target, dict) and 'latitude' in target and 'longitude' in target:
+                self.add(target, now)
+        self.prune(now)
+        self._dirty = False
+
+    def save(self):
+        """
+        Writes the targets to `path`, only if they changed since the last save.
+        """
+        if not self.path or not self._dirty:
+            return
+
+        targets = [
+            {
+                'latitude': float(lat) / self.scale,
+                'longitude': float(lng) / self.scale,
+                'pokemon_id': pokemon_id,
+                'expiration': expires
+            }
+            for (lat, lng, pokemon_id), expires in self._entries.iteritems()
+        ]
+        try:
+            with open(self.path, 'w') as outfile:
+                json.dump(targets, outfile)
+        except IOError as e:
+            self.logger.info('[x] Error while writing %s: %s' % (self.path, e))
+            return
+        self._dirty = False
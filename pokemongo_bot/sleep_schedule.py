@@ -55,6 +55,7 @@ class SleepSchedule(object):
         self.bot = bot
         self._last_index = -1
         self._next_index = -1
+        self.sleeping = False
         self._process_config(config)
         self._schedule_next_sleep()
 
@@ -287,5 +288,9 @@ class SleepSchedule(object):
             }
         )
 
-        sleep(sleep_to_go)
+        self.sleeping = True
+        try:
+            sleep(sleep_to_go)
+        finally:
+            self.sleeping = False
         self._last_index = self._next_index
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled bundle of the static game data.
+
+The static game data files of data/ (pokemons, moves, types, items...) are
+parsed by every bot process when it starts. The bundle keeps their JSON
+documents already parsed, in one marshal payload that loads several times
+faster than the JSON files:
+
+    python -m pokemongo_bot.static_data
+
+The bundle records the size and modification time of each file it was
+built from, and the checksum of its payload. When a file changed since
+(after an update), or the bundle is missing or damaged, the JSON files are
+read as before.
+"""
+from __future__ import print_function
+
+import hashlib
+import json
+import logging
+import marshal
+import os
+
+from pokemongo_bot.base_dir import _base_dir
+
+DATA_DIR = os.path.abspath(os.path.join(_base_dir, 'data'))
+BUNDLE_NAME = 'static_data.bundle'
+# Static game data files, the other JSON files of data/ are written by the bots
+STATIC_FILES = ('charged_moves.json', 'fast_moves.json', 'items.json', 'level_to_cpm.json',
+                'pokemon.json', 'pokemon_upgrade_cost.json', 'types.json', 'xp_per_level.json')
+# to change when the layout of the bundle changes
+BUNDLE_VERSION = 1
+BUNDLE_MAGIC = 'PGOBOT-STATIC-DATA'
+
+logger = logging.getLogger(__name__)
+
+_documents = {}  # by data directory, None when there is no usable bundle
+
+
+def _stamps(data_dir):
+    stamps = {}
+    for name in STATIC_FILES:
+        stat = os.stat(os.path.join(data_dir, name))
+        stamps[name] = [stat.st_size, stat.st_mtime]
+    return stamps
+
+
+def build_bundle(data_dir=DATA_DIR):
+    """
+    Compiles the static game data files of a data directory in its bundle.
+    :return: Path of the bundle.
+    :rtype: str
+    """
+    data_dir = os.path.abspath(data_dir)
+    documents = {}
+    for name in STATIC_FILES:
+        with open(os.path.join(data_dir, name)) as infile:
+            documents[name] = json.load(infile)
+    payload = marshal.dumps(documents)
+    header = {
+        'version': BUNDLE_VERSION,
+        'files': _stamps(data_dir),
+        'checksum': hashlib.sha1(payload).hexdigest()
+    }
+
+    path = os.path.join(data_dir, BUNDLE_NAME)
+    temp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(temp_path, 'wb') as outfile:
+        outfile.write(BUNDLE_MAGIC + '\n')
+        outfile.write(json.dumps(header) + '\n')
+        outfile.write(payload)
+    if os.name == 'nt' and os.path.exists(path):
+        # rename does not replace an existing file on windows
+        os.remove(path)
+    os.rename(temp_path, path)
+    _documents.pop(data_dir, None)
+    return path
+
+
+def load_bundle(data_dir=DATA_DIR):
+    """
+    :return: The JSON documents of the bundle by file name, None if it is
+             missing, stale or damaged.
+    :rtype: dict
+    """
+    path = os.path.join(data_dir, BUNDLE_NAME)
+    try:
+        with open(path, 'rb') as infile:
+            magic = infile.readline().rstrip('\n')
+            header = json.loads(infile.readline())
+            payload = infile.read()
+    except (IOError, ValueError):
+        return None
+
+    if magic != BUNDLE_MAGIC or header.get('version') != BUNDLE_VERSION:
+        logger.info('Static data bundle %s has another version, using the JSON files.', path)
+        return None
+    try:
+        stale = header.get('files') != _stamps(data_dir)
+    except OSError:
+        stale = True
+    if stale:
+        logger.info('Static data bundle %s is stale, using the JSON files.', path)
+        return None
+    if header.get('checksum') != hashlib.sha1(payload).hexdigest():
+        logger.warning('Static data bundle %s is damaged, using the JSON files.', path)
+        return None
+
+    try:
+        return marshal.loads(payload)
+    except (EOFError, ValueError, TypeError) as e:
+        logger.warning('Static data bundle %s can not be loaded (%s), using the JSON files.', path, e)
+        return None
+
+
+def load_json(path):
+    """
+    The JSON document of a data file, from the bundle of its directory when
+    it is up to date. Documents of the bundle are shared: do not modify them.
+    """
+    data_dir, name = os.path.split(os.path.abspath(path))
+    if name in STATIC_FILES:
+        if data_dir not in _documents:
+            _documents[data_dir] = load_bundle(data_dir)
+        documents = _documents[data_dir]
+        if documents is not None:
+            return documents[name]
+
+    with open(path) as infile:
+        return json.load(infile)
+
+
+def main():
+    path = build_bundle()
+    print('Static data bundle written to %s' % path)
+
+
+if __name__ == '__main__':
+    main()
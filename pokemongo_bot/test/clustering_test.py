@@ -0,0 +1,114 @@
+import random
+import unittest
+
+from pokemongo_bot.clustering import FortClusters, biggest_cluster
+from pokemongo_bot.cell_workers.utils import distance
+
+# ~1 meter in degrees of latitude
+METER = 1 / 111195.0
+
+
+def offset(meters_north, meters_east, origin=(40.0, -74.0)):
+    return origin[0] + meters_north * METER, origin[1] + meters_east * METER / 0.766
+
+
+class ClusteringTest(unittest.TestCase):
+    def test_no_points(self):
+        self.assertIsNone(biggest_cluster(50, []))
+
+    def test_single_point(self):
+        cluster = biggest_cluster(50, [offset(0, 0)])
+        self.assertEqual(cluster.members, [0])
+        self.assertAlmostEqual(cluster.latitude, 40.0)
+
+    def test_densest_group_is_found(self):
+        points = [offset(0, 0), offset(0, 90), offset(500, 0), offset(520, 10), offset(510, 30), offset(2000, 0)]
+        cluster = biggest_cluster(50, points)
+        self.assertEqual(cluster.members, [2, 3, 4])
+        for index in cluster.members:
+            self.assertLessEqual(distance(cluster.latitude, cluster.longitude, points[index][0], points[index][1]), 50.5)
+
+    def test_two_points_on_the_boundary(self):
+        # 99m apart: only a disk with both of them on its boundary covers them
+        cluster = biggest_cluster(50, [offset(0, 0), offset(0, 99)])
+        self.assertEqual(cluster.members, [0, 1])
+
+    def test_ties_are_broken_by_weight(self):
+        points = [offset(0, 0), offset(10, 0), offset(1000, 0), offset(1010, 0)]
+        self.assertEqual(biggest_cluster(50, points, [1, 1, 5, 5]).members, [2, 3])
+        self.assertEqual(biggest_cluster(50, points, [5, 5, 1, 1]).members, [0, 1])
+
+    def test_matches_exhaustive_search(self):
+        rand = random.Random(1)
+        points = [offset(rand.uniform(0, 300), rand.uniform(0, 300)) for _ in range(60)]
+        cluster = biggest_cluster(40, points)
+
+        # no fort nor middle of two forts does better
+        candidates = points + [((a[0] + b[0]) / 2, (a[1] + b[1]) / 2) for a in points for b in points]
+        best = max(sum(1 for p in points if distance(c[0], c[1], p[0], p[1]) <= 40) for c in candidates)
+        self.assertGreaterEqual(len(cluster), best)
+
+
+class FortClustersTest(unittest.TestCase):
+    def make_forts(self, seed, count=60, prefix='f'):
+        rand = random.Random(seed)
+        forts = {}
+        for i in range(count):
+            lat, lng = offset(rand.uniform(0, 400), rand.uniform(0, 400))
+            fort = {'id': '%s%d' % (prefix, i), 'latitude': lat, 'longitude': lng}
+            if rand.random() < 0.2:
+                fort['active_fort_modifier'] = 'lure'
+            forts[fort['id']] = fort
+        return forts
+
+    def summary(self, clusters):
+        return sorted((c['center'], c['size'], c['lured']) for c in clusters.clusters())
+
+    def test_best_cluster(self):
+        forts = dict((f['id'], f) for f in [
+            {'id': 'a', 'latitude': offset(0, 0)[0], 'longitude': offset(0, 0)[1]},
+            {'id': 'b', 'latitude': offset(0, 30)[0], 'longitude': offset(0, 30)[1]},
+            {'id': 'c', 'latitude': offset(20, 15)[0], 'longitude': offset(20, 15)[1]},
+            {'id': 'd', 'latitude': offset(300, 0)[0], 'longitude': offset(300, 0)[1], 'active_fort_modifier': 'lure'},
+            {'id': 'e', 'latitude': offset(300, 40)[0], 'longitude': offset(300, 40)[1]},
+        ])
+        clusters = FortClusters(38)
+        clusters.update(forts, offset(0, 0))
+
+        best = clusters.best(offset(0, 0), min_lured=0, min_size=2)
+        self.assertEqual((best['lured'], best['size']), (1, 2))
+        self.assertEqual(sorted(f['id'] for f in best['forts']), ['d', 'e'])
+        self.assertIsNone(clusters.best(offset(0, 0), min_lured=1, min_size=3))
+
+        # the lure moved
+        forts['d'] = dict(forts['d'])
+        del forts['d']['active_fort_modifier']
+        forts['a'] = dict(forts['a'], active_fort_modifier='lure')
+        clusters.update(forts, offset(0, 0))
+        best = clusters.best(offset(0, 0), min_lured=1, min_size=2)
+        self.assertEqual((best['lured'], best['size']), (1, 3))
+
+    def test_incremental_update_matches_full_build(self):
+        forts = self.make_forts(1)
+        clusters = FortClusters(38)
+        clusters.update(forts, offset(0, 0))
+
+        rand = random.Random(2)
+        for fort_id in rand.sample(sorted(forts), 10):
+            del forts[fort_id]
+        forts.update(self.make_forts(3, count=10, prefix='n'))
+        for fort_id in rand.sample(sorted(forts), 10):
+            fort = dict(forts[fort_id])
+            if fort.pop('active_fort_modifier', None) is None:
+                fort['active_fort_modifier'] = 'lure'
+            forts[fort_id] = fort
+        clusters.update(forts, offset(0, 0))
+
+        fresh = FortClusters(38)
+        fresh.update(forts, offset(0, 0))
+        self.assertEqual(self.summary(clusters), self.summary(fresh))
+        self.assertEqual(clusters.best(offset(0, 0), 1, 2)['center'], fresh.best(offset(0, 0), 1, 2)['center'])
+
+        clusters.update({}, offset(0, 0))
+        self.assertEqual(len(clusters), 0)
+        self.assertIsNone(clusters.best(offset(0, 0)))
@@ -0,0 +1,74 @@
+import random
+import unittest
+
+from pokemongo_bot.cell_workers.utils import distance
+from pokemongo_bot.fort_index import FortIndex
+
+ORIGIN = (40.7740, -73.9711)
+
+
+def make_fort(i, lat, lng, **kwargs):
+    fort = {'id': 'fort%d' % i, 'latitude': lat, 'longitude': lng, 'type': 1}
+    fort.update(kwargs)
+    return fort
+
+
+class FortIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(42)
+        self.forts = [
+            make_fort(i, ORIGIN[0] + rand.uniform(-0.02, 0.02), ORIGIN[1] + rand.uniform(-0.02, 0.02))
+            for i in range(300)
+        ]
+        self.index = FortIndex()
+        self.index.update(self.forts)
+
+    def linear(self, lat, lng):
+        return sorted(self.forts, key=lambda f: distance(lat, lng, f['latitude'], f['longitude']))
+
+    def test_nearest_matches_linear_sort(self):
+        expected = self.linear(*ORIGIN)
+        self.assertEqual(self.index.nearest(*ORIGIN), expected)
+        self.assertEqual(self.index.nearest(ORIGIN[0], ORIGIN[1], k=5), expected[:5])
+
+    def test_nearest_with_predicate(self):
+        even = lambda f: int(f['id'][4:]) % 2 == 0
+        expected = [f for f in self.linear(*ORIGIN) if even(f)][:3]
+        self.assertEqual(self.index.nearest(ORIGIN[0], ORIGIN[1], k=3, predicate=even), expected)
+
+    def test_within(self):
+        expected = [f for f in self.linear(*ORIGIN)
+                    if distance(ORIGIN[0], ORIGIN[1], f['latitude'], f['longitude']) <= 500]
+        self.assertTrue(expected)
+        self.assertEqual(self.index.within(ORIGIN[0], ORIGIN[1], 500), expected)
+
+    def test_along_segment(self):
+        target = (ORIGIN[0] + 0.01, ORIGIN[1] + 0.01)
+        forts = self.index.along_segment(ORIGIN, target, 100)
+
+        self.assertTrue(forts)
+        dists = [distance(ORIGIN[0], ORIGIN[1], f['latitude'], f['longitude']) for f in forts]
+        self.assertEqual(dists, sorted(dists))
+        # the ones selected are near the way, so never much farther than the target
+        total = distance(ORIGIN[0], ORIGIN[1], target[0], target[1])
+        self.assertTrue(all(d < total + 150 for d in dists))
+
+    def test_update_is_incremental(self):
+        forts = self.forts[10:] + [make_fort(1000, ORIGIN[0], ORIGIN[1], lure_info={'encounter_id': 1})]
+        self.index.update(forts)
+
+        self.assertEqual(len(self.index), 291)
+        self.assertEqual(self.index.nearest(ORIGIN[0], ORIGIN[1], k=1)[0]['id'], 'fort1000')
+        self.assertNotIn(self.forts[0], self.index.nearest(*ORIGIN))
+
+    def test_forts_without_type_are_skipped(self):
+        index = FortIndex()
+        index.update([{'id': 'gym', 'latitude': ORIGIN[0], 'longitude': ORIGIN[1]}])
+        self.assertEqual(index.nearest(*ORIGIN), [])
+
+    def test_teleport_reprojects(self):
+        far = make_fort(2000, 48.8584, 2.2945)
+        self.index.update(self.forts + [far])
+        self.assertEqual(self.index.nearest(far['latitude'], far['longitude'], k=1), [far])
+        self.assertEqual(self.index.nearest(ORIGIN[0], ORIGIN[1], k=3), self.linear(*ORIGIN)[:3])
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+import numpy as np
+
+from pokemongo_bot import geo
+from pokemongo_bot.cell_workers.utils import coord2merc, distance, merc2coord
+
+
+class GeoTest(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(0)
+        self.points = [(rand.uniform(-60, 60), rand.uniform(-180, 180)) for _ in range(50)]
+        self.near = [(40.0 + rand.uniform(0, 0.02), -74.0 + rand.uniform(0, 0.02)) for _ in range(50)]
+
+    def test_haversine_matches_distance(self):
+        origin = self.points[0]
+        lats, lngs = geo.coordinates(self.points)
+        result = geo.haversine(origin[0], origin[1], lats, lngs)
+        for (lat, lng), meters in zip(self.points, result):
+            self.assertAlmostEqual(meters, distance(origin[0], origin[1], lat, lng), delta=1e-3)
+
+    def test_equirectangular_is_close_at_short_range(self):
+        lats, lngs = geo.coordinates(self.near)
+        exact = geo.haversine(40.0, -74.0, lats, lngs)
+        approximate = geo.equirectangular(40.0, -74.0, lats, lngs)
+        self.assertTrue(np.allclose(exact, approximate, rtol=1e-3))
+
+    def test_matrix(self):
+        lats, lngs = geo.coordinates(self.near)
+        matrix = geo.haversine_matrix(lats[:3], lngs[:3], lats, lngs)
+        self.assertEqual(matrix.shape, (3, len(self.near)))
+        self.assertAlmostEqual(matrix[2, 7], distance(lats[2], lngs[2], lats[7], lngs[7]), delta=1e-6)
+        self.assertTrue(np.allclose(np.diag(matrix[:, :3]), 0))
+        self.assertEqual(geo.equirectangular_matrix(lats, lngs, lats[:2], lngs[:2]).shape, (len(self.near), 2))
+
+    def test_dicts_and_argsort(self):
+        forts = [{'latitude': lat, 'longitude': lng} for lat, lng in self.near]
+        order = geo.argsort_by_distance((40.0, -74.0), forts)
+        expected = sorted(range(len(forts)), key=lambda i: distance(40.0, -74.0, *self.near[i]))
+        self.assertEqual(list(order), expected)
+        self.assertEqual(len(geo.distances((40.0, -74.0), [])), 0)
+
+    def test_mercator_matches_utils(self):
+        lats, lngs = geo.coordinates(self.points)
+        x, y = geo.mercator(lats, lngs)
+        for i, (lat, lng) in enumerate(self.points):
+            self.assertAlmostEqual(x[i], coord2merc(lat, lng)[0], delta=1e-6)
+            self.assertAlmostEqual(y[i], coord2merc(lat, lng)[1], delta=1e-6)
+
+        back_lats, back_lngs = geo.inverse_mercator(x, y)
+        self.assertTrue(np.allclose(back_lats, lats) and np.allclose(back_lngs, lngs))
+        self.assertAlmostEqual(back_lats[3], merc2coord((x[3], y[3]))[0], delta=1e-9)
+
+    def test_project_round_trip(self):
+        lats, lngs = geo.coordinates(self.near)
+        x, y = geo.project(lats, lngs, self.near[0])
+        self.assertEqual((x[0], y[0]), (0, 0))
+        back_lats, back_lngs = geo.unproject(x, y, self.near[0])
+        self.assertTrue(np.allclose(back_lats, lats) and np.allclose(back_lngs, lngs))
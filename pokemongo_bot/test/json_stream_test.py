@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from pokemongo_bot.json_stream import iter_items
+
+
+def chunked(document, size):
+    return [document[i:i + size] for i in range(0, len(document), size)]
+
+
+class JSONStreamTest(unittest.TestCase):
+    def items(self, document, key=None):
+        text = json.dumps(document)
+        results = [list(iter_items(chunked(text, size), key)) for size in (1, 3, 7, len(text) or 1)]
+        for result in results[1:]:
+            self.assertEqual(result, results[0])
+        return results[0]
+
+    def test_list_under_key(self):
+        pokemons = [{'id': 1, 'name': u'Nidoran♂', 'tricky': ',]}"'}, {'id': 2, 'coords': [1.5, -2e3]}, 12345]
+        self.assertEqual(self.items({'before': [1, {'x': 2}], 'pokemons': pokemons, 'after': 3}, 'pokemons'), pokemons)
+
+    def test_top_level_list(self):
+        self.assertEqual(self.items([{'id': 1}, {'id': 2}], 'pokemons'), [{'id': 1}, {'id': 2}])
+        self.assertEqual(self.items([]), [])
+
+    def test_dict_under_key(self):
+        items = self.items({'pokemons': {'a': {'id': 1}, 'b': {'id': 2}}}, 'pokemons')
+        self.assertEqual(sorted(item['id'] for item in items), [1, 2])
+
+    def test_missing_key(self):
+        self.assertEqual(self.items({'other': [1, 2]}, 'pokemons'), [])
+        self.assertEqual(self.items({}, 'pokemons'), [])
+
+    def test_items_are_yielded_as_they_arrive(self):
+        def chunks():
+            yield '{"pokemons": [{"id": 1}, '
+            raise AssertionError('read too far')
+
+        self.assertEqual(next(iter_items(chunks(), 'pokemons')), {'id': 1})
+
+    def test_invalid_documents(self):
+        for document in ['', 'garbage', '{"pokemons": [{"id": 1}', '{"pokemons": [{"id": }]}']:
+            with self.assertRaises(ValueError):
+                list(iter_items(chunked(document, 3), 'pokemons'))
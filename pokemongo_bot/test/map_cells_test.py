@@ -0,0 +1,70 @@
+import unittest
+
+from pokemongo_bot.map_cells import MapCellStore
+
+CELL_ID = 5221390678296494080
+OTHER_CELL_ID = 5221390678162276352
+
+
+def fort(fort_id, **kwargs):
+    data = {'id': fort_id, 'latitude': 45.0, 'longitude': 9.0, 'type': 1}
+    data.update(kwargs)
+    return data
+
+
+class MapCellStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MapCellStore()
+
+    def test_unknown_cells_ask_for_everything(self):
+        self.assertEqual(self.store.timestamps([CELL_ID, OTHER_CELL_ID]), [0, 0])
+
+    def test_timestamps_are_sent_back(self):
+        self.store.update([{'s2_cell_id': CELL_ID, 'current_timestamp_ms': 1000}])
+        self.assertEqual(self.store.timestamps([CELL_ID, OTHER_CELL_ID]), [1000, 0])
+
+    def test_fort_deltas_are_merged(self):
+        self.store.update([{'s2_cell_id': CELL_ID, 'current_timestamp_ms': 1000,
+                            'forts': [fort('a'), fort('b')]}])
+        self.store.update([{'s2_cell_id': CELL_ID, 'current_timestamp_ms': 2000,
+                            'forts': [fort('b', lure_info={})], 'deleted_objects': ['a']}])
+        self.store.update([{'s2_cell_id': CELL_ID, 'current_timestamp_ms': 3000}])
+
+        forts = self.store.cells([CELL_ID])[0]['forts']
+        self.assertEqual([f['id'] for f in forts], ['b'])
+        self.assertIn('lure_info', forts[0])
+
+    def test_pokemons_are_replaced(self):
+        self.store.update([{'s2_cell_id': CELL_ID,
+                            'catchable_pokemons': [{'encounter_id': 1}]}])
+        self.store.update([{'s2_cell_id': CELL_ID}])
+        self.assertEqual(self.store.cells([CELL_ID])[0]['catchable_pokemons'], [])
+
+    def test_nearby_pokemons_are_located(self):
+        self.store.update([{'s2_cell_id': CELL_ID, 'nearby_pokemons': [{'pokemon_id': 16}]}])
+        pokemon = self.store.cells([CELL_ID])[0]['nearby_pokemons'][0]
+        self.assertEqual(pokemon['s2_cell_id'], CELL_ID)
+        self.assertIn('latitude', pokemon)
+        self.assertIn('longitude', pokemon)
+
+    def test_expire_despawned_pokemons(self):
+        self.store.update([{'s2_cell_id': CELL_ID,
+                            'catchable_pokemons': [
+                                {'encounter_id': 1, 'expiration_timestamp_ms': 1000},
+                                {'encounter_id': 2, 'expiration_timestamp_ms': 3000}],
+                            'wild_pokemons': [
+                                {'encounter_id': 1, 'last_modified_timestamp_ms': 500, 'time_till_hidden_ms': 500},
+                                {'encounter_id': 2, 'last_modified_timestamp_ms': 500, 'time_till_hidden_ms': -1}]}])
+        self.store.expire(2000)
+
+        cell = self.store.cells([CELL_ID])[0]
+        self.assertEqual([p['encounter_id'] for p in cell['catchable_pokemons']], [2])
+        self.assertEqual([p['encounter_id'] for p in cell['wild_pokemons']], [2])
+
+    def test_oldest_cells_are_evicted(self):
+        store = MapCellStore(max_cells=1)
+        store.update([{'s2_cell_id': CELL_ID}])
+        store.update([{'s2_cell_id': OTHER_CELL_ID}])
+        self.assertNotIn(CELL_ID, store)
+        self.assertIn(OTHER_CELL_ID, store)
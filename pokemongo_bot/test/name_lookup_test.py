@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+from pokemongo_bot.inventory import ChargedAttacks, FastAttacks
+from pokemongo_bot.name_lookup import NameIndex, fold, item_names, pokemon_names
+
+
+class NameIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NameIndex({'Nidoran F': 29, 'Mr. Mime': 122, 'Bulbasaur': 1, 'Ivysaur': 2},
+                               {'Bulbizarre': 'Bulbasaur', 'Bisasam': 'Bulbasaur', 'Unknown': 'Missingno'})
+
+    def test_names_are_folded(self):
+        self.assertEqual(fold('Nidoran♀'), 'nidoran f')
+        self.assertEqual(fold(' Mr.  Mime '), 'mr mime')
+        self.assertEqual(fold(b'Ho-Oh'), 'ho oh')
+
+    def test_exact_lookup_ignores_case(self):
+        self.assertEqual(self.index.get('BULBASAUR'), 'Bulbasaur')
+        self.assertEqual(self.index.get('mr mime'), 'Mr. Mime')
+        self.assertEqual(self.index.value('ivysaur'), 2)
+        self.assertIsNone(self.index.get('Ivisaur'))
+        self.assertIsNone(self.index.value(''))
+        self.assertNotIn('Venusaur', self.index)
+
+    def test_aliases(self):
+        self.assertEqual(self.index.get('bulbizarre'), 'Bulbasaur')
+        self.assertEqual(self.index.value('Bisasam'), 1)
+        # aliases of unknown names are ignored
+        self.assertIsNone(self.index.get('Unknown'))
+        self.assertEqual(len(self.index), 4)
+
+    def test_closest_name(self):
+        self.assertEqual(self.index.closest('Bulbasaur'), 'Bulbasaur')
+        self.assertEqual(self.index.closest('bulbsaur'), 'Bulbasaur')
+        self.assertEqual(self.index.closest('Ivysuar'), 'Ivysaur')
+        self.assertEqual(self.index.closest('Bulbizare'), 'Bulbasaur')
+        self.assertIsNone(self.index.closest('Zubat'))
+        self.assertIsNone(self.index.closest(None))
+
+    def test_closest_names_are_kept(self):
+        self.index.MAX_SIZE = 2
+        self.index.closest('bulbsaur')
+        self.index.closest('Zubat')
+        self.index.closest('bulbsaur')
+        self.index.closest('Ivysuar')
+
+        self.assertEqual(list(self.index._closest), [('bulbsaur', 0.6), ('ivysuar', 0.6)])
+        self.assertEqual(self.index._closest[('bulbsaur', 0.6)], 'Bulbasaur')
+
+    def test_pokemon_names(self):
+        names = pokemon_names()
+
+        self.assertIs(pokemon_names(), names)
+        self.assertEqual(names.value('Nidoran♂'), 32)
+        self.assertEqual(names.value('bulbizarre'), 1)
+        self.assertEqual(names.closest('Charmandr'), 'Charmander')
+
+    def test_item_names(self):
+        self.assertEqual(item_names().get('POKEBALL'), 'Pokeball')
+        self.assertEqual(item_names().value('ultraball'), 3)
+
+    def test_attacks_by_name(self):
+        FastAttacks.init_static_data()
+        ChargedAttacks.init_static_data()
+
+        self.assertIs(FastAttacks.by_name('vine whip'), FastAttacks.by_name('Vine Whip'))
+        self.assertEqual(ChargedAttacks.by_name('HYPER BEAM').name, 'Hyper Beam')
+        self.assertRaises(KeyError, FastAttacks.by_name, 'Hyper Beam')
+        self.assertRaises(KeyError, ChargedAttacks.by_name, 'Vine Wip')
@@ -0,0 +1,63 @@
+import unittest
+
+from pokemongo_bot.pokemon_table import PokemonTable, best_first
+
+
+class Pokemon(object):
+    def __init__(self, name, iv, cp, candy=0, in_fort=False, next_evolution=True):
+        self.name = name
+        self.iv = iv
+        self.cp = cp
+        self.candy = candy
+        self.in_fort = in_fort
+        self.next_evolution = next_evolution
+
+    def has_next_evolution(self):
+        return self.next_evolution
+
+
+class PokemonTableTest(unittest.TestCase):
+    def setUp(self):
+        self.pokemons = [Pokemon('a', 0.9, 100, candy=50),
+                         Pokemon('b', 0.5, 500, candy=200, in_fort=True),
+                         Pokemon('c', 0.9, 300, candy=10, next_evolution=False),
+                         Pokemon('d', 0.95, 100, candy=124)]
+        self.table = PokemonTable(self.pokemons)
+
+    def test_requirements(self):
+        rows = self.table.rows(self.pokemons)
+
+        self.assertEqual(self.table.satisfy(rows, True).tolist(), [True] * 4)
+        self.assertEqual(self.table.satisfy(rows, {"iv": 0.9}).tolist(), [True, False, True, True])
+        self.assertEqual(self.table.satisfy(rows, {"candy": -124}).tolist(), [True, False, True, True])
+        self.assertEqual(self.table.satisfy(rows, {"cp": [100, 300], "iv": "0.91"}).tolist(), [False, False, False, True])
+        self.assertEqual(self.table.satisfy(rows, {"cp": [[0, 100], [400, 600]]}).tolist(), [True, True, False, True])
+        self.assertEqual(self.table.satisfy(rows, {"unknown": 1}).tolist(), [False] * 4)
+
+    def test_score_of_a_group(self):
+        rule = {"sort": ["iv", "-cp"], "keep": {"candy": -124}, "evolve": {"iv": 0.9}, "buddy": True}
+        group = [self.pokemons[3], self.pokemons[1], self.pokemons[2]]
+        rows = self.table.rows(group)
+
+        keys, keep, evolve, upgrade, buddy = self.table.score(rows, rule)
+
+        self.assertEqual([key.tolist() for key in keys], [[0.95, 0.5, 0.9], [-100, -500, -300]])
+        self.assertEqual(keep.tolist(), [True, False, True])
+        self.assertEqual(evolve.tolist(), [True, False, False])
+        self.assertEqual(upgrade.tolist(), [False] * 3)
+        self.assertEqual(buddy.tolist(), [True, False, True])
+
+    def test_best_first_keeps_the_order_of_ties(self):
+        keys = [self.table.column("iv"), -self.table.column("candy")]
+        self.assertEqual(best_first(keys, 4).tolist(), [3, 2, 0, 1])
+        self.assertEqual(best_first([self.table.column("iv")], 4).tolist(), [3, 0, 2, 1])
+        self.assertEqual(best_first([], 3).tolist(), [0, 1, 2])
+
+    def test_pokemons_are_added_when_needed(self):
+        newcomer = Pokemon('e', 1.0, 1000)
+        self.table.column("iv")
+
+        rows = self.table.rows([newcomer, self.pokemons[0]])
+
+        self.assertEqual(rows.tolist(), [4, 0])
+        self.assertEqual(self.table.column("iv")[rows].tolist(), [1.0, 0.9])
@@ -1,8 +1,10 @@
 import os
 import pickle
+import threading
 import unittest
 import requests_mock
-from pokemongo_bot.walkers.polyline_generator import Polyline
+from mock import MagicMock
+from pokemongo_bot.walkers.polyline_generator import Polyline, PolylineObjectHandler
 
 ex_orig = (47.1706378, 8.5167405)
 ex_dest = (47.1700271, 8.518072999999998)
@@ -46,3 +48,85 @@ class PolylineTestCase(unittest.TestCase):
 
     def test_get_last_pos(self):
         self.assertEquals(self.polyline.get_last_pos(), self.polyline._last_pos)
+
+
+class PolylineObjectHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.router = MagicMock()
+        self.router.route.return_value = []
+        PolylineObjectHandler.set_router(self.router)
+        PolylineObjectHandler.clear()
+
+    def tearDown(self):
+        PolylineObjectHandler.set_router(None)
+        PolylineObjectHandler.clear()
+
+    def cached_polyline(self, origin, destination):
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, json={'results': [{'location': {'lat': 0, 'lng': 0}, 'elevation': 10}]})
+            return PolylineObjectHandler.cached_polyline(origin, destination)
+
+    def test_polylines_are_kept_for_each_destination(self):
+        fort = (47.1700271, 8.518073)
+        pokemon = (47.1710271, 8.517073)
+
+        to_fort = self.cached_polyline(ex_orig, fort)
+        to_pokemon = self.cached_polyline(ex_orig, pokemon)
+        self.assertIs(self.cached_polyline(ex_orig, fort), to_fort)
+        self.assertIs(self.cached_polyline(ex_orig, pokemon), to_pokemon)
+
+        self.assertEqual(self.router.route.call_count, 2)
+        self.assertEqual((PolylineObjectHandler.hits, PolylineObjectHandler.misses), (2, 2))
+
+    def test_walked_polyline_is_used_again_from_its_origin(self):
+        polyline = self.cached_polyline(ex_orig, ex_dest)
+        polyline._last_pos = (47.1703, 8.5175)
+        polyline._last_step = 1
+
+        self.assertIs(self.cached_polyline((47.1703, 8.5175), ex_dest), polyline)
+        self.assertEqual(polyline._last_step, 1)
+
+        # went somewhere else, then back
+        self.cached_polyline(ex_orig, (47.1710271, 8.517073))
+        self.assertIs(self.cached_polyline(ex_orig, ex_dest), polyline)
+        self.assertEqual(polyline.get_last_pos(), ex_orig)
+        self.assertEqual(polyline._last_step, 0)
+
+        self.cached_polyline((47.175, 8.52), ex_dest)
+        self.assertEqual(self.router.route.call_count, 3)
+
+    def test_walking_a_polyline_is_not_a_hit(self):
+        polyline = self.cached_polyline(ex_orig, ex_dest)
+        for _ in range(3):
+            self.assertIs(self.cached_polyline(polyline.get_last_pos(), ex_dest), polyline)
+
+        self.assertEqual((PolylineObjectHandler.hits, PolylineObjectHandler.misses), (0, 1))
+
+    def test_miss_does_not_wait_for_other_prefetches(self):
+        fort = (47.1700271, 8.518073)
+        pokemon = (47.1710271, 8.517073)
+        started = threading.Event()
+        release = threading.Event()
+
+        def route(origin, destination):
+            if destination == fort:
+                started.set()
+                release.wait(5)
+            return []
+        self.router.route.side_effect = route
+
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, json={'results': [{'location': {'lat': 0, 'lng': 0}, 'elevation': 10}]})
+            PolylineObjectHandler.prefetch([(ex_orig, fort)])
+            self.assertTrue(started.wait(5))
+
+            self.assertEqual(PolylineObjectHandler.cached_polyline(ex_orig, pokemon).destination, pokemon)
+            self.assertFalse(release.is_set())
+
+            # the walker waits for the prefetch of its own destination
+            release.set()
+            to_fort = PolylineObjectHandler.cached_polyline(ex_orig, fort)
+
+        self.assertEqual(to_fort.destination, fort)
+        self.assertEqual(self.router.route.call_count, 2)
+        self.assertEqual((PolylineObjectHandler.hits, PolylineObjectHandler.misses), (1, 1))
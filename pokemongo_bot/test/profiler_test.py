@@ -0,0 +1,78 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot import profiler
+from pokemongo_bot.profiler import RollingHistogram, TickProfiler
+
+
+class RollingHistogramTestCase(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = RollingHistogram(100)
+        for value in range(1, 101):
+            histogram.add(value)
+
+        self.assertEqual(histogram.percentile(50), 51)
+        self.assertEqual(histogram.percentile(95), 95)
+        self.assertEqual(histogram.percentile(99), 99)
+
+    def test_window_is_rolling(self):
+        histogram = RollingHistogram(10)
+        for value in range(100):
+            histogram.add(value)
+
+        summary = histogram.summary()
+        self.assertEqual(summary['samples'], 10)
+        self.assertEqual(summary['max'], 99)
+        self.assertEqual(histogram.count, 100)
+
+    def test_empty(self):
+        self.assertEqual(RollingHistogram().percentile(50), .0)
+
+
+class TickProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.bot = MagicMock()
+        self.profiler = profiler.init_profiler(self.bot, enabled=True, report_interval=3600)
+
+    def tearDown(self):
+        profiler._profiler = None
+
+    def test_api_calls_and_sleep_are_inclusive(self):
+        with self.profiler.tick():
+            with self.profiler.measure('MoveToFort'):
+                profiler.record_api_call()
+                profiler.record_api_call()
+                profiler.record_sleep(1.5)
+            profiler.record_api_call()
+
+        report = self.profiler.report()
+        self.assertEqual(report['MoveToFort']['api_calls_total'], 2)
+        self.assertEqual(report['MoveToFort']['sleep_time_total'], 1.5)
+        self.assertEqual(report['tick']['api_calls_total'], 3)
+        self.assertEqual(report['tick']['runs'], 1)
+
+    def test_disabled_records_nothing(self):
+        self.profiler.enabled = False
+        with self.profiler.tick():
+            with self.profiler.measure('MoveToFort'):
+                profiler.record_api_call()
+
+        self.assertEqual(self.profiler.report(), {})
+
+    def test_calls_outside_tick_are_ignored(self):
+        profiler.record_api_call()
+        profiler.record_sleep(3)
+        self.assertEqual(self.profiler.report(), {})
+
+    @patch.object(TickProfiler, 'dump')
+    def test_publish_after_report_interval(self, dump):
+        self.profiler.last_report = 0
+        with self.profiler.tick():
+            pass
+
+        self.assertTrue(self.bot.event_manager.emit.called)
+        self.assertEqual(self.bot.event_manager.emit.call_args[0][0], 'tick_profile')
+        self.assertTrue(dump.called)
@@ -0,0 +1,109 @@
+import unittest
+
+from geographiclib.geodesic import Geodesic
+from mock import MagicMock, patch
+
+from pokemongo_bot.walkers.route_plan import PlanWalker, RoutePlan
+
+# An L shaped path, about 111 meters north then 111 meters east
+POINTS = [
+    {'lat': 0.0, 'lng': 0.0, 'location': 'start'},
+    {'lat': 0.001, 'lng': 0.0, 'alt': 20, 'location': 'corner', 'loiter': 30},
+    {'lat': 0.001, 'lng': 0.001, 'location': 'end', 'wander': 60},
+]
+
+
+def distance(lat1, lng1, lat2, lng2):
+    return Geodesic.WGS84.Inverse(lat1, lng1, lat2, lng2)["s12"]
+
+
+class RoutePlanTest(unittest.TestCase):
+    def setUp(self):
+        self.plan = RoutePlan.from_points(POINTS)
+
+    def test_offsets_are_the_distance_walked_at_each_point(self):
+        self.assertEqual(len(self.plan), 3)
+        self.assertEqual(self.plan.offsets[0], 0)
+        self.assertAlmostEqual(self.plan.offsets[1], 111.2, places=1)
+        self.assertAlmostEqual(self.plan.total_distance, 222.4, places=1)
+
+    def test_position_is_interpolated_along_the_segments(self):
+        lat, lng, azimuth = self.plan.position(self.plan.offsets[1] / 2)
+        self.assertAlmostEqual(lat, 0.0005, places=6)
+        self.assertAlmostEqual(lng, 0.0, places=6)
+        self.assertAlmostEqual(azimuth, 0.0, places=3)
+
+        lat, lng, azimuth = self.plan.position(self.plan.offsets[1] + 10)
+        self.assertAlmostEqual(lat, 0.001, places=6)
+        self.assertAlmostEqual(distance(0.001, 0.0, lat, lng), 10, delta=0.1)
+        self.assertAlmostEqual(azimuth, 90.0, places=3)
+
+        # going back uses the earlier segment
+        lat, lng, _ = self.plan.position(0)
+        self.assertEqual((lat, lng), (0.0, 0.0))
+
+    def test_points_keep_their_metadata(self):
+        self.assertEqual(self.plan.point(0), {'lat': 0.0, 'lng': 0.0, 'location': 'start'})
+        self.assertEqual(self.plan.point(1), POINTS[1])
+
+        reversed_plan = self.plan.reversed()
+        self.assertEqual(reversed_plan.point(2), POINTS[0])
+        self.assertEqual(reversed_plan.point(0), POINTS[2])
+        self.assertAlmostEqual(reversed_plan.total_distance, self.plan.total_distance)
+
+    def test_closest_point(self):
+        self.assertEqual(self.plan.closest(0.0009, 0.0002), 1)
+        self.assertEqual(self.plan.closest(-1, -1), 0)
+
+
+class PlanWalkerTest(unittest.TestCase):
+    def setUp(self):
+        self.patcherSleep = patch('pokemongo_bot.walkers.step_walker.sleep')
+        self.patcherSleep.start()
+
+        self.bot = MagicMock()
+        self.bot.position = [0, 0, 0]
+        self.bot.config.walk_min = 50
+        self.bot.config.walk_max = 50
+
+        def api_set_position(lat, lng, alt):
+            self.bot.position = [lat, lng, alt]
+        self.bot.api.set_position = api_set_position
+
+        self.plan = RoutePlan.from_points(POINTS)
+
+    def tearDown(self):
+        self.patcherSleep.stop()
+
+    def test_walks_along_the_plan(self):
+        walker = PlanWalker(self.bot, self.plan, 0, dest_alt=0, precision=0)
+        self.assertTrue(walker.step())
+        self.assertEqual(walker.walked, 0)
+
+        walker.walk_to(2, dest_alt=0)
+        positions = []
+        while not walker.step():
+            positions.append(tuple(self.bot.position[:2]))
+
+        # the steps go round the corner, none cuts it
+        self.assertEqual(len(positions), 4)
+        self.assertAlmostEqual(positions[2][0], 0.001, places=6)
+        self.assertAlmostEqual(distance(0.001, 0.0, positions[2][0], positions[2][1]), 150 - 111.2, delta=0.2)
+        self.assertAlmostEqual(self.bot.position[0], 0.001, places=6)
+        self.assertAlmostEqual(self.bot.position[1], 0.001, places=6)
+
+    def test_walks_back_to_the_plan_when_moved_away(self):
+        walker = PlanWalker(self.bot, self.plan, 0, dest_alt=0, precision=0)
+        walker.step()
+        walker.walk_to(1, dest_alt=0)
+        walker.step()
+
+        # something else moved the bot 50 meters east
+        self.bot.position = [self.bot.position[0], 0.00045, 0]
+        walker.step()
+        self.assertIsNone(walker.walked)
+
+        while not walker.step():
+            pass
+        self.assertAlmostEqual(walker.walked, self.plan.offsets[1])
+        self.assertAlmostEqual(distance(0.001, 0.0, self.bot.position[0], self.bot.position[1]), 0, delta=0.1)
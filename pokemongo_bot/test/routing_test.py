@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock
+
+from pokemongo_bot.walkers.routing import OSMRouteProvider, RouteCache, Router
+
+# A square of footways, with a shortcut through its diagonal that cannot be walked
+OSM = '''<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="47.1700" lon="8.5160"/>
+  <node id="2" lat="47.1700" lon="8.5170"/>
+  <node id="3" lat="47.1710" lon="8.5170"/>
+  <node id="4" lat="47.1710" lon="8.5160"/>
+  <node id="5" lat="47.1705" lon="8.5165"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="footway"/>
+  </way>
+  <way id="11">
+    <nd ref="1"/><nd ref="4"/>
+    <tag k="highway" v="residential"/>
+  </way>
+  <way id="12">
+    <nd ref="4"/><nd ref="3"/>
+    <tag k="highway" v="residential"/>
+    <tag k="foot" v="no"/>
+  </way>
+  <way id="13">
+    <nd ref="1"/><nd ref="5"/><nd ref="3"/>
+    <tag k="highway" v="motorway"/>
+  </way>
+</osm>
+'''
+
+
+class RoutingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.osm_path = os.path.join(self.directory, 'area.osm')
+        with open(self.osm_path, 'w') as outfile:
+            outfile.write(OSM)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_osm_route_follows_walkable_ways(self):
+        provider = OSMRouteProvider(self.osm_path)
+
+        points = provider.route((47.17001, 8.51601), (47.17099, 8.51699))
+
+        self.assertEqual(points, [(47.17, 8.516), (47.17, 8.517), (47.171, 8.517)])
+
+    def test_osm_has_no_route_far_from_ways(self):
+        provider = OSMRouteProvider(self.osm_path)
+
+        self.assertIsNone(provider.route((47.17, 8.516), (47.18, 8.516)))
+        self.assertIsNone(OSMRouteProvider(os.path.join(self.directory, 'missing.osm')).route((0, 0), (1, 1)))
+
+    def test_router_falls_back_to_next_provider_then_straight_line(self):
+        first = MagicMock()
+        first.route.return_value = None
+        second = MagicMock()
+        second.route.return_value = [(1.5, 1.5)]
+        router = Router([first, second], RouteCache())
+
+        self.assertEqual(router.route((1, 1), (2, 2)), [(1.5, 1.5)])
+        second.route.return_value = None
+        self.assertEqual(router.route((3, 3), (4, 4)), [])
+
+    def test_cached_routes_are_not_asked_again(self):
+        path = os.path.join(self.directory, 'routes.json')
+        provider = MagicMock()
+        provider.route.return_value = [(1.5, 1.5)]
+        router = Router([provider], RouteCache(path))
+
+        router.route((1, 1), (2, 2))
+        router.route((1, 1), (3, 3))
+        self.assertEqual(router.route((1.00001, 1), (2, 2)), [(1.5, 1.5)])
+        self.assertEqual(provider.route.call_count, 2)
+        # written when due, not on every new route
+        router.save_if_due()
+        self.assertFalse(os.path.exists(path))
+        router.save()
+
+        cache = RouteCache(path)
+        cache.load()
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get((1, 1), (3, 3)), [(1.5, 1.5)])
+
+    def test_least_recently_used_routes_are_dropped(self):
+        cache = RouteCache(max_size=2)
+        cache.put((1, 1), (2, 2), [(1.5, 1.5)])
+        cache.put((1, 1), (3, 3), [])
+        cache.get((1, 1), (2, 2))
+        cache.put((1, 1), (4, 4), [])
+
+        self.assertEqual(cache.get((1, 1), (2, 2)), [(1.5, 1.5)])
+        self.assertIsNone(cache.get((1, 1), (3, 3)))
+        self.assertEqual(cache.get((1, 1), (4, 4)), [])
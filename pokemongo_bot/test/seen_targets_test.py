@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokemongo_bot.seen_targets import SeenTargets
+
+
+def make_pokemon(lat, lng, pokemon_id=149, disappear_time=None):
+    return {'latitude': lat, 'longitude': lng, 'pokemon_id': pokemon_id, 'disappear_time': disappear_time}
+
+
+class SeenTargetsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'map-caught-test.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_targets_are_matched_by_approximate_location(self):
+        seen = SeenTargets()
+        seen.add(make_pokemon(40.712761, -74.005941))
+
+        self.assertTrue(seen.contains(make_pokemon(40.71276, -74.00594)))
+        self.assertFalse(seen.contains(make_pokemon(40.7129, -74.00594)))
+        self.assertFalse(seen.contains(make_pokemon(40.71276, -74.00594, pokemon_id=131)))
+        self.assertFalse(seen.contains({'pokemon_id': 149}))
+
+    def test_expired_targets_are_forgotten(self):
+        seen = SeenTargets(ttl=60)
+        seen.add(make_pokemon(1.0, 2.0, disappear_time=1000), now=900)
+        seen.add(make_pokemon(3.0, 4.0, disappear_time=5000), now=900)
+
+        self.assertTrue(seen.contains(make_pokemon(1.0, 2.0), now=950))
+        self.assertFalse(seen.contains(make_pokemon(1.0, 2.0), now=1001))
+        self.assertTrue(seen.contains(make_pokemon(3.0, 4.0), now=1001))
+        self.assertEqual(len(seen), 1)
+
+    def test_oldest_targets_are_evicted(self):
+        seen = SeenTargets(max_size=3)
+        for i in range(5):
+            seen.add(make_pokemon(float(i), 0.0))
+
+        self.assertEqual(len(seen), 3)
+        self.assertFalse(seen.contains(make_pokemon(1.0, 0.0)))
+        self.assertTrue(seen.contains(make_pokemon(4.0, 0.0)))
+
+    def test_save_and_load(self):
+        seen = SeenTargets(self.path)
+        seen.add(make_pokemon(1.0, 2.0))
+        seen.save()
+
+        loaded = SeenTargets(self.path)
+        loaded.load()
+        self.assertTrue(loaded.contains(make_pokemon(1.0, 2.0)))
+
+    def test_load_previous_format(self):
+        with open(self.path, 'w') as outfile:
+            json.dump([
+                {'latitude': 1.0, 'longitude': 2.0, 'pokemon_id': 149, 'name': 'Dragonite', 'disappear_time': 1}
+            ], outfile)
+
+        seen = SeenTargets(self.path)
+        seen.load()
+        self.assertTrue(seen.contains(make_pokemon(1.0, 2.0)))
@@ -0,0 +1,111 @@
+import time
+import unittest
+
+import requests_mock
+from mock import patch
+
+from pokemongo_bot.cell_workers.sniper import Sniper, SniperSource, SniperFetcher
+
+MAPPINGS = {
+    'id': {'param': 'id'},
+    'name': {'param': 'name'},
+    'latitude': {'param': 'lat'},
+    'longitude': {'param': 'lng'},
+    'expiration': {'param': 'expires', 'format': 'seconds'},
+}
+
+
+def make_source(url):
+    return SniperSource({'url': url, 'key': 'pokemons', 'enabled': True, 'mappings': MAPPINGS})
+
+
+def make_pokemon(pokemon_id, lat, lng, expires=None):
+    if expires is None:
+        expires = int(time.time()) + 600
+    return {'id': pokemon_id, 'name': 'Dragonite', 'lat': lat, 'lng': lng, 'expires': expires}
+
+
+@patch.object(SniperSource, '_get_closest_name', lambda self, name: name)
+class SniperFetcherTest(unittest.TestCase):
+
+    def key(self, pokemon):
+        return Sniper._hash.__func__(None, pokemon)
+
+    def test_not_modified_source_reuses_results(self):
+        source = make_source('http://feed/a')
+        with requests_mock.Mocker() as mocker:
+            mocker.get('http://feed/a', json={'pokemons': [make_pokemon(149, 1.0, 2.0)]}, headers={'ETag': '"v1"'})
+            self.assertEqual(len(source.fetch()), 1)
+
+            mocker.get('http://feed/a', status_code=304)
+            self.assertEqual(len(source.fetch()), 1)
+            self.assertEqual(mocker.last_request.headers['If-None-Match'], '"v1"')
+
+    def test_expired_results_are_skipped(self):
+        source = make_source('http://feed/a')
+        with requests_mock.Mocker() as mocker:
+            mocker.get('http://feed/a', json={'pokemons': [
+                make_pokemon(143, 5.0, 6.0, expires=int(time.time()) - 60),
+                make_pokemon(149, 1.0, 2.0)
+            ]})
+            self.assertEqual([pokemon['pokemon_id'] for pokemon in source.fetch()], [149])
+            source.validate()
+
+    def test_targets_are_merged_and_pruned(self):
+        sources = [make_source('http://feed/a'), make_source('http://feed/b'), make_source('http://feed/c')]
+        fetcher = SniperFetcher(sources, self.key)
+        with requests_mock.Mocker() as mocker:
+            mocker.get('http://feed/a', json={'pokemons': [make_pokemon(149, 1.0, 2.0)]})
+            mocker.get('http://feed/b', json={'pokemons': [
+                make_pokemon(149, 1.0, 2.0),
+                make_pokemon(131, 3.0, 4.0),
+                make_pokemon(143, 5.0, 6.0, expires=int(time.time()) - 60)
+            ]})
+            mocker.get('http://feed/c', status_code=500, text='down')
+            fetcher.fetch()
+        fetcher.stop()
+
+        self.assertEqual(sorted(t['pokemon_id'] for t in fetcher.targets()), [131, 149])
+        self.assertIsNotNone(fetcher.last_fetch_time)
+
+    def test_fresh_data_replaces_the_known_target(self):
+        fetcher = SniperFetcher([make_source('http://feed/a')], self.key)
+        expires = int(time.time()) + 600
+        with requests_mock.Mocker() as mocker:
+            mocker.get('http://feed/a', json={'pokemons': [make_pokemon(149, 1.0, 2.0, expires)]})
+            fetcher.fetch()
+            mocker.get('http://feed/a', json={'pokemons': [make_pokemon(149, 1.0, 2.0, expires + 300)]})
+            fetcher.fetch()
+        fetcher.stop()
+
+        targets = fetcher.targets()
+        self.assertEqual(len(targets), 1)
+        self.assertEqual(targets[0]['expiration_timestamp_ms'], (expires + 300) * 1000)
+
+    def test_nothing_is_fetched_while_paused(self):
+        source = make_source('http://feed/a')
+        fetcher = SniperFetcher([source], self.key, interval=0.01, paused=lambda: True)
+        with patch.object(SniperSource, 'fetch') as fetch:
+            fetcher.start()
+            time.sleep(0.05)
+            fetcher.stop()
+
+        self.assertFalse(fetch.called)
+        self.assertIsNone(fetcher.last_fetch_time)
+
+    def test_sources_are_fetched_in_parallel(self):
+        sources = [make_source('http://feed/%d' % i) for i in range(4)]
+        fetcher = SniperFetcher(sources, self.key)
+
+        def slow(request, context):
+            time.sleep(0.5)
+            return {'pokemons': []}
+
+        with requests_mock.Mocker() as mocker:
+            for source in sources:
+                mocker.get(source.url, json=slow)
+            started = time.time()
+            fetcher.fetch()
+        fetcher.stop()
+
+        self.assertLess(time.time() - started, 1.5)
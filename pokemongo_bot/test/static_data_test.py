@@ -0,0 +1,50 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokemongo_bot import static_data
+from pokemongo_bot.static_data import BUNDLE_NAME, STATIC_FILES, build_bundle, load_bundle, load_json
+
+
+class StaticDataTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        for name in STATIC_FILES:
+            self.write(name, {'file': name})
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+        static_data._documents.pop(self.data_dir, None)
+
+    def write(self, name, document):
+        with open(os.path.join(self.data_dir, name), 'w') as outfile:
+            json.dump(document, outfile)
+
+    def test_bundle_has_the_documents(self):
+        build_bundle(self.data_dir)
+
+        documents = load_bundle(self.data_dir)
+        self.assertEqual(sorted(documents), sorted(STATIC_FILES))
+        self.assertEqual(documents['pokemon.json'], {'file': 'pokemon.json'})
+
+    def test_changed_file_makes_the_bundle_stale(self):
+        build_bundle(self.data_dir)
+        self.write('items.json', {'file': 'items.json', 'new': 1})
+
+        self.assertIsNone(load_bundle(self.data_dir))
+        self.assertEqual(load_json(os.path.join(self.data_dir, 'items.json')), {'file': 'items.json', 'new': 1})
+
+    def test_damaged_bundle_is_not_used(self):
+        path = build_bundle(self.data_dir)
+        with open(path, 'r+b') as bundle:
+            bundle.seek(-2, os.SEEK_END)
+            bundle.write('xx')
+
+        self.assertIsNone(load_bundle(self.data_dir))
+
+    def test_json_files_are_read_without_bundle(self):
+        self.assertIsNone(load_bundle(self.data_dir))
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, BUNDLE_NAME)))
+        self.assertEqual(load_json(os.path.join(self.data_dir, 'types.json')), {'file': 'types.json'})
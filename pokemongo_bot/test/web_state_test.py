@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokemongo_bot.web_state import WebStateWriter
+
+
+class WebStateWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'location.json')
+        # long delay, documents are only written by flush/stop
+        self.writer = WebStateWriter(delay=60)
+
+    def tearDown(self):
+        self.writer.stop()
+        shutil.rmtree(self.directory)
+
+    def read(self):
+        with open(self.path) as infile:
+            return json.load(infile)
+
+    def test_burst_is_coalesced(self):
+        for i in range(10):
+            self.writer.write(self.path, {'lat': i})
+        self.writer.flush()
+
+        self.assertEqual(self.read(), {'lat': 9})
+        self.assertEqual(self.writer.written, 1)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_unchanged_document_is_skipped(self):
+        self.writer.write(self.path, {'lat': 1})
+        self.writer.flush()
+        self.writer.write(self.path, {'lat': 1})
+        self.writer.flush()
+
+        self.assertEqual(self.writer.written, 1)
+        self.assertEqual(self.writer.skipped, 1)
+
+    def test_removed_file_is_written_again(self):
+        self.writer.write(self.path, {'lat': 1})
+        self.writer.flush()
+        os.remove(self.path)
+        self.writer.write(self.path, {'lat': 1})
+        self.writer.flush()
+
+        self.assertEqual(self.read(), {'lat': 1})
+
+    def test_stop_writes_pending_documents(self):
+        self.writer.write(self.path, [1, 2])
+        self.writer.stop()
+
+        self.assertEqual(self.read(), [1, 2])
+
+    def test_document_is_serialized_when_submitted(self):
+        document = {'lat': 1}
+        self.writer.write(self.path, document)
+        document['lat'] = 2
+        self.writer.write(self.path + '.other', {'lng': object()})
+        self.writer.flush()
+
+        self.assertEqual(self.read(), {'lat': 1})
+        self.assertFalse(os.path.exists(self.path + '.other'))
+
+    def test_background_write(self):
+        writer = WebStateWriter(delay=0)
+        writer.write(self.path, {'lat': 2})
+        writer.stop()
+
+        self.assertEqual(self.read(), {'lat': 2})
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 from geographiclib.geodesic import Geodesic
+from collections import OrderedDict
 from itertools import chain
 
+import bisect
+import logging
 import math
+import Queue
+import threading
 import polyline
 import requests
 from geopy.distance import great_circle
 
+from pokemongo_bot.constants import Constants
+from .routing import GoogleRouteProvider, Router
+
 
 def distance(point1, point2):
     return Geodesic.WGS84.Inverse(point1[0], point1[1], point2[0], point2[1])["s12"]  # @UndefinedVariable
@@ -16,77 +24,154 @@ class PolylineObjectHandler:
     '''
     Does this need to be a class?
     More like a namespace...
+
+    Keeps the last polylines walked or prefetched, by origin and destination,
+    so going back and forth between destinations (a fort, a pokemon, the
+    fort again...) does not ask Google for the same routes again.
     '''
-    _cache = None
-    _instability = 0
-    _run = False
+    MAX_SIZE = 32
+    # Bot is still on a polyline it walked if it is less than that far from where it left it (in meters)
+    MAX_OFFSET = 8
+
+    _cache = OrderedDict()
+    _current = None
+    _router = None
+    hits = 0
+    misses = 0
+
+    _lock = threading.Lock()
+    # Polylines being built (their router calls are not made with _lock held), by key
+    _building = {}
+    _prefetch_queue = Queue.Queue()
+    _prefetch_thread = None
+
+    @staticmethod
+    def set_router(router):
+        PolylineObjectHandler._router = router
 
     @staticmethod
     def cached_polyline(origin, destination, google_map_api_key=None):
         '''
         Google API has limits, so we can't generate new Polyline at every tick...
         '''
+        destination = tuple(destination)
+        key = PolylineObjectHandler._key(origin, destination)
+        while True:
+            with PolylineObjectHandler._lock:
+                cached = PolylineObjectHandler._find(origin, destination)
+                if cached is not None:
+                    break
+                # being prefetched, from about the same place
+                building = PolylineObjectHandler._find_building(origin, destination)
+                if building is None:
+                    building = PolylineObjectHandler._building[key] = threading.Event()
+                    PolylineObjectHandler.misses += 1
+                    break
+            building.wait()
 
-        # Absolute offset between bot origin and PolyLine get_last_pos() (in meters)
-        if PolylineObjectHandler._cache and PolylineObjectHandler._cache.get_last_pos() != (None, None):
-            abs_offset = distance(origin, PolylineObjectHandler._cache.get_last_pos())
-        else:
-            abs_offset = float("inf")
-        is_old_cache = lambda : abs_offset > 8  # Consider cache old if we identified an offset more then 8 m
-        new_dest_set = lambda : tuple(destination) != PolylineObjectHandler._cache.destination
-
-        if PolylineObjectHandler._run and (not is_old_cache()):
-            # bot used to have struggle with making a decision.
-            PolylineObjectHandler._instability -= 1
-            if PolylineObjectHandler._instability <= 0:
-                PolylineObjectHandler._instability = 0
-                PolylineObjectHandler._run = False
-            pass  # use current cache
-        elif None == PolylineObjectHandler._cache or is_old_cache() or new_dest_set():
-            # no cache, old cache or new destination set by bot, so make new polyline
-            PolylineObjectHandler._instability += 2
-            if 10 <= PolylineObjectHandler._instability:
-                PolylineObjectHandler._run = True
-                PolylineObjectHandler._instability = 20  # next N moves use same cache
-
-            PolylineObjectHandler._cache = Polyline(origin, destination, google_map_api_key)
-        else:
-            # valid cache found
-            PolylineObjectHandler._instability -= 1
-            PolylineObjectHandler._instability = max(PolylineObjectHandler._instability, 0)
-            pass  # use current cache
-        return PolylineObjectHandler._cache
+        if cached is None:
+            try:
+                cached = PolylineObjectHandler._build(origin, destination, google_map_api_key)
+            finally:
+                with PolylineObjectHandler._lock:
+                    PolylineObjectHandler._building.pop(key, None)
+                building.set()
+
+        PolylineObjectHandler._current = cached
+        return cached
+
+    @staticmethod
+    def prefetch(routes, google_map_api_key=None):
+        '''
+        Builds the polylines of the given (origin, destination) in the background,
+        so the walker finds them in the cache when it gets there.
+        '''
+        for origin, destination in routes:
+            PolylineObjectHandler._prefetch_queue.put((tuple(origin), tuple(destination), google_map_api_key))
+
+        if PolylineObjectHandler._prefetch_thread is None:
+            thread = threading.Thread(target=PolylineObjectHandler._prefetch_run, name='polyline-prefetch')
+            thread.daemon = True
+            PolylineObjectHandler._prefetch_thread = thread
+            thread.start()
+
+    @staticmethod
+    def clear():
+        with PolylineObjectHandler._lock:
+            PolylineObjectHandler._cache.clear()
+            PolylineObjectHandler._current = None
+            PolylineObjectHandler.hits = 0
+            PolylineObjectHandler.misses = 0
+
+    @staticmethod
+    def _key(origin, destination):
+        return (round(origin[0], 4), round(origin[1], 4)), destination
+
+    @staticmethod
+    def _find(origin, destination):
+        current = PolylineObjectHandler._current
+        if current is not None and current.destination == destination and \
+                distance(origin, current.get_last_pos()) <= PolylineObjectHandler.MAX_OFFSET:
+            # still walking it
+            return current
+
+        # walking it again, or a prefetched one, from about the same place
+        for key, cached in reversed(PolylineObjectHandler._cache.items()):
+            if cached is current or key[1] != destination:
+                continue
+            if distance(origin, cached.origin) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE:
+                PolylineObjectHandler._cache[key] = PolylineObjectHandler._cache.pop(key)
+                cached.reset()
+                PolylineObjectHandler.hits += 1
+                return cached
+
+        return None
+
+    @staticmethod
+    def _find_building(origin, destination):
+        for (building_origin, building_destination), building in PolylineObjectHandler._building.items():
+            if building_destination == destination and \
+                    distance(origin, building_origin) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE:
+                return building
+        return None
+
+    @staticmethod
+    def _build(origin, destination, google_map_api_key):
+        cached = Polyline(origin, destination, google_map_api_key, router=PolylineObjectHandler._router)
+        key = PolylineObjectHandler._key(origin, destination)
+        with PolylineObjectHandler._lock:
+            PolylineObjectHandler._cache.pop(key, None)
+            while len(PolylineObjectHandler._cache) >= PolylineObjectHandler.MAX_SIZE:
+                PolylineObjectHandler._cache.popitem(last=False)
+            PolylineObjectHandler._cache[key] = cached
+        return cached
+
+    @staticmethod
+    def _prefetch_run():
+        while True:
+            origin, destination, google_map_api_key = PolylineObjectHandler._prefetch_queue.get()
+            key = PolylineObjectHandler._key(origin, destination)
+            with PolylineObjectHandler._lock:
+                if key in PolylineObjectHandler._cache or key in PolylineObjectHandler._building:
+                    continue
+                building = PolylineObjectHandler._building[key] = threading.Event()
+            try:
+                PolylineObjectHandler._build(origin, destination, google_map_api_key)
+            except Exception as e:
+                logging.getLogger('PolylineObjectHandler').info('Could not prefetch polyline: %s', e)
+            finally:
+                with PolylineObjectHandler._lock:
+                    PolylineObjectHandler._building.pop(key, None)
+                building.set()
 
 
 class Polyline(object):
-    def __init__(self, origin, destination, google_map_api_key=None):
+    def __init__(self, origin, destination, google_map_api_key=None, router=None):
         self.origin = origin
         self.destination = tuple(destination)
-        self.DIRECTIONS_API_URL = 'https://maps.googleapis.com/maps/api/directions/json?mode=walking'
-        self.DIRECTIONS_URL = '{}&origin={}&destination={}'.format(self.DIRECTIONS_API_URL,
-                '{},{}'.format(*self.origin),
-                '{},{}'.format(*self.destination))
-        if google_map_api_key:
-            self.DIRECTIONS_URL = '{}&key={}'.format(self.DIRECTIONS_URL, google_map_api_key)
-        self._directions_response = requests.get(self.DIRECTIONS_URL).json()
-        try:
-            self._directions_encoded_points = [x['polyline']['points'] for x in
-                                               self._directions_response['routes'][0]['legs'][0]['steps']]
-        except IndexError:
-            # This handles both cases:
-            # a) In case of API limit reached we get back we get a status 200 code with an empty routes []
-            # {u'error_message': u'You have exceeded your rate-limit for this API.',
-            #  u'routes': [],
-            #  u'status': u'OVER_QUERY_LIMIT'
-            # }
-            # b) In case that google does not have any directions proposals we get:
-            # ZERO_RESULTS {
-            #    "geocoded_waypoints" : [ {}, {} ],
-            #    "routes" : [],
-            #    "status" : "ZERO_RESULTS"
-            # }
-            self._directions_encoded_points = self._directions_response['routes']
-        self._points = [self.origin] + self._get_directions_points() + [self.destination]
+        if router is None:
+            router = Router([GoogleRouteProvider(google_map_api_key)])
+        self._points = [self.origin] + router.route(self.origin, self.destination) + [self.destination]
         self._polyline = self._get_encoded_points()
         self._last_pos = self._points[0]
         self._step_dict = self._get_steps_dict()
@@ -100,15 +185,19 @@ class Polyline(object):
         if google_map_api_key:
             self.ELEVATION_URL = '{}&key={}'.format(self.ELEVATION_URL, google_map_api_key)
         self._elevation_response = requests.get(self.ELEVATION_URL).json()
-        self._elevation_at_point = dict((tuple(x['location'].values()),
-                                         x['elevation']) for x in
-                                        self._elevation_response['results'])
+        # samples come in order along the path
+        self._elevation_samples = [(tuple(x['location'].values()), x['elevation'])
+                                   for x in self._elevation_response['results']]
+        self._elevation_at_point = dict(self._elevation_samples)
+        self._elevation_walked = None
+        self._segment_elevations = {}
 
-    def _get_directions_points(self):
-        points = []
-        for point in self._directions_encoded_points:
-            points += polyline.decode(point)
-        return [x for n, x in enumerate(points) if x not in points[:n]]
+    def reset(self):
+        """
+        Walk it again from the start.
+        """
+        self._last_pos = self._points[0]
+        self._last_step = 0
 
     def _get_encoded_points(self):
         return polyline.encode(self._points)
@@ -134,8 +223,11 @@ class Polyline(object):
     def get_alt(self, at_point=None):
         if at_point is None:
             at_point = self._last_pos
-        if self._elevation_at_point:
-            elevations = sorted([(great_circle(at_point, k).meters, v, k) for k, v in self._elevation_at_point.items()])
+            samples = self._get_segment_elevations(self._last_step)
+        else:
+            samples = self._elevation_samples
+        if samples:
+            elevations = sorted([(great_circle(at_point, k).meters, v, k) for k, v in samples])
 
             if len(elevations) == 1:
                 return elevations[0][1]
@@ -146,6 +238,27 @@ class Polyline(object):
         else:
             return None
 
+    def _get_segment_elevations(self, step):
+        """
+        The elevation samples around a step of the walk, the ones get_alt looks
+        at while walking it. Computed once per step.
+        """
+        if step not in self._segment_elevations:
+            samples = self._elevation_samples
+            if len(samples) > 2 and self._step_keys:
+                if self._elevation_walked is None:
+                    self._elevation_walked = [0.0]
+                    for (p1, _), (p2, _) in zip(samples, samples[1:]):
+                        self._elevation_walked.append(self._elevation_walked[-1] + great_circle(p1, p2).meters)
+                walked = self._elevation_walked
+                spacing = max(b - a for a, b in zip(walked, walked[1:]))
+                start = self._step_keys[step - 1] if step > 0 else 0.0
+                end = self._step_keys[step]
+                first = min(bisect.bisect_left(walked, start - spacing), len(samples) - 2)
+                last = max(bisect.bisect_right(walked, end + spacing), first + 2)
+                samples = samples[first:last]
+            self._segment_elevations[step] = samples
+        return self._segment_elevations[step]
 
     def _get_relative_hight(self, ep1, ep2, distance_p1_p2, distance_to_p1, distance_to_p2):
         hdelta = ep2 - ep1
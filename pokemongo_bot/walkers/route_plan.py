@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division
+
+from random import uniform
+
+import numpy as np
+from geographiclib.geodesic import Geodesic
+
+from pokemongo_bot import geo
+from pokemongo_bot.human_behaviour import random_alt_delta
+from pokemongo_bot.walkers.step_walker import StepWalker
+
+
+class RoutePlan(object):
+    """
+    A path compiled once: the waypoints in arrays, the distance walked at
+    each of them, and the geodesic of each segment (computed the first time
+    it is walked). Any position along the path is then found from the
+    distance walked, without going through the waypoints.
+
+    Altitudes are NaN where unknown. `names` are the waypoint locations, and
+    `stops` gives, by waypoint index, how long to "loiter" or "wander" there.
+    """
+
+    def __init__(self, lats, lngs, alts=None, names=None, stops=None):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        if alts is None:
+            self.alts = np.full(len(self.lats), np.nan)
+        else:
+            self.alts = np.array([np.nan if alt is None else alt for alt in alts], dtype=float)
+        self.names = list(names) if names is not None else [None] * len(self.lats)
+        self.stops = stops or {}
+
+        lengths = geo.haversine(self.lats[:-1], self.lngs[:-1], self.lats[1:], self.lngs[1:])
+        self.offsets = np.concatenate(([0.0], np.cumsum(lengths)))
+        self._lines = {}
+        self._cursor = 0
+
+    @staticmethod
+    def from_points(points):
+        """
+        :param points: Dicts with "lat", "lng" and optional "alt", "location", "loiter" and "wander" keys.
+        :rtype: RoutePlan
+        """
+        stops = {}
+        for index, point in enumerate(points):
+            stop = dict((key, point[key]) for key in ('loiter', 'wander') if key in point)
+            if stop:
+                stops[index] = stop
+        return RoutePlan([point['lat'] for point in points],
+                         [point['lng'] for point in points],
+                         [point.get('alt') for point in points],
+                         [point.get('location') for point in points],
+                         stops)
+
+    def __len__(self):
+        return len(self.lats)
+
+    @property
+    def total_distance(self):
+        return float(self.offsets[-1])
+
+    def point(self, index):
+        """
+        The waypoint as a dict, like the ones the plan was made from.
+        """
+        point = {'lat': float(self.lats[index]), 'lng': float(self.lngs[index]), 'location': self.names[index]}
+        if not np.isnan(self.alts[index]):
+            point['alt'] = float(self.alts[index])
+        point.update(self.stops.get(index, {}))
+        return point
+
+    def reversed(self):
+        last = len(self) - 1
+        return RoutePlan(self.lats[::-1], self.lngs[::-1], self.alts[::-1], self.names[::-1],
+                         dict((last - index, stop) for index, stop in self.stops.iteritems()))
+
+    def closest(self, lat, lng):
+        """
+        Index of the waypoint closest to the position.
+        """
+        return int(np.argmin(geo.haversine(lat, lng, self.lats, self.lngs)))
+
+    def segment(self, distance):
+        """
+        Index of the segment at the given distance along the path. Walking
+        forward, it is the segment of the last call or the next ones.
+        """
+        last = len(self) - 2
+        cursor = self._cursor
+        if not (self.offsets[cursor] <= distance < self.offsets[cursor + 1]):
+            cursor = int(np.searchsorted(self.offsets, distance, side='right')) - 1
+        self._cursor = min(max(cursor, 0), last)
+        return self._cursor
+
+    def position(self, distance):
+        """
+        :param distance: Distance along the path, in meters.
+        :return: Latitude, longitude and azimuth of the path at that distance.
+        """
+        if len(self) == 1:
+            return float(self.lats[0]), float(self.lngs[0]), 0.0
+
+        index = self.segment(distance)
+        line = self._lines.get(index)
+        if line is None:
+            line = Geodesic.WGS84.InverseLine(self.lats[index], self.lngs[index],
+                                              self.lats[index + 1], self.lngs[index + 1])
+            self._lines[index] = line
+
+        length = self.offsets[index + 1] - self.offsets[index]
+        fraction = min(max((distance - self.offsets[index]) / length, 0.0), 1.0) if length else 0.0
+        position = line.Position(fraction * line.s13)
+        return position["lat2"], position["lon2"], position["azi2"]
+
+
+class PlanWalker(StepWalker):
+    """
+    Walks along a RoutePlan toward one of its waypoints, one step at a time.
+    It is kept from one step to the next. When something else moved the bot
+    away from the path, it walks straight to the waypoint like the
+    StepWalker, and follows the path again from there.
+    """
+    # Bot left the path if it is further than that from where it was left (in meters)
+    MAX_OFFSET = 10
+
+    def __init__(self, bot, plan, index=0, dest_alt=None, precision=0.5):
+        super(PlanWalker, self).__init__(bot, float(plan.lats[index]), float(plan.lngs[index]), dest_alt, precision)
+        self.plan = plan
+        self.target = index
+        # Distance walked along the plan, None while off the plan
+        self.walked = None
+        self._plan_position = None
+
+    def walk_to(self, index, dest_alt=None):
+        self.target = index
+        self.dest_lat = float(self.plan.lats[index])
+        self.dest_lng = float(self.plan.lngs[index])
+        self.dest_alt = uniform(self.bot.config.alt_min, self.bot.config.alt_max) if dest_alt is None else dest_alt
+        if self.walked is not None and self.plan.offsets[index] < self.walked:
+            # going back to an earlier waypoint, straight
+            self.walked = None
+
+    def set_plan(self, plan, index=0, dest_alt=None):
+        """
+        Continues on another plan, from the waypoint the bot is at.
+        """
+        self.plan = plan
+        self.walked = float(plan.offsets[index])
+        self._plan_position = (float(plan.lats[index]), float(plan.lngs[index]))
+        self.walk_to(index, dest_alt)
+
+    def step(self, speed=None):
+        if self.walked is not None:
+            offset = geo.haversine(self.bot.position[0], self.bot.position[1], *self._plan_position)
+            if offset > self.MAX_OFFSET + self.precision:
+                self.walked = None
+        return super(PlanWalker, self).step(speed)
+
+    def get_next_position(self, origin_lat, origin_lng, origin_alt, dest_lat, dest_lng, dest_alt, distance):
+        if self.walked is None or distance == 0:
+            return super(PlanWalker, self).get_next_position(origin_lat, origin_lng, origin_alt,
+                                                             dest_lat, dest_lng, dest_alt, distance)
+
+        remaining = self.plan.offsets[self.target] - self.walked
+        travel = min(distance, remaining)
+        self.walked += travel
+
+        lat, lng, azimuth = self.plan.position(self.walked)
+        self._plan_position = (lat, lng)
+
+        random_azi = uniform(azimuth - 90, azimuth + 90)
+        random_dist = uniform(0.0, self.precision)
+        direct = Geodesic.WGS84.Direct(lat, lng, random_azi, random_dist)
+
+        progress = travel / remaining if remaining > 0 else 1
+        next_alt = origin_alt + progress * (dest_alt - origin_alt) + random_alt_delta()
+
+        return direct["lat2"], direct["lon2"], next_alt
+
+    def is_arrived(self):
+        if self.walked is None:
+            arrived = super(PlanWalker, self).is_arrived()
+            if arrived:
+                # back on the plan
+                self.walked = float(self.plan.offsets[self.target])
+                self._plan_position = (self.dest_lat, self.dest_lng)
+            return arrived
+        return self.walked >= self.plan.offsets[self.target] - self.epsilon
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Walking routes between two positions, for the PolylineWalker.
+
+A Router asks its providers in turn (an offline OpenStreetMap graph, the
+Google Directions API...) and remembers the routes in a RouteCache, which
+can be persisted so routes survive restarts. When no provider has a route,
+the walk is a straight line.
+"""
+from __future__ import absolute_import
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import xml.etree.cElementTree as ElementTree
+from collections import OrderedDict
+
+import numpy as np
+import polyline
+import requests
+
+from pokemongo_bot import geo
+
+
+class RouteProvider(object):
+    name = None
+
+    def route(self, origin, destination):
+        """
+        :param origin: (latitude, longitude)
+        :param destination: (latitude, longitude)
+        :return: The points to walk through between origin and destination (both excluded),
+                 or None if this provider has no route.
+        :rtype: list of tuple
+        """
+        raise NotImplementedError()
+
+
+class GoogleRouteProvider(RouteProvider):
+    name = 'google'
+    DIRECTIONS_API_URL = 'https://maps.googleapis.com/maps/api/directions/json?mode=walking'
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self.logger = logging.getLogger(type(self).__name__)
+
+    def url(self, origin, destination):
+        url = '{}&origin={}&destination={}'.format(self.DIRECTIONS_API_URL,
+                                                   '{},{}'.format(*origin),
+                                                   '{},{}'.format(*destination))
+        if self.api_key:
+            url = '{}&key={}'.format(url, self.api_key)
+        return url
+
+    def route(self, origin, destination):
+        try:
+            response = requests.get(self.url(origin, destination)).json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.info('Could not get directions: %s', e)
+            return None
+
+        # Either the API limit is reached (OVER_QUERY_LIMIT) or google has no directions
+        # proposal (ZERO_RESULTS), both with an empty routes list
+        routes = response.get('routes', [])
+        if not routes:
+            return None
+
+        points = []
+        for step in routes[0]['legs'][0]['steps']:
+            points += polyline.decode(step['polyline']['points'])
+        return [x for n, x in enumerate(points) if x not in points[:n]]
+
+
+class OSMRouteProvider(RouteProvider):
+    """
+    Routes over the ways of an OpenStreetMap extract (.osm XML file, as
+    exported from openstreetmap.org or cut with osmium), with A*.
+
+    The file is read on the first route. Positions further than
+    `max_snap_distance` meters from any way are not routed.
+    """
+    name = 'osm'
+    NOT_WALKABLE = frozenset(['motorway', 'motorway_link', 'trunk', 'trunk_link', 'construction',
+                              'proposed', 'raceway', 'bus_guideway', 'escape'])
+
+    def __init__(self, path, max_snap_distance=100):
+        self.path = path
+        self.max_snap_distance = max_snap_distance
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._lats = None
+        self._lngs = None
+        self._edges = []
+
+    def load(self):
+        # routes are also asked by the polyline prefetch thread
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        positions = {}
+        ways = []
+        try:
+            for _, element in ElementTree.iterparse(self.path):
+                if element.tag == 'node':
+                    positions[element.get('id')] = (float(element.get('lat')), float(element.get('lon')))
+                    element.clear()
+                elif element.tag == 'way':
+                    tags = dict((tag.get('k'), tag.get('v')) for tag in element.iter('tag'))
+                    if self._walkable(tags):
+                        ways.append([nd.get('ref') for nd in element.iter('nd')])
+                    element.clear()
+        except (IOError, SyntaxError) as e:
+            self.logger.warning('Could not load %s: %s', self.path, e)
+            return
+
+        index = {}
+        coordinates = []
+        for way in ways:
+            for node_id in way:
+                if node_id in positions and node_id not in index:
+                    index[node_id] = len(coordinates)
+                    coordinates.append(positions[node_id])
+
+        self._lats = np.array([c[0] for c in coordinates])
+        self._lngs = np.array([c[1] for c in coordinates])
+        self._edges = [[] for _ in coordinates]
+        for way in ways:
+            nodes = [index[node_id] for node_id in way if node_id in index]
+            for first, second in zip(nodes, nodes[1:]):
+                length = float(geo.haversine(self._lats[first], self._lngs[first],
+                                             self._lats[second], self._lngs[second]))
+                self._edges[first].append((second, length))
+                self._edges[second].append((first, length))
+
+        self.logger.info('Loaded %d nodes from %s', len(coordinates), self.path)
+
+    def _walkable(self, tags):
+        highway = tags.get('highway')
+        if highway is None or highway in self.NOT_WALKABLE:
+            return False
+        return tags.get('foot') != 'no' and tags.get('access') not in ('no', 'private')
+
+    def _nearest(self, position):
+        distances = geo.haversine(position[0], position[1], self._lats, self._lngs)
+        nearest = int(np.argmin(distances))
+        if distances[nearest] > self.max_snap_distance:
+            return None
+        return nearest
+
+    def route(self, origin, destination):
+        self.load()
+        if self._lats is None or not len(self._lats):
+            return None
+
+        start = self._nearest(origin)
+        goal = self._nearest(destination)
+        if start is None or goal is None:
+            return None
+
+        path = self._search(start, goal)
+        if path is None:
+            return None
+        return [(float(self._lats[node]), float(self._lngs[node])) for node in path]
+
+    def _search(self, start, goal):
+        # A* with the straight distance to the goal as heuristic
+        heuristic = geo.haversine(self._lats[goal], self._lngs[goal], self._lats, self._lngs)
+        costs = {start: 0.0}
+        previous = {}
+        queue = [(heuristic[start], 0.0, start)]
+
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == goal:
+                path = [node]
+                while node in previous:
+                    node = previous[node]
+                    path.append(node)
+                return path[::-1]
+            if cost > costs[node]:
+                continue
+            for neighbor, length in self._edges[node]:
+                new_cost = cost + length
+                if new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    previous[neighbor] = node
+                    heapq.heappush(queue, (new_cost + heuristic[neighbor], new_cost, neighbor))
+
+        return None
+
+
+class RouteCache(object):
+    """
+    Routes by origin and destination, rounded to `precision` decimals. The
+    least recently used routes are dropped once `max_size` is reached.
+
+    New routes are written to `path` at most every `save_interval` seconds
+    (see save_if_due), and on exit.
+    """
+
+    def __init__(self, path=None, precision=4, max_size=2000, save_interval=60):
+        self.path = path
+        self.precision = precision
+        self.max_size = max_size
+        self.save_interval = save_interval
+        self.last_save = time.time()
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self._routes = OrderedDict()
+        self._dirty = False
+        # routes are prefetched from another thread
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def key(self, origin, destination):
+        return '{0:.{4}f},{1:.{4}f};{2:.{4}f},{3:.{4}f}'.format(
+            origin[0], origin[1], destination[0], destination[1], self.precision)
+
+    def get(self, origin, destination):
+        key = self.key(origin, destination)
+        with self._lock:
+            encoded = self._routes.pop(key, None)
+            if encoded is None:
+                return None
+            self._routes[key] = encoded
+        return polyline.decode(encoded) if encoded else []
+
+    def put(self, origin, destination, points):
+        key = self.key(origin, destination)
+        encoded = polyline.encode(points) if points else ''
+        with self._lock:
+            self._routes.pop(key, None)
+            while len(self._routes) >= self.max_size:
+                self._routes.popitem(last=False)
+            self._routes[key] = encoded
+            self._dirty = True
+
+    def load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path) as infile:
+                self._routes = OrderedDict(json.load(infile))
+        except (IOError, ValueError) as e:
+            self.logger.info('[x] Error while reading %s: %s' % (self.path, e))
+
+    def save_if_due(self):
+        if self._dirty and time.time() - self.last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        self.last_save = time.time()
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            routes = self._routes.items()
+            self._dirty = False
+
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w') as outfile:
+                json.dump(routes, outfile)
+            if os.name == 'nt' and os.path.exists(self.path):
+                # rename does not replace an existing file on windows
+                os.remove(self.path)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError) as e:
+            self.logger.info('[x] Error while writing %s: %s' % (self.path, e))
+            self._dirty = True
+
+
+class Router(object):
+    def __init__(self, providers, cache=None):
+        self.providers = providers
+        self.cache = cache
+
+    @staticmethod
+    def from_config(config, cache_path=None):
+        providers = []
+        if config.routing_osm_file:
+            providers.append(OSMRouteProvider(config.routing_osm_file))
+        if config.routing_google:
+            providers.append(GoogleRouteProvider(config.gmapkey))
+
+        cache = None
+        if config.routing_cache:
+            cache = RouteCache(cache_path)
+            cache.load()
+        return Router(providers, cache)
+
+    def route(self, origin, destination):
+        """
+        :return: The points to walk through between origin and destination, an
+                 empty list to walk straight to the destination.
+        :rtype: list of tuple
+        """
+        if self.cache is not None:
+            points = self.cache.get(origin, destination)
+            if points is not None:
+                return points
+
+        for provider in self.providers:
+            points = provider.route(origin, destination)
+            if points is not None:
+                if self.cache is not None:
+                    self.cache.put(origin, destination, points)
+                return points
+
+        return []
+
+    def save_if_due(self):
+        if self.cache is not None:
+            self.cache.save_if_due()
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class WebStateWriter(object):
+    """
+    Writes the JSON documents read by the web UI (location, cells,
+    inventory, catchable...) from a background thread.
+
+    Documents are serialized by write(), on the thread of the caller: they
+    are often live objects of the bot, modified while the writer waits.
+
+    Only the last document submitted for a path is kept, so bursts are
+    coalesced into one write every `delay` seconds. A document whose
+    serialization did not change since the last write is skipped. Files
+    are written to a temporary file and renamed over the old one, so the
+    web UI never reads a partial document.
+    """
+
+    def __init__(self, delay=1.0):
+        self.delay = delay
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self.written = 0
+        self.skipped = 0
+
+        self._pending = OrderedDict()
+        self._hashes = {}
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._running = True
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='web-state')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, path, document):
+        """
+        Schedules the write of a document, replacing any pending one for the same path.
+        :param path: Path of the JSON file.
+        :type path: str
+        :param document: Anything json.dumps can serialize.
+        :return: Nothing.
+        :rtype: None
+        """
+        try:
+            data = json.dumps(document)
+        except (ValueError, TypeError) as e:
+            self.logger.info('[x] Error while writing %s: %s' % (path, e))
+            return
+
+        with self._condition:
+            self._pending.pop(path, None)
+            self._pending[path] = data
+            self._condition.notify()
+
+    def flush(self):
+        """
+        Writes the pending documents right away, from the calling thread.
+        """
+        with self._condition:
+            pending, self._pending = self._pending, OrderedDict()
+        self._write_all(pending)
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._stopped.set()
+        self._thread.join(5)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+
+            # let the burst settle, later documents replace the pending ones
+            self._stopped.wait(self.delay)
+
+            with self._condition:
+                pending, self._pending = self._pending, OrderedDict()
+            try:
+                self._write_all(pending)
+            except Exception:
+                # the next documents are written anyway
+                self.logger.exception('[x] Error while writing the web state')
+
+    def _write_all(self, pending):
+        with self._write_lock:
+            for path, data in pending.iteritems():
+                try:
+                    self._write(path, data)
+                except (IOError, OSError) as e:
+                    self.logger.info('[x] Error while writing %s: %s' % (path, e))
+
+    def _write(self, path, data):
+        digest = hashlib.sha1(data.encode('utf-8') if isinstance(data, unicode) else data).hexdigest()
+        if self._hashes.get(path) == digest and os.path.exists(path):
+            self.skipped += 1
+            return
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as outfile:
+            outfile.write(data)
+
+        if os.name == 'nt' and os.path.exists(path):
+            # rename does not replace an existing file on windows
+            os.remove(path)
+        os.rename(temp_path, path)
+
+        self._hashes[path] = digest
+        self.written += 1
@@ -11,6 +11,7 @@ git submodule foreach git pull origin master
 source bin/activate
 pip install -r requirements.txt --upgrade
 pip install -r requirements.txt
+python -m pokemongo_bot.static_data
 }
 
 function Pokebotencrypt () {
@@ -6,7 +6,7 @@ from tests import FakeApi, get_fake_conf
 
 from pgoapi import PGoApi
 from pgoapi.exceptions import NotLoggedInException, ServerBusyOrOfflineException, NoPlayerPositionSetException #, EmptySubrequestChainException
-from pokemongo_bot.api_wrapper import ApiWrapper
+from pokemongo_bot.api_wrapper import ApiWrapper, ApiRequest, RateLimiter
 
 class TestApiWrapper(unittest.TestCase):
     def test_raises_not_logged_in_exception(self):
@@ -121,3 +121,86 @@ class TestApiWrapper(unittest.TestCase):
 
         result = FakeApi().get_inventory()
         self.assertEqual(result, 'mock return')
+
+    def test_requests_share_rate_limiter(self):
+        api = FakeApi()
+        self.assertIs(api.create_request().rate_limiter, api.rate_limiter)
+        self.assertIs(api.create_request().rate_limiter, api.create_request().rate_limiter)
+
+
+    def test_queued_requests_are_coalesced(self):
+        api = FakeApi()
+        callback = MagicMock()
+        api.queue_request('get_inventory', callback)
+        api.queue_request('get_player', callback)
+
+        request = api.create_request()
+        request.get_map_objects()
+        good_return_value = {'responses': {'GET_MAP_OBJECTS': {}, 'GET_INVENTORY': {}, 'GET_PLAYER': {}}, 'status_code': 0}
+        request._call.return_value = good_return_value
+
+        result = api.flush_requests(request)
+        self.assertEqual(result, good_return_value)
+        self.assertEqual(request._call.call_count, 1)
+        self.assertEqual(callback.call_count, 2)
+        callback.assert_called_with(good_return_value)
+        self.assertFalse(api.is_request_queued('get_inventory'))
+
+    def test_flush_only_given_methods(self):
+        api = FakeApi()
+        api.queue_request('get_inventory')
+        api.queue_request('get_player')
+
+        with patch.object(ApiRequest, 'call', return_value={}) as call:
+            api.flush_requests(methods=['get_player'])
+
+        self.assertEqual(call.call_count, 1)
+        self.assertTrue(api.is_request_queued('get_inventory'))
+        self.assertFalse(api.is_request_queued('get_player'))
+
+    def test_flush_with_nothing_queued(self):
+        self.assertIsNone(FakeApi().flush_requests())
+
+    @patch('pokemongo_bot.api_wrapper.sleep')
+    def test_failed_flush_keeps_queued_requests(self, sleep):
+        api = FakeApi()
+        callback = MagicMock()
+        api.queue_request('get_inventory', callback)
+
+        with self.assertRaises(ServerBusyOrOfflineException):
+            api.flush_requests(api.create_request('Wrong Value'))
+
+        self.assertFalse(callback.called)
+        self.assertTrue(api.is_request_queued('get_inventory'))
+
+
+class TestRateLimiter(unittest.TestCase):
+    @patch('pokemongo_bot.api_wrapper.sleep')
+    def test_burst_is_not_delayed(self, sleep):
+        limiter = RateLimiter(rate=2, burst=3)
+        for i in range(3):
+            self.assertEqual(limiter.acquire(), 0)
+        self.assertFalse(sleep.called)
+
+        self.assertGreater(limiter.acquire(), 0)
+        self.assertTrue(sleep.called)
+
+    def test_backoff_and_recovery(self):
+        limiter = RateLimiter(rate=4, burst=1)
+        limiter.on_throttled()
+        self.assertEqual(limiter.rate, 2)
+        self.assertEqual(limiter.throttled_count, 1)
+
+        for i in range(RateLimiter.RECOVERY_SUCCESSES):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 2 * RateLimiter.RECOVERY_FACTOR)
+
+        for i in range(RateLimiter.RECOVERY_SUCCESSES * 10):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 4)
+
+    def test_rate_never_drops_below_minimum(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        for i in range(20):
+            limiter.on_throttled()
+        self.assertEqual(limiter.rate, RateLimiter.MIN_RATE)
@@ -0,0 +1,94 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from pokemongo_bot.datastore import ActionLog, Datastore, RollingCounter
+
+
+class RollingCounterTest(unittest.TestCase):
+    def test_sliding_window(self):
+        counter = RollingCounter(window=3600, bucket=60)
+        now = 1000000
+        for minute in range(120):
+            counter.add(now + minute * 60)
+
+        end = now + 119 * 60
+        # buckets partially in the window are still counted
+        self.assertEqual(counter.count(end), 61)
+        self.assertEqual(counter.count(end + 1800), 31)
+        self.assertEqual(counter.count(end + 7200), 0)
+
+
+class ActionLogTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE catch_log (pokemon text, cp real, iv real, encounter_id text, pokemon_id real, dated datetime DEFAULT CURRENT_TIMESTAMP)")
+        self.conn.execute("CREATE TABLE transfer_log (pokemon text, iv real, cp real, dated datetime DEFAULT CURRENT_TIMESTAMP)")
+        self.log = ActionLog(self.conn, flush_interval=3600, max_pending=10)
+
+    def count(self, table):
+        return self.conn.execute('SELECT COUNT(*) FROM ' + table).fetchone()[0]
+
+    def test_schema_is_checked_once(self):
+        self.assertEqual(self.log.tables, set(['catch_log', 'transfer_log']))
+        self.assertTrue(self.log.log_catch('Pidgey', 10, 0.5, 123, 16))
+        self.assertFalse(self.log.log_evolve('Pidgey', 0.5, 10))
+
+    def test_rows_are_buffered_until_flush(self):
+        self.log.log_catch('Pidgey', 10, 0.5, 123, 16)
+        self.log.log_transfer('Pidgey', 0.5, 10)
+        self.assertEqual(self.count('catch_log'), 0)
+        self.assertEqual(self.log.pending(), 2)
+
+        self.log.flush_if_due()
+        self.assertEqual(self.count('catch_log'), 0)
+
+        self.log.flush()
+        self.assertEqual(self.count('catch_log'), 1)
+        self.assertEqual(self.count('transfer_log'), 1)
+        self.assertEqual(self.log.pending(), 0)
+
+        row = self.conn.execute('SELECT encounter_id, dated FROM catch_log').fetchone()
+        self.assertEqual(row[0], '123')
+        # dated is the time of the action, recent rows are found by the daily limit queries
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM catch_log WHERE dated >= datetime('now','-1 day')").fetchone()[0], 1)
+
+    def test_flush_when_buffer_is_full(self):
+        for i in range(10):
+            self.log.log_transfer('Pidgey', 0.5, i)
+        self.assertEqual(self.count('transfer_log'), 10)
+
+    def test_failed_flush_keeps_rows(self):
+        self.log.log_transfer('Pidgey', 0.5, 10)
+        self.conn.execute('DROP TABLE transfer_log')
+        self.log.flush()
+        self.assertEqual(self.log.pending(), 1)
+
+    def test_daily_count(self):
+        self.conn.execute("INSERT INTO catch_log (pokemon, dated) VALUES ('Old', datetime('now','-2 day'))")
+        self.conn.execute("INSERT INTO catch_log (pokemon, dated) VALUES ('Recent', datetime('now','-1 hour'))")
+        log = ActionLog(self.conn)
+
+        self.assertEqual(log.count_last_day('catch_log'), 1)
+        log.log_catch('Pidgey', 10, 0.5, 123, 16)
+        self.assertEqual(log.count_last_day('catch_log'), 2)
+        self.assertEqual(log.count_last_day('pokestop_log'), 0)
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_dated_indexes(self):
+        ds = Datastore(conn_str='/' + os.path.join(self.directory, 'test.db'))
+        ds.migrate(os.path.join(os.path.dirname(__file__), '..', 'pokemongo_bot', 'cell_workers', 'migrations'))
+        indexes = set(row[0] for row in ds.get_connection().execute(
+            "SELECT name FROM sqlite_master WHERE type='index'"))
+
+        self.assertTrue(set(['catch_log_dated', 'pokestop_log_dated', 'vanish_log_dated']) <= indexes)
@@ -0,0 +1,170 @@
+import thread
+import threading
+import unittest
+
+from mock import MagicMock
+
+from pokemongo_bot.event_manager import EventManager, EventHandler, AsyncHandler
+
+
+class RecordingHandler(EventHandler):
+    def __init__(self, gate=None):
+        self.received = []
+        self.threads = set()
+        self.gate = gate
+        self.started = threading.Event()
+
+    def handle_event(self, event, sender, level, msg, data):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait()
+        self.threads.add(thread.get_ident())
+        data['msg'] = msg
+        self.received.append((event, level, msg))
+
+
+class SyncHandler(EventHandler):
+    synchronous = True
+
+    def __init__(self):
+        self.threads = set()
+
+    def handle_event(self, event, sender, level, msg, data):
+        self.threads.add(thread.get_ident())
+
+
+class EventManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = EventManager(False)
+        self.manager.register_event('test', parameters=('value',))
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_sync_dispatch_by_default(self):
+        handler = RecordingHandler()
+        self.manager.add_handler(handler)
+        self.manager.emit('test', sender=self, formatted='value {value}', data={'value': 1})
+
+        self.assertEqual(handler.received, [('test', 'info', 'value 1')])
+        self.assertEqual(self.manager.handler_stats(), [])
+
+    def test_async_dispatch(self):
+        handler = RecordingHandler()
+        logging_handler = SyncHandler()
+        self.manager.add_handler(handler)
+        self.manager.add_handler(logging_handler)
+        self.manager.set_async_dispatch(queue_size=10)
+
+        data = {'value': 1}
+        for _ in range(5):
+            self.manager.emit('test', sender=self, formatted='value {value}', data=data)
+        self.manager.shutdown()
+
+        self.assertEqual(len(handler.received), 5)
+        # one thread, not this one (idents, names are all MainThread when eventlet patched threading)
+        self.assertEqual(len(handler.threads), 1)
+        self.assertNotIn(thread.get_ident(), handler.threads)
+        self.assertEqual(logging_handler.threads, set([thread.get_ident()]))
+        # queued handlers get their own copy of data
+        self.assertEqual(data, {'value': 1})
+        self.assertEqual(self.manager.handler_stats()[0]['handled'], 5)
+
+    def test_unsubscribed_events_are_not_built_nor_formatted(self):
+        handler = RecordingHandler()
+        handler.levels = ('info',)
+        self.manager.add_handler(handler)
+        payload = MagicMock(return_value={'value': 1})
+
+        self.manager.emit('test', sender=self, level='debug', formatted='{missing}', data=payload)
+        self.assertFalse(payload.called)
+        self.assertFalse(self.manager.is_subscribed('test', 'debug'))
+
+        self.manager.emit('test', sender=self, level='info', formatted='value {value}', data=payload)
+        self.assertTrue(payload.called)
+        self.assertEqual(handler.received, [('test', 'info', 'value 1')])
+
+    def test_dynamic_subscriptions_are_not_cached(self):
+        handler = RecordingHandler()
+        handler.dynamic = True
+        handler.levels = ()
+        self.manager.add_handler(handler)
+
+        self.assertFalse(self.manager.is_subscribed('test'))
+        handler.levels = ('info',)
+        self.assertTrue(self.manager.is_subscribed('test'))
+
+    def test_formatting_is_skipped_for_data_only_handlers(self):
+        handler = RecordingHandler()
+        handler.uses_formatted = False
+        handler.events = ('test',)
+        self.manager.add_handler(handler)
+        self.manager.register_event('other')
+
+        self.manager.emit('test', sender=self, formatted='{missing}', data={'value': 1})
+        self.manager.emit('other', sender=self)
+        self.assertEqual(handler.received, [('test', 'info', '')])
+
+    def test_events_after_shutdown_are_handled_synchronously(self):
+        handler = RecordingHandler()
+        self.manager.set_async_dispatch()
+        self.manager.add_handler(handler)
+        self.manager.shutdown()
+
+        self.manager.emit('test', sender=self, data={'value': 1})
+        self.assertEqual(len(handler.received), 1)
+
+
+class AsyncHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.gate = threading.Event()
+        self.handler = RecordingHandler(self.gate)
+
+    def fill(self, async_handler, levels):
+        for i, level in enumerate(levels):
+            async_handler.handle_event('event%d' % i, self, level, '', {})
+
+    def test_drop_oldest(self):
+        async_handler = AsyncHandler(self.handler, queue_size=2, overflow='drop_oldest')
+        # the first event is taken by the thread, which waits on the gate
+        self.fill(async_handler, ['info'])
+        self.assertTrue(self.handler.started.wait(5))
+        self.fill(async_handler, ['info', 'info', 'info'])
+        self.gate.set()
+        async_handler.stop()
+
+        self.assertEqual([e[0] for e in self.handler.received], ['event0', 'event1', 'event2'])
+        self.assertEqual(async_handler.dropped, 1)
+
+    def test_drop_debug(self):
+        async_handler = AsyncHandler(self.handler, queue_size=2, overflow='drop_debug')
+        self.fill(async_handler, ['info'])
+        self.assertTrue(self.handler.started.wait(5))
+        self.fill(async_handler, ['info', 'debug', 'info'])
+        self.gate.set()
+        async_handler.stop()
+
+        self.assertEqual([e[1] for e in self.handler.received], ['info', 'info', 'info'])
+        self.assertEqual(async_handler.dropped, 1)
+
+    def test_block(self):
+        async_handler = AsyncHandler(self.handler, queue_size=1, overflow='block')
+        self.gate.set()
+        self.fill(async_handler, ['info'] * 20)
+        async_handler.stop()
+
+        self.assertEqual(len(self.handler.received), 20)
+        self.assertEqual(async_handler.dropped, 0)
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, AsyncHandler, self.handler, 10, 'drop_all')
+
+    def test_errors_do_not_stop_the_thread(self):
+        class FailingHandler(EventHandler):
+            def handle_event(self, *args):
+                raise RuntimeError('down')
+
+        async_handler = AsyncHandler(FailingHandler())
+        self.fill(async_handler, ['info', 'info'])
+        async_handler.stop()
+        self.assertEqual(async_handler.errors, 2)
@@ -1,5 +1,7 @@
 import unittest
 
+from mock import MagicMock, patch
+
 from pokemongo_bot.inventory import *
 
 
@@ -155,6 +157,23 @@ class InventoryTest(unittest.TestCase):
         self.assertAlmostEqual(poke.moveset.attack_perfection, 0.7830652035809673)
         self.assertAlmostEqual(poke.moveset.defense_perfection, 0.49197568321772184)
 
+    def test_derived_stats_are_shared(self):
+        PokemonStats.clear()
+        data = {
+            "move_1": 221, "move_2": 129, "pokemon_id": 19, "cp": 106,
+            "individual_attack": 6, "stamina_max": 22, "individual_defense": 14,
+            "cp_multiplier": 0.37523558735847473}
+        first = Pokemon(dict(data, id=1))
+        second = Pokemon(dict(data, id=2))
+        other = Pokemon(dict(data, id=3, individual_stamina=15))
+
+        self.assertEqual((PokemonStats.hits, PokemonStats.misses), (1, 2))
+        self.assertEqual(second.ivcp, first.ivcp)
+        self.assertEqual(second.cp_exact, first.cp_exact)
+        self.assertIs(second.moveset, first.moveset)
+        self.assertIs(first.moveset, first.static.movesets_by_attacks[(221, 129)])
+        self.assertGreater(other.ivcp, first.ivcp)
+
     def test_levels_to_cpm(self):
         l2c = LevelToCPm
         self.assertIs(levels_to_cpm(), l2c)
@@ -171,6 +190,9 @@ class InventoryTest(unittest.TestCase):
 
         self.assertEqual(l2c.level_from_cpm(0.79030001), 40.0)
         self.assertEqual(l2c.level_from_cpm(0.7903), 40.0)
+        self.assertEqual(l2c.level_from_cpm(0.0), 1.0)
+        self.assertEqual(l2c.level_from_cpm(0.558830576), 17.5)
+        self.assertEqual(l2c.level_from_cpm(0.56), 17.5)
 
     def test_attacks(self):
         self._test_attacks(fast_attacks, FastAttacks)
@@ -209,3 +231,82 @@ class InventoryTest(unittest.TestCase):
             assert (attack in clazz.list_for_type(attack.type.name))
             self.assertIsInstance(attack, ChargedAttack if charged else Attack)
             prev_dps = attack.dps
+
+
+def inventory_response(items, new_timestamp_ms, original_timestamp_ms=0):
+    delta = {'new_timestamp_ms': new_timestamp_ms, 'inventory_items': items}
+    if original_timestamp_ms:
+        delta['original_timestamp_ms'] = original_timestamp_ms
+    return {'responses': {'GET_INVENTORY': {'inventory_delta': delta}}}
+
+
+def pokemon_item(unique_id, cp):
+    return {'inventory_item_data': {'pokemon_data': {
+        "move_1": 221, "move_2": 129, "pokemon_id": 19, "cp": cp,
+        "individual_attack": 6, "stamina_max": 22, "individual_defense": 14,
+        "cp_multiplier": 0.37523558735847473, "id": unique_id}}}
+
+
+class InventoryDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.patcher = patch.object(Inventory, 'update_web_inventory')
+        self.patcher.start()
+
+        self.bot = MagicMock()
+        self.bot.api.get_inventory.return_value = inventory_response([
+            pokemon_item(1, 106), pokemon_item(2, 120),
+            {'inventory_item_data': {'item': {'item_id': 1, 'count': 10}}},
+            {'inventory_item_data': {'player_stats': {'level': 5, 'experience': 100, 'next_level_xp': 1000}}},
+        ], 1000)
+        self.inventory = Inventory(self.bot)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_asks_for_the_changes_since_the_last_response(self):
+        self.bot.api.get_inventory.assert_called_once_with()
+        self.assertEqual(self.inventory.last_timestamp_ms, 1000)
+        self.assertEqual(self.inventory.request_args(), {'last_timestamp_ms': 1000})
+
+        self.inventory.deltas_applied = Inventory.FULL_REFRESH_EVERY
+        self.assertEqual(self.inventory.request_args(), {})
+
+    def test_only_changed_items_are_parsed_again(self):
+        first, second = self.inventory.pokemons.get(1), self.inventory.pokemons.get(2)
+
+        self.inventory.refresh(inventory_response([
+            pokemon_item(1, 106),  # same payload
+            pokemon_item(2, 130),
+            pokemon_item(3, 90),
+            {'inventory_item_data': {'item': {'item_id': 1, 'count': 7}}},
+        ], 2000, original_timestamp_ms=1000))
+
+        self.assertIs(self.inventory.pokemons.get(1), first)
+        self.assertIsNot(self.inventory.pokemons.get(2), second)
+        self.assertEqual(self.inventory.pokemons.get(2).cp, 130)
+        self.assertEqual(self.inventory.pokemons.get(3).cp, 90)
+        self.assertEqual(self.inventory.items.get(1).count, 7)
+        # not in the delta, kept
+        self.assertEqual(self.inventory.player.level, 5)
+        self.assertEqual(self.inventory.last_timestamp_ms, 2000)
+        self.assertEqual(self.inventory.deltas_applied, 1)
+
+    def test_deleted_items_are_removed(self):
+        self.inventory.refresh(inventory_response([
+            {'modified_timestamp_ms': 1500, 'deleted_item': {'pokemon_id': 2}},
+        ], 2000, original_timestamp_ms=1000))
+
+        self.assertEqual([p.unique_id for p in self.inventory.pokemons.all()], [1])
+
+    def test_older_responses_are_ignored(self):
+        self.inventory.refresh(inventory_response([pokemon_item(2, 130)], 2000, original_timestamp_ms=1000))
+        self.inventory.refresh(inventory_response([pokemon_item(2, 125)], 1500, original_timestamp_ms=1000))
+
+        self.assertEqual(self.inventory.pokemons.get(2).cp, 130)
+        self.assertEqual(self.inventory.last_timestamp_ms, 2000)
+
+    def test_full_inventory_replaces_the_cache(self):
+        self.inventory.refresh(inventory_response([pokemon_item(3, 90)], 3000))
+
+        self.assertEqual([p.unique_id for p in self.inventory.pokemons.all()], [3])
+        self.assertEqual(self.inventory.deltas_applied, 0)
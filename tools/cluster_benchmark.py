@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Compares find_biggest_cluster with the networkx clique search it replaced.
+
+    python -m tools.cluster_benchmark [--radius 50] [--max-old 1000]
+
+Forts are spread at downtown density (one every 30x30 meters), so the
+number of neighbors of each fort stays the same as their count grows.
+The clique search can report a few more points: forts pairwise 2 * radius
+apart do not always fit in a disk of that radius. Without networkx
+(pip install networkx), only the current implementation is timed.
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+try:
+    import networkx as nx
+    from networkx.algorithms.clique import find_cliques
+except ImportError:
+    nx = None
+
+from pokemongo_bot.cell_workers.utils import coord2merc, distance, find_biggest_cluster, merc2coord
+
+SIZES = (100, 250, 500, 1000, 2500, 5000)
+SPACING = 30.0
+
+
+def clique_cluster(radius, points):
+    # Implementation before the clustering engine, kept as a reference
+    graph = nx.Graph()
+    for point in points:
+        f = point['latitude'], point['longitude'], 0
+        graph.add_node(f)
+        for node in graph.nodes():
+            if node != f and distance(f[0], f[1], node[0], node[1]) <= radius * 2:
+                graph.add_edge(f, node)
+    cliques = list(find_cliques(graph))
+    if len(cliques) > 0:
+        max_clique = max(cliques, key=lambda l: (len(l), sum(x[2] for x in l)))
+        merc_clique = [coord2merc(x[0], x[1]) for x in max_clique]
+        clique_x, clique_y = zip(*merc_clique)
+        best_coord = merc2coord((np.mean(clique_x), np.mean(clique_y)))
+        return {'latitude': best_coord[0], 'longitude': best_coord[1], 'num_points': len(max_clique)}
+
+
+def make_forts(count, seed=0):
+    rand = random.Random(seed)
+    side = SPACING * count ** 0.5
+    # ~111km per degree of latitude, the benchmark runs at the equator
+    degrees = side / 111320.0
+    return [{'latitude': rand.uniform(0, degrees), 'longitude': rand.uniform(0, degrees)} for _ in range(count)]
+
+
+def timed(function, *args):
+    started = time.time()
+    result = function(*args)
+    return time.time() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--radius', type=float, default=50)
+    parser.add_argument('--max-old', type=int, default=1000, help='Largest set given to the clique search')
+    args = parser.parse_args()
+
+    print('{:>6} {:>12} {:>8} {:>12} {:>8}'.format('forts', 'cliques (s)', 'points', 'engine (s)', 'points'))
+    for count in SIZES:
+        forts = make_forts(count)
+        new_time, new = timed(find_biggest_cluster, args.radius, forts)
+        if nx is not None and count <= args.max_old:
+            old_time, old = timed(clique_cluster, args.radius, forts)
+            old_columns = '{:>12.3f} {:>8}'.format(old_time, old['num_points'])
+        else:
+            old_columns = '{:>12} {:>8}'.format('-', '-')
+        print('{:>6} {} {:>12.3f} {:>8}'.format(count, old_columns, new_time, new['num_points']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the memory used by the pokemons of a cached inventory.
+
+    python -m tools.inventory_memory_benchmark [--pokemons 1500]
+
+A bag of random pokemons is loaded in a Pokemons component, like the
+GET_INVENTORY response of a bot would be, then the PokemonOptimizer reads
+the attributes its rules can sort on. The size of every object reachable
+from the component is added up (sys.getsizeof), except the static data
+(species, attacks, movesets, types) shared by all the bots of a process.
+The server payloads, also kept by the component, are accounted apart.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import random
+import sys
+
+from pokemongo_bot.inventory import (ChargedAttacks, FastAttacks, LevelToCPm, Pokemons, Types)
+
+# attributes the PokemonOptimizer reads on every pokemon
+OPTIMIZER_ATTRIBUTES = ('ncp', 'max_cp', 'dps', 'dps1', 'dps2', 'dps_attack', 'dps_defense',
+                        'attack_perfection', 'defense_perfection')
+
+
+def make_payloads(count, rand):
+    payloads = []
+    for unique_id in range(1, count + 1):
+        info = Pokemons.data_for(rand.randint(1, 151))
+        moveset = rand.choice(info.movesets)
+        payloads.append({'inventory_item_data': {'pokemon_data': {
+            'id': unique_id, 'pokemon_id': info.id, 'cp': rand.randint(10, 3000),
+            'move_1': moveset.fast_attack.id, 'move_2': moveset.charged_attack.id,
+            'individual_attack': rand.randint(0, 15), 'individual_defense': rand.randint(0, 15),
+            'individual_stamina': rand.randint(0, 15), 'stamina_max': 100, 'stamina': 100,
+            'cp_multiplier': rand.choice(LevelToCPm.STATIC_DATA), 'pokeball': 1,
+            'captured_cell_id': rand.getrandbits(60), 'creation_time_ms': rand.getrandbits(40),
+            'height_m': rand.random(), 'weight_kg': rand.random() * 50}}})
+    return payloads
+
+
+def reachable_size(root, excluded):
+    seen = set(id(o) for o in excluded)
+    stack = [root]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def static_objects():
+    return [Pokemons.STATIC_DATA, FastAttacks.STATIC_DATA, ChargedAttacks.STATIC_DATA,
+            Types.STATIC_DATA, LevelToCPm.STATIC_DATA]
+
+
+def shared_objects():
+    # everything reachable from the static data
+    shared = []
+    stack = static_objects()
+    seen = set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        shared.append(obj)
+        stack.extend(gc.get_referents(obj))
+    return shared
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pokemons', type=int, default=1500)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.pokemons, random.Random(args.pokemons))
+    component = Pokemons()
+    component.refresh(payloads)
+
+    for pokemon in component.all():
+        for name in OPTIMIZER_ATTRIBUTES:
+            getattr(pokemon, name)
+
+    shared = shared_objects()
+    raw = [item['inventory_item_data']['pokemon_data'] for item in payloads]
+    total = reachable_size(component, shared)
+    without_payloads = reachable_size(component, shared + raw)
+
+    print('{:>9} {:>12} {:>12} {:>14}'.format('pokemons', 'total (kB)', 'per pokemon', 'w/o payloads'))
+    print('{:>9} {:>12.1f} {:>12.0f} {:>14.0f}'.format(
+        args.pokemons, total / 1024.0, total / float(args.pokemons), without_payloads / float(args.pokemons)))
+
+
+if __name__ == '__main__':
+    main()
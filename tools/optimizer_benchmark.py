@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the PokemonOptimizer scoring, pokemon by pokemon, with the
+PokemonTable columns it now uses.
+
+    python -m tools.optimizer_benchmark [--repeat 5]
+
+Each inventory is scored with the default rules of the optimizer, on the
+whole bag ("overall") and on groups of 20 pokemons ("by_family").
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from pokemongo_bot.cell_workers.pokemon_optimizer import PokemonOptimizer
+from pokemongo_bot.pokemon_table import PokemonTable
+
+SIZES = (250, 1000, 2500)
+GROUP_SIZE = 20
+RULES = [{"mode": "overall", "top": 1, "sort": ["max_cp", "cp"], "keep": {"candy": -124}, "evolve": False, "buddy": True},
+         {"mode": "overall", "top": 1, "sort": ["-candy", "max_cp", "cp"], "evolve": False, "buddy": True},
+         {"mode": "by_family", "top": 3, "sort": ["iv", "ncp"], "evolve": {"iv": 0.9, "ncp": 0.9}, "upgrade": {"iv": 0.9, "ncp": 0.9}},
+         {"mode": "by_family", "top": 1, "sort": ["iv"], "evolve": {"iv": 0.9}},
+         {"mode": "by_family", "top": 1, "sort": ["ncp"], "evolve": {"ncp": 0.9}},
+         {"mode": "by_family", "top": 1, "sort": ["cp"], "evolve": False},
+         {"mode": "by_pokemon", "top": 1, "sort": ["dps_attack", "iv"], "keep": {"iv": 0.9}}]
+
+
+class FakePokemon(object):
+    def __init__(self, rand):
+        self.iv = round(rand.random(), 2)
+        self.ncp = round(rand.random(), 2)
+        self.cp = rand.randint(10, 3000)
+        self.max_cp = rand.choice((500, 1200, 2000, 3500))
+        self.dps_attack = round(rand.uniform(5, 20), 1)
+        self.candy = rand.randint(0, 400)
+        self.in_fort = rand.random() < 0.05
+        self._next = rand.random() < 0.6
+
+    def has_next_evolution(self):
+        return self._next
+
+
+def make_optimizer():
+    optimizer = PokemonOptimizer.__new__(PokemonOptimizer)
+    optimizer.debug = False
+    optimizer.table = None
+    return optimizer
+
+
+def score_one_by_one(optimizer, groups, rule):
+    # Implementation before the PokemonTable, kept as a reference
+    results = []
+    for group in groups:
+        for pokemon in group:
+            setattr(pokemon, "__score__", optimizer.get_score(pokemon, rule))
+        keep = [p for p in group if p.__score__[1] is True]
+        keep.sort(key=lambda p: p.__score__[0], reverse=True)
+        results.append([(p, p.__score__[1:]) for p in keep])
+    return results
+
+
+def score_with_table(optimizer, groups, rule):
+    return [[(p, p.__score__[1:]) for p in optimizer.score_and_sort(group, rule)] for group in groups]
+
+
+def run(function, pokemons, repeat):
+    started = time.time()
+    for _ in range(repeat):
+        optimizer = make_optimizer()
+        # like PokemonOptimizer.open_inventory, once per optimizer run
+        optimizer.table = PokemonTable(pokemons)
+        results = []
+        for rule in RULES:
+            if rule["mode"] == "overall":
+                groups = [pokemons]
+            else:
+                groups = [pokemons[i:i + GROUP_SIZE] for i in range(0, len(pokemons), GROUP_SIZE)]
+            results.append(function(optimizer, groups, rule))
+    return (time.time() - started) / repeat, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:>9} {:>14} {:>10} {:>6}'.format('pokemons', 'one by one (s)', 'table (s)', 'same'))
+    for count in SIZES:
+        rand = random.Random(count)
+        pokemons = [FakePokemon(rand) for _ in range(count)]
+        old_time, old = run(score_one_by_one, pokemons, args.repeat)
+        new_time, new = run(score_with_table, pokemons, args.repeat)
+        print('{:>9} {:>14.4f} {:>10.4f} {:>6}'.format(count, old_time, new_time, str(old == new)))
+
+
+if __name__ == '__main__':
+    main()